@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine  # SQLAlchemy 엔진 생성용
 from sqlalchemy.ext.declarative import declarative_base  # ORM 모델 베이스 클래스 생성용
 from sqlalchemy.orm import sessionmaker  # 데이터베이스 세션 관리용
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession  # 비동기 엔진/세션용
 import os  # 환경변수 접근용
 from dotenv import load_dotenv  # .env 파일 로드용
 
@@ -27,11 +28,39 @@ else:
         pool_recycle=3600      # 1시간마다 연결 재생성
     )
 
+# 비동기 드라이버용 URL 변환 (postgresql → asyncpg, sqlite → aiosqlite)
+# ASYNC_DATABASE_URL 환경변수가 있으면 그대로 사용
+def _to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+# async def 핸들러에서 이벤트 루프를 막지 않도록 비동기 엔진을 별도로 생성
+if "sqlite" in ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=20,
+        max_overflow=30,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+
 # 데이터베이스 세션 팩토리 생성
 # autocommit=False: 명시적으로 commit() 호출해야 변경사항 저장
 # autoflush=False: 명시적으로 flush() 호출해야 변경사항 DB에 반영
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 비동기 세션 팩토리
+# expire_on_commit=False: commit 후에도 객체 속성을 추가 쿼리(lazy load) 없이 읽을 수 있도록 유지
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # ORM 모델들이 상속받을 베이스 클래스 생성
 Base = declarative_base()
 
@@ -43,3 +72,9 @@ def get_db():
         yield db  # 세션을 API 함수에 전달
     finally:
         db.close()  # 요청 완료 후 세션 닫기 (리소스 정리)
+
+# async def 핸들러용 비동기 데이터베이스 세션 함수
+# 쿼리 대기 중에도 이벤트 루프가 다른 요청을 처리할 수 있다
+async def get_async_db():
+    async with AsyncSessionLocal() as db:  # 요청 완료 후 자동으로 세션 닫기
+        yield db
@@ -16,13 +16,21 @@ PostgreSQL 데이터베이스를 사용하여 데이터를 저장하고 관리
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import boto3
+import asyncio
 import os
 from starlette.middleware.cors import CORSMiddleware
 
 # 데이터베이스 관련 임포트
 from database import engine
 from models import Base
+from services.s3_gateway import s3_gateway
+from services.view_counter import view_counter
+from services.actor_search import actor_index
+from services.synthesis_jobs import synthesis_jobs
+from services.sqs_service import sqs_service
+from services.http_clients import http_clients
+from services.google_certs import google_certs
+from services.analysis_consumer import analysis_consumer, ANALYSIS_CONSUMER_ENABLED
 
 # 라우터 임포트 - 각 도메인별로 분리된 API 엔드포인트들
 from router.script_router import router as script_router
@@ -47,20 +55,41 @@ async def lifespan(app: FastAPI):
     # 앱 시작 시 실행될 코드
     print("FastAPI 애플리케이션 시작...")
     
-    # .env 파일이 로드된 후, S3 클라이언트를 안전하게 생성
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        region_name=os.getenv("AWS_REGION", "ap-northeast-2") # 안전한 기본값 설정
-    )
+    # 공유 S3 게이트웨이의 클라이언트를 앱 상태(state)에 저장하여 어디서든 접근 가능하게 함
+    # (라우터/유틸 모두 같은 커넥션 풀과 executor 를 사용)
+    app.state.s3_client = s3_gateway.client
+
+    # 업스트림(분석/전처리 서버 등)별 공유 HTTP 클라이언트
+    http_clients.start()
+
+    # 조회수 write-behind 주기 반영 시작
+    view_counter.start()
+
+    # 배우 검색 인덱스 미리 적재 (실패해도 첫 검색 때 다시 시도)
+    try:
+        await asyncio.to_thread(actor_index.refresh)
+    except Exception as e:
+        print(f"배우 검색 인덱스 적재 실패: {e}")
     
-    # 생성된 클라이언트를 앱 상태(state)에 저장하여 어디서든 접근 가능하게 함
-    app.state.s3_client = s3_client
+    # 구글 로그인 인증서 미리 적재 (실패해도 첫 로그인 때 다시 시도)
+    try:
+        await asyncio.to_thread(google_certs.refresh)
+    except Exception as e:
+        print(f"구글 인증서 적재 실패: {e}")
+
+    # 분석 큐 소비자 (QUEUE_BACKEND=local 로 SQS 경로를 한 프로세스에서 돌릴 때 등)
+    if ANALYSIS_CONSUMER_ENABLED and os.getenv('USE_SQS_QUEUE', 'false').lower() == 'true':
+        analysis_consumer.start()
     
     yield # --- 이 지점에서 애플리케이션이 실행됨 ---
     
     # 앱 종료 시 실행될 코드 (정리 작업)
+    await view_counter.stop()   # 남은 조회수 반영
+    await synthesis_jobs.shutdown()
+    await sqs_service.publisher.stop()   # 배치에 남은 SQS 메시지 전송
+    await analysis_consumer.stop()
+    await http_clients.aclose()
+    s3_gateway.shutdown()
     print("FastAPI 애플리케이션 종료.")
 
 
@@ -89,6 +118,7 @@ app.add_middleware(
     allow_credentials=True,     # 쿠키/인증 정보 포함한 요청 허용
     allow_methods=["*"],        # 모든 HTTP 메서드 허용 (GET, POST, PUT, DELETE 등)
     allow_headers=["*"],        # 모든 헤더 허용
+    expose_headers=["X-Next-Cursor", "X-Sample-Seed"],   # keyset 커서 / 랜덤 샘플 시드
 
 )
 
@@ -0,0 +1,65 @@
+"""add user_stats table
+
+Revision ID: 3e7b9c2f4a18
+Revises: 9d3a5b7e1c64
+Create Date: 2026-10-17 16:02:47.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7b9c2f4a18'
+down_revision: Union[str, Sequence[str], None] = '9d3a5b7e1c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('practice_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('dubbed_token_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('overall_score_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('overall_score_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completion_score_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('completion_score_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # 기존 분석 결과로 초기값 채우기 (이후 재계산은 python -m services.user_stats)
+    # 숫자가 아닌 점수(예전 결과의 문자열 등)는 CAST 오류로 업그레이드가 중단되지 않도록 NULL 처리
+    op.execute("""
+        INSERT INTO user_stats (user_id, practice_count, dubbed_token_count,
+                                overall_score_sum, overall_score_count,
+                                completion_score_sum, completion_score_count, updated_at)
+        SELECT user_id,
+               COUNT(id),
+               COUNT(DISTINCT token_id),
+               COALESCE(SUM(overall), 0), COUNT(overall),
+               COALESCE(SUM(completion), 0), COUNT(completion),
+               now()
+        FROM (
+            SELECT id, user_id, token_id,
+                   CASE WHEN json_typeof(result -> 'result' -> 'overall_score') = 'number'
+                        THEN CAST(result -> 'result' ->> 'overall_score' AS FLOAT) END AS overall,
+                   COALESCE(NULLIF(CASE WHEN json_typeof(result -> 'total_score') = 'number'
+                                        THEN CAST(result ->> 'total_score' AS FLOAT) END, 0),
+                            NULLIF(CASE WHEN json_typeof(result -> 'score') = 'number'
+                                        THEN CAST(result ->> 'score' AS FLOAT) END, 0)) AS completion
+            FROM analysis_results
+            WHERE user_id IS NOT NULL
+        ) AS scored
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
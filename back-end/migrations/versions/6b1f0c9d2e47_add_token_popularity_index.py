@@ -0,0 +1,28 @@
+"""add (view_count, id) index to tokens
+
+Revision ID: 6b1f0c9d2e47
+Revises: 20acf42ceae4
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1f0c9d2e47'
+down_revision: Union[str, Sequence[str], None] = '20acf42ceae4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tokens_view_count_id', 'tokens', ['view_count', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tokens_view_count_id', table_name='tokens')
@@ -0,0 +1,61 @@
+"""add analysis_results score columns
+
+Revision ID: 7a2c5e9b1d36
+Revises: 3e7b9c2f4a18
+Create Date: 2026-10-17 17:25:13.604921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c5e9b1d36'
+down_revision: Union[str, Sequence[str], None] = '3e7b9c2f4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# services/analysis_scores.py 의 SCORE_PATHS 와 같은 경로 (앞쪽 우선)
+SCORE_PATHS = {
+    'overall_score': ("result -> 'result' -> 'overall_score'",),
+    'pitch_score': ("result -> 'result' -> 'pitch_score'", "result -> 'pitch_score'"),
+    'pronunciation_score': ("result -> 'result' -> 'pronunciation_score'", "result -> 'pronunciation_score'"),
+    'duration': ("result -> 'result' -> 'duration'", "result -> 'duration'"),
+}
+
+
+def _extract(paths) -> str:
+    # 숫자인 값만 사용 (문자열 등은 NULL)
+    cases = [f"CASE WHEN json_typeof({path}) = 'number' THEN CAST(({path}) #>> '{{}}' AS FLOAT) END"
+             for path in paths]
+    return f"COALESCE({', '.join(cases)})"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in SCORE_PATHS:
+        op.add_column('analysis_results', sa.Column(column, sa.Float(), nullable=True))
+    op.add_column('analysis_results', sa.Column('script_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('analysis_results_script_id_fkey', 'analysis_results', 'scripts',
+                          ['script_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_analysis_results_user_token_created', 'analysis_results',
+                    ['user_id', 'token_id', 'created_at'], unique=False)
+
+    # 기존 result JSON 에서 점수 백필
+    assignments = ",\n            ".join(f"{column} = {_extract(paths)}" for column, paths in SCORE_PATHS.items())
+    op.execute(f"""
+        UPDATE analysis_results
+        SET {assignments}
+        WHERE result IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analysis_results_user_token_created', table_name='analysis_results')
+    op.drop_constraint('analysis_results_script_id_fkey', 'analysis_results', type_='foreignkey')
+    op.drop_column('analysis_results', 'script_id')
+    for column in reversed(list(SCORE_PATHS)):
+        op.drop_column('analysis_results', column)
@@ -0,0 +1,50 @@
+"""add synthesis_jobs table
+
+Revision ID: 9d3a5b7e1c64
+Revises: c4e8a1d7f305
+Create Date: 2026-10-17 13:41:09.275113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3a5b7e1c64'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1d7f305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('synthesis_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('s3_key', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['token_id'], ['tokens.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_synthesis_jobs_id'), 'synthesis_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_synthesis_jobs_job_id'), 'synthesis_jobs', ['job_id'], unique=True)
+    op.create_index(op.f('ix_synthesis_jobs_token_id'), 'synthesis_jobs', ['token_id'], unique=False)
+    op.create_index(op.f('ix_synthesis_jobs_user_id'), 'synthesis_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_synthesis_jobs_user_id'), table_name='synthesis_jobs')
+    op.drop_index(op.f('ix_synthesis_jobs_token_id'), table_name='synthesis_jobs')
+    op.drop_index(op.f('ix_synthesis_jobs_job_id'), table_name='synthesis_jobs')
+    op.drop_index(op.f('ix_synthesis_jobs_id'), table_name='synthesis_jobs')
+    op.drop_table('synthesis_jobs')
@@ -0,0 +1,49 @@
+"""add token_categories table
+
+Revision ID: c4e8a1d7f305
+Revises: 6b1f0c9d2e47
+Create Date: 2026-10-17 11:03:27.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d7f305'
+down_revision: Union[str, Sequence[str], None] = '6b1f0c9d2e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('token_categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['token_id'], ['tokens.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_id', 'name', name='uq_token_category')
+    )
+    op.create_index(op.f('ix_token_categories_token_id'), 'token_categories', ['token_id'], unique=False)
+    op.create_index('ix_token_categories_name_token_id', 'token_categories', ['name', 'token_id'], unique=False,
+                    postgresql_ops={'name': 'text_pattern_ops'})
+
+    # 기존 tokens.category ('a, b') 를 쉼표로 나눠 정규화해서 채움
+    op.execute("""
+        INSERT INTO token_categories (token_id, name)
+        SELECT DISTINCT t.id, lower(btrim(c.name))
+        FROM tokens t
+        CROSS JOIN LATERAL unnest(string_to_array(t.category, ',')) AS c(name)
+        WHERE t.category IS NOT NULL AND btrim(c.name) <> ''
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_categories_name_token_id', table_name='token_categories')
+    op.drop_index(op.f('ix_token_categories_token_id'), table_name='token_categories')
+    op.drop_table('token_categories')
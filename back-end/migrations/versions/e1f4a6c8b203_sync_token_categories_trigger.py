@@ -0,0 +1,57 @@
+"""sync token_categories with a trigger on tokens
+
+Revision ID: e1f4a6c8b203
+Revises: 7a2c5e9b1d36
+Create Date: 2026-10-17 19:12:36.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f4a6c8b203'
+down_revision: Union[str, Sequence[str], None] = '7a2c5e9b1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # tokens 를 어디서 쓰든 (API, 유튜브 전처리 서버가 직접 INSERT 하는 토큰 포함) token_categories 를 DB 가 맞춘다
+    # 규칙은 services/token_categories.split_categories 와 동일: 쉼표로 나눠 앞뒤 공백 제거 + 소문자, 빈 값/중복 제외
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sync_token_categories() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM token_categories WHERE token_id = NEW.id;
+            INSERT INTO token_categories (token_id, name)
+            SELECT DISTINCT NEW.id, lower(btrim(c.name))
+            FROM unnest(string_to_array(NEW.category, ',')) AS c(name)
+            WHERE btrim(c.name) <> '';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_tokens_sync_categories
+        AFTER INSERT OR UPDATE OF category ON tokens
+        FOR EACH ROW EXECUTE FUNCTION sync_token_categories()
+    """)
+
+    # 지금까지 누락된 토큰(전처리 서버가 만든 토큰 등)까지 다시 채움
+    op.execute("DELETE FROM token_categories")
+    op.execute("""
+        INSERT INTO token_categories (token_id, name)
+        SELECT DISTINCT t.id, lower(btrim(c.name))
+        FROM tokens t
+        CROSS JOIN LATERAL unnest(string_to_array(t.category, ',')) AS c(name)
+        WHERE t.category IS NOT NULL AND btrim(c.name) <> ''
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_tokens_sync_categories ON tokens")
+    op.execute("DROP FUNCTION IF EXISTS sync_token_categories()")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, JSON, Boolean, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Text, JSON, Boolean, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -26,6 +26,11 @@ class Token(Base):
     )
     view_count = Column(Integer, nullable=False, default=0, index=True)   # ← 추가
 
+    __table_args__ = (
+        # 인기순 keyset 페이지네이션 (view_count DESC, id DESC)
+        Index("ix_tokens_view_count_id", "view_count", "id"),
+    )
+
     # 관계
     url = relationship("URL", back_populates="tokens")
     scripts = relationship("Script",
@@ -64,6 +69,29 @@ class Token(Base):
         passive_deletes=True
     )
 
+    # token_categories 는 DB 트리거(trg_tokens_sync_categories)가 category 변경 시 채운다 → 읽기 전용
+    categories = relationship(
+        "TokenCategory",
+        back_populates="token",
+        viewonly=True
+    )
+
+
+class TokenCategory(Base):
+    __tablename__ = "token_categories"  # Token.category 를 쉼표로 나눠 정규화한 카테고리 (조회용, 트리거로 동기화)
+    id       = Column(Integer, primary_key=True)
+    token_id = Column(Integer, ForeignKey("tokens.id", ondelete="CASCADE"), nullable=False, index=True)
+    name     = Column(String, nullable=False)   # 소문자 + 앞뒤 공백 제거
+
+    __table_args__ = (
+        UniqueConstraint("token_id", "name", name="uq_token_category"),
+        # 정확 일치 / 접두사(LIKE 'x%') 검색용
+        Index("ix_token_categories_name_token_id", "name", "token_id",
+              postgresql_ops={"name": "text_pattern_ops"}),
+    )
+
+    token = relationship("Token", back_populates="categories", viewonly=True)
+
 
 class URL(Base):
     __tablename__ = "urls"
@@ -246,6 +274,8 @@ class AnalysisResult(Base):
     job_id = Column(String, unique=True, index=True)
     token_id = Column(Integer, ForeignKey("tokens.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    # 문장(script) 단위 업로드일 때만 설정, 토큰 전체 업로드는 NULL
+    script_id = Column(Integer, ForeignKey("scripts.id", ondelete="SET NULL"), nullable=True)
     
     status = Column(String, nullable=False)
     progress = Column(Integer, nullable=False)
@@ -253,13 +283,40 @@ class AnalysisResult(Base):
     message = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
+    # result JSON 에서 웹훅 수신 시 추출한 점수 (services/analysis_scores.py) - 점수 조회는 JSON 대신 이 컬럼 사용
+    overall_score = Column(Float, nullable=True)
+    pitch_score = Column(Float, nullable=True)
+    pronunciation_score = Column(Float, nullable=True)
+    duration = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # 내 토큰별 결과 / 최근 결과 조회 (user_id, token_id, created_at)
+        Index("ix_analysis_results_user_token_created", "user_id", "token_id", "created_at"),
+    )
+
     # 관계
     token = relationship("Token", back_populates="analysis_results")
     user = relationship("User", back_populates="analysis_results")
-    
 
 
 
+class UserStats(Base):
+    """
+    사용자별 누적 통계 - analysis_results 가 생성/완료될 때 증분 갱신 (services/user_stats.py)
+    → 마이페이지/평균 점수 조회 시 analysis_results 를 스캔하지 않고 한 행만 읽음
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    practice_count = Column(Integer, nullable=False, default=0, server_default="0")          # 분석 결과 개수
+    dubbed_token_count = Column(Integer, nullable=False, default=0, server_default="0")      # 더빙한 토큰 수 (중복 제외)
+    overall_score_sum = Column(Float, nullable=False, default=0, server_default="0")         # result.result.overall_score 합
+    overall_score_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completion_score_sum = Column(Float, nullable=False, default=0, server_default="0")      # total_score (없으면 score) 합
+    completion_score_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class Bookmark(Base):
     """
     북마크 테이블 - id를 primary key로 하고 (user_id, token_id)는 unique constraint
@@ -322,6 +379,22 @@ class DubbingResult(Base):
 
 
 
+class SynthesisJob(Base):
+    __tablename__ = "synthesis_jobs"   # 비동기 더빙 합성 작업
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_id = Column(Integer, ForeignKey("tokens.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    status = Column(String, nullable=False)    # queued, processing, completed, failed
+    progress = Column(Integer, nullable=False) # 0-100
+    message = Column(String, nullable=True)
+    s3_key = Column(String, nullable=True)     # 완료 시 합성 결과 S3 키
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class VideoRequest(Base):
     __tablename__ = "video_requests"
 
@@ -1,14 +1,14 @@
 # 배우 관련 API 엔드포인트들을 관리하는 라우터
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, desc
 from sqlalchemy.orm import Session
 from typing import List
 
 # 데이터베이스 관련 임포트
 from database import get_db
-from models import Token, Actor, TokenActor, ActorAlias
+from models import Token, Actor, TokenActor
 from schemas import Actor as ActorSchema, ActorCreate
 from schemas import Token as TokenSchema
+from services.actor_search import actor_index
 
 # APIRouter 인스턴스 생성
 router = APIRouter(
@@ -33,6 +33,7 @@ def create_actor(actor: ActorCreate, db: Session = Depends(get_db)):
     db.add(db_actor)
     db.commit()
     db.refresh(db_actor)
+    actor_index.invalidate()  # 새 배우를 검색 인덱스에 반영
     return db_actor
 
 # 모든 배우 조회 API
@@ -57,47 +58,14 @@ def search_actors(
 ):
     """
     배우 이름 유사 검색 (한글/영어 모두 지원)
-    """
-    q = query.strip()
-    if not q:
-        return []
-
-    # 1) 부분 일치(alias.name ilike)
-    alias_q = (
-        db.query(ActorAlias.actor_id)
-          .filter(ActorAlias.name.ilike(f"%{q}%"))
-          .limit(limit)
-          .subquery()
-    )
-    actor_ids = [row[0] for row in db.query(alias_q).all()]
-
-    # 2) 트라이그램 유사도 보정 (similarity > SIM_TH)
-    if len(actor_ids) < limit:
-        extra = (
-            db.query(ActorAlias.actor_id)
-              .filter(func.similarity(ActorAlias.name, q) > SIM_TH)
-              .order_by(desc(func.similarity(ActorAlias.name, q)))
-              .limit(limit - len(actor_ids))
-              .all()
-        )
-        actor_ids.extend(r[0] for r in extra)
 
-    if not actor_ids:
-        return []
-
-    # 3) Actor 테이블에서 id, name 조회
-    actors = (
-        db.query(Actor)
-          .filter(Actor.id.in_(actor_ids))
-          .all()
-    )
-    return actors
+    부분 일치 → 트라이그램 유사도 순. 인메모리 별칭 인덱스에서 바로 응답한다.
+    """
+    return actor_index.search(query, limit, db)
 
 
 
 # 배우별 영화 조회 API - TokenActor 관계 테이블을 통해 조회
-SIM_TH = 0.25                # 유사도 임계값 조정 가능
-
 @router.get("/{query}", response_model=List[TokenSchema])
 def read_tokens_by_actor(
     query: str,
@@ -107,34 +75,12 @@ def read_tokens_by_actor(
     """
     배우별 영화 조회, 검색용(영어, 한글 가능)
     """
-    q = query.strip()
-    if not q:
-        return []
-
-    # ── 1) 별칭 테이블 1차 매치 (부분 일치, 대소문자·한영 모두)
-    alias_rows = (
-        db.query(ActorAlias.actor_id)
-          .filter(ActorAlias.name.ilike(f"%{q}%"))
-          .limit(10)
-          .all()
-    )
-    actor_ids = [row[0] for row in alias_rows]
-
-    # ── 2) 오타 보정 매치 (pg_trgm)
-    if len(actor_ids) < 10:
-        extra = (
-            db.query(ActorAlias.actor_id)
-              .filter(func.similarity(ActorAlias.name, q) > SIM_TH)
-              .order_by(desc(func.similarity(ActorAlias.name, q)))
-              .limit(10 - len(actor_ids))
-              .all()
-        )
-        actor_ids.extend(row[0] for row in extra)
-
+    # ── 1) 별칭 인덱스에서 배우 후보 (부분 일치 + 오타 보정, DB 조회 없음)
+    actor_ids = actor_index.search_ids(query, 10, db)
     if not actor_ids:
         return []
 
-    # ── 3) 토큰 조회
+    # ── 2) 토큰 조회
     tokens = (
         db.query(Token)
           .join(TokenActor, TokenActor.token_id == Token.id)
@@ -143,5 +89,3 @@ def read_tokens_by_actor(
           .all()
     )
     return tokens
-
-
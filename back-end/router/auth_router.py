@@ -17,13 +17,13 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import User
 from schemas import GoogleLoginRequest, AuthToken, UserResponse
+from services.principal_cache import principal_cache, Principal
+from services.google_certs import google_certs
 
 # 라우터 인스턴스 생성
 router = APIRouter(
@@ -99,19 +99,28 @@ def verify_token(token: str) -> dict:
         )
 
 
+def resolve_principal(payload: dict) -> Optional[Principal]:
+    """토큰 페이로드의 sub(user id) 로 사용자 스냅샷 조회 (principal_cache, 미스일 때만 DB 조회)"""
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+    return principal_cache.get(user_id)
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
     현재 인증된 사용자를 반환합니다.
     
+    매 요청마다 users 테이블을 조회하지 않도록 짧은 TTL 의 사용자 스냅샷 캐시를 사용합니다.
+    
     Args:
         credentials: HTTP Authorization Bearer 토큰
-        db: 데이터베이스 세션
     
     Returns:
-        User: 현재 사용자 모델
+        Principal: 현재 사용자 스냅샷 (User 모델과 같은 속성 이름)
     
     Raises:
         HTTPException: 인증에 실패한 경우
@@ -119,15 +128,14 @@ def get_current_user(
     token = credentials.credentials
     payload = verify_token(token)
     
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="토큰에서 사용자 정보를 찾을 수 없습니다",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = resolve_principal(payload)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -174,12 +182,8 @@ async def google_login(
                 detail="구글 OAuth2 설정이 필요합니다. GOOGLE_CLIENT_ID 환경변수를 설정해주세요."
             )
         
-        # 구글 id_token 검증
-        idinfo = id_token.verify_oauth2_token(
-            google_request.id_token, 
-            requests.Request(), 
-            GOOGLE_CLIENT_ID
-        )
+        # 구글 id_token 검증 (캐시된 구글 인증서로 오프라인 검증, 로그인마다 외부 호출 없음)
+        idinfo = google_certs.verify(google_request.id_token, GOOGLE_CLIENT_ID)
         
         # 구글 계정 정보 추출
         google_id = idinfo['sub']
@@ -218,6 +222,8 @@ async def google_login(
         
         db.commit()
         db.refresh(user)
+        # 프로필이 바뀌었을 수 있으므로 캐시된 사용자 스냅샷 교체
+        principal_cache.put(Principal.from_user(user))
         
         # JWT 액세스 토큰 생성
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -5,11 +5,13 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select, delete, func, desc
+from sqlalchemy import func
 
 from database import get_db
 from router.auth_router import get_current_user
 from models import Bookmark, Token, User, AnalysisResult, Script
+from services.mypage_overview import mypage_overview_cache, dubbed_tokens_query, to_dubbed_token_response
+from services.user_stats import refresh_user_stats
 from schemas import (
     BookmarkCreate, BookmarkOut, BookmarkListOut, TokenInfo,
     MyDubbedTokenResponse, TokenAnalysisStatusResponse, 
@@ -66,6 +68,7 @@ def create_bookmark(
             detail=f"Already bookmarked - IntegrityError: {str(e)}",
         )
     db.refresh(bm)
+    mypage_overview_cache.invalidate(current_user.id)
     return bm
 
 
@@ -97,6 +100,7 @@ def delete_bookmark(
     db.delete(bookmark)
     try:
         db.commit()
+        mypage_overview_cache.invalidate(current_user.id)
         return {
             "status": "success",
             "message": "북마크가 성공적으로 삭제되었습니다."
@@ -183,43 +187,9 @@ def get_my_dubbed_tokens(
     현재 로그인한 유저가 더빙한 토큰들의 목록을 반환합니다.
     각 토큰별로 마지막 더빙 시간, 전체 스크립트 수, 완료된 스크립트 수를 포함합니다.
     """
-    # 내가 더빙한 토큰들 조회 (현재 DB 구조에 맞게 수정)
-    subquery = (
-        db.query(
-            Token.id.label('token_id'),
-            Token.token_name,
-            Token.actor_name, 
-            Token.category,
-            Token.youtube_url, # youtube_url 추가
-            func.max(AnalysisResult.created_at).label('last_dubbed_at'),
-            func.count(func.distinct(Script.id)).label('total_scripts'),
-            func.count(AnalysisResult.id).label('completed_scripts')
-        )
-        .join(AnalysisResult, AnalysisResult.token_id == Token.id)
-        .join(Script, Script.token_id == Token.id)
-        .filter(AnalysisResult.user_id == current_user.id)
-        .group_by(Token.id, Token.token_name, Token.actor_name, Token.category, Token.youtube_url) # youtube_url 추가
-        .order_by(desc('last_dubbed_at'))
-        .limit(limit)
-        .offset(offset)
-        .all()
-    )
-    
-    # 결과 변환
-    results = []
-    for row in subquery:
-        results.append(MyDubbedTokenResponse(
-            token_id=row.token_id,
-            token_name=row.token_name,
-            actor_name=row.actor_name,
-            category=row.category,
-            youtube_url=row.youtube_url, # youtube_url 추가
-            last_dubbed_at=row.last_dubbed_at,
-            total_scripts=row.total_scripts,
-            completed_scripts=row.completed_scripts
-        ))
-    
-    return results
+    # 내가 더빙한 토큰들 조회 (토큰별로 먼저 집계 후 조인)
+    rows = dubbed_tokens_query(db, current_user.id).limit(limit).offset(offset).all()
+    return [to_dubbed_token_response(row) for row in rows]
 
 
 @router.get(
@@ -305,8 +275,10 @@ def delete_my_token_results(
         )
         .delete(synchronize_session=False)
     )
+    refresh_user_stats(db, [current_user.id])
     
     db.commit()
+    mypage_overview_cache.invalidate(current_user.id)
     
     if deleted_count == 0:
         raise HTTPException(
@@ -349,106 +321,7 @@ def get_mypage_overview(
         updated_at=current_user.updated_at
     )
     
-    # 2. 북마크 개수
-    total_bookmarks = db.query(func.count(Bookmark.token_id)).filter(
-        Bookmark.user_id == current_user.id
-    ).scalar() or 0
-    
-    # 3. 더빙한 토큰 개수 (중복 제거) - 현재 DB 구조에 맞게 수정
-    total_dubbed_tokens = db.query(
-        func.count(func.distinct(AnalysisResult.token_id))
-    ).filter(AnalysisResult.user_id == current_user.id).scalar() or 0
-    
-    # 4. 총 연습 횟수 (분석 결과 개수)
-    total_practice_count = db.query(func.count(AnalysisResult.id)).filter(
-        AnalysisResult.user_id == current_user.id
-    ).scalar() or 0
+    # 2~7. 개수/평균(SQL 집계) + 최근 목록(5개씩) — 사용자별 캐시
+    overview = mypage_overview_cache.get(db, current_user.id)
     
-    # 5. 평균 완성도 계산 (JSON에서 점수 추출)
-    analysis_results = db.query(AnalysisResult.result).filter(
-        AnalysisResult.user_id == current_user.id,
-        AnalysisResult.result.isnot(None)
-    ).all()
-    
-    total_score = 0
-    score_count = 0
-    for result in analysis_results:
-        if result.result and isinstance(result.result, dict):
-            # result JSON에서 점수 추출 (구조에 따라 조정 필요)
-            score = result.result.get('total_score') or result.result.get('score', 0)
-            if score:
-                total_score += float(score)
-                score_count += 1
-    
-    average_completion_rate = (total_score / score_count) if score_count > 0 else 0.0
-    
-    # 6. 최근 북마크 목록 (5개)
-    recent_bookmarks_query = (
-        db.query(Bookmark)
-        .options(joinedload(Bookmark.token))
-        .filter(Bookmark.user_id == current_user.id)
-        .order_by(Bookmark.created_at.desc())
-        #.limit(5)
-        .all()
-    )
-    
-    recent_bookmarks = []
-    for bookmark in recent_bookmarks_query:
-        recent_bookmarks.append(BookmarkListOut(
-            id=bookmark.id,  # 실제 ID 사용
-            user_id=bookmark.user_id,
-            token_id=bookmark.token_id,
-            created_at=bookmark.created_at,
-            token=TokenInfo(
-                id=bookmark.token.id,
-                token_name=bookmark.token.token_name,
-                actor_name=bookmark.token.actor_name,
-                category=bookmark.token.category,
-                thumbnail_url=getattr(bookmark.token, 'thumbnail_url', None),
-                youtube_url=getattr(bookmark.token, 'youtube_url', None)  # youtube_url 추가
-            )
-        ))
-    
-    # 7. 최근 더빙한 토큰 목록 (5개) - 현재 DB 구조에 맞게 수정
-    recent_dubbed_query = (
-        db.query(
-            Token.id.label('token_id'),
-            Token.token_name,
-            Token.actor_name, 
-            Token.category,
-            Token.youtube_url, # youtube_url 추가
-            func.max(AnalysisResult.created_at).label('last_dubbed_at'),
-            func.count(func.distinct(Script.id)).label('total_scripts'),
-            func.count(AnalysisResult.id).label('completed_scripts')
-        )
-        .join(AnalysisResult, AnalysisResult.token_id == Token.id)
-        .join(Script, Script.token_id == Token.id)
-        .filter(AnalysisResult.user_id == current_user.id)
-        .group_by(Token.id, Token.token_name, Token.actor_name, Token.category, Token.youtube_url) # youtube_url 추가
-        .order_by(desc('last_dubbed_at'))
-        #.limit(5)
-        .all()
-    )
-    
-    recent_dubbed_tokens = []
-    for row in recent_dubbed_query:
-        recent_dubbed_tokens.append(MyDubbedTokenResponse(
-            token_id=row.token_id,
-            token_name=row.token_name,
-            actor_name=row.actor_name,
-            category=row.category,
-            youtube_url=row.youtube_url, # youtube_url 추가
-            last_dubbed_at=row.last_dubbed_at,
-            total_scripts=row.total_scripts,
-            completed_scripts=row.completed_scripts
-        ))
-    
-    return MyPageOverviewResponse(
-        user_info=user_info,
-        total_bookmarks=total_bookmarks,
-        total_dubbed_tokens=total_dubbed_tokens,
-        total_practice_count=total_practice_count,
-        average_completion_rate=round(average_completion_rate, 2),
-        recent_bookmarks=recent_bookmarks,
-        recent_dubbed_tokens=recent_dubbed_tokens
-    )
+    return MyPageOverviewResponse(user_info=user_info, **overview)
@@ -8,6 +8,7 @@ from database import get_db
 from models import AnalysisResult, User
 from schemas import TokenScore, UserScore, LeaderboardResponse, TopUser
 from router.auth_router import get_current_user
+from services.user_stats import get_user_stats, average
 
 
 router = APIRouter(prefix="/score", tags=["score"])
@@ -25,18 +26,14 @@ def get_my_token_score(
 ) -> TokenScore:
     """
     특정 토큰에 대한 현재 유저의 평균 점수를 계산합니다.
-    스크립트별 분석 결과들의 overall_score 평균을 반환합니다.
+    스크립트별 분석 결과들의 overall_score 평균을 반환합니다. (토큰 전체 업로드 결과는 제외)
+    (ix_analysis_results_user_token_created 인덱스 + overall_score 컬럼 사용, JSON 파싱 없음)
     """
-    # 해당 토큰의 스크립트들에 대한 내 분석 결과 평균 계산
-    from models import Script
-    
     stmt = (
-        select(func.avg(
-            (AnalysisResult.result["result"]["overall_score"]).as_float()
-        ))
-        .join(Script, AnalysisResult.script_id == Script.id)
-        .where(Script.token_id == token_id)
+        select(func.avg(AnalysisResult.overall_score))
         .where(AnalysisResult.user_id == current_user.id)
+        .where(AnalysisResult.token_id == token_id)
+        .where(AnalysisResult.script_id.isnot(None))
     )
     avg_score: Optional[float] = db.execute(stmt).scalar()
     
@@ -60,14 +57,12 @@ def get_my_overall_average_score(
 ) -> UserScore:
     """
     현재 유저의 모든 분석 결과에 대한 전체 평균 점수를 계산합니다.
+    (분석 완료 시 갱신되는 user_stats 의 합계/개수로 계산)
     """
-    stmt = (
-        select(func.avg(
-            (AnalysisResult.result["result"]["overall_score"]).as_float()
-        ))
-        .where(AnalysisResult.user_id == current_user.id)
+    stats = get_user_stats(db, current_user.id)
+    avg_score: Optional[float] = (
+        average(stats.overall_score_sum, stats.overall_score_count) if stats else None
     )
-    avg_score: Optional[float] = db.execute(stmt).scalar()
 
     if avg_score is None:
         raise HTTPException(
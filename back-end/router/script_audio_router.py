@@ -1,17 +1,25 @@
 # router/script_audio_router.py
-import os, logging, asyncio, json, io, httpx
+import os, logging, json, httpx
 from uuid import uuid4
-from concurrent.futures import ThreadPoolExecutor
 from fastapi import (
     APIRouter, Path, UploadFile, File, Request,
     BackgroundTasks, Depends, HTTPException
 )
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
-from database import get_db, SessionLocal
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, SessionLocal, AsyncSessionLocal
 from models import Script, AnalysisResult, User
 from schemas import ScriptUser, ScriptWordUser      # ★ Pydantic 스키마
 from router.auth_router import get_current_user     # 인증 함수 import
+from services.s3_gateway import s3_gateway
+from services.http_clients import http_clients
+from services.mypage_overview import mypage_overview_cache
+from services.user_stats import record_practice, record_result
+from services.analysis_scores import extract_scores
+from services.upstream_guard import upstream_guards, UpstreamUnavailable, RETRYABLE_STATUS
+from services.progress_bus import progress_bus, job_event_stream
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -25,25 +33,19 @@ security = HTTPBearer(auto_error=False)  # auto_error=False로 설정
 
 def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
 ) -> Optional[User]:
     """
     선택적 인증: 토큰이 있으면 사용자 반환, 없으면 None 반환
+    (get_current_user 와 같은 사용자 스냅샷 캐시 사용)
     """
     if not credentials:
         return None
     
     try:
-        from router.auth_router import verify_token
+        from router.auth_router import verify_token, resolve_principal
         token = credentials.credentials
         payload = verify_token(token)
-        
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
+        return resolve_principal(payload)
     except:
         return None
 
@@ -79,41 +81,64 @@ async def cleanup_anonymous_results():
     finally:
         db.close()
 
-# ────────────── DB 헬퍼 ──────────────
-def create_script_result(db: Session, job_id: str, token_id: int , user_id: int = None):
+# ────────────── DB 헬퍼 (비동기 세션) ──────────────
+async def create_script_result(db: AsyncSession, job_id: str, token_id: int , user_id: int = None, script_id: int = None):
 
     ar = AnalysisResult(
         job_id=job_id, 
         token_id=token_id,
         user_id=user_id,
-        # script_id=script_id,
+        script_id=script_id,
         status="processing", 
         progress=10, 
         message="업로드 시작"
     )
 
-    db.add(ar); 
-    db.commit(); 
-    db.refresh(ar); 
+    await record_practice(db, user_id, token_id)   # 연습 횟수 / 더빙 토큰 수 (같은 트랜잭션)
+    db.add(ar)
+    await db.commit()
+    await db.refresh(ar)
+    mypage_overview_cache.invalidate(user_id)   # 연습 횟수 변경
     return ar
 
-def update_script_result(db: Session, job_id: str, **kw):
-    ar = db.query(AnalysisResult).filter_by(job_id=job_id).first()
+def script_progress_snapshot(ar: AnalysisResult) -> dict:
+    return {
+        "job_id":   ar.job_id,
+        "status":   ar.status,
+        "progress": ar.progress,
+        "message":  ar.message,
+        "result":   ar.result,
+    }
+
+async def update_script_result(db: AsyncSession, job_id: str, **kw):
+    # 결과를 쓰는 경우: 점수 증감을 계산할 이전 결과를 DB 에서 잠가서 다시 읽음 (세션에 캐시된 값 사용 X)
+    ar = await get_script_result(db, job_id, for_update="result" in kw)
     if ar:
+        if "result" in kw:
+            await record_result(db, ar.user_id, ar.result, kw["result"])
+            kw = {**kw, **extract_scores(kw["result"])}   # 점수 컬럼도 함께 저장
         for k, v in kw.items(): setattr(ar, k, v)
-        db.commit(); db.refresh(ar)
+        await db.commit(); await db.refresh(ar)
+        progress_bus.publish(job_id, script_progress_snapshot(ar))   # SSE 구독자에게 push
+        if "result" in kw:
+            mypage_overview_cache.invalidate(ar.user_id)   # 평균 점수 변경
     return ar
 
-def get_script_result(db: Session, job_id: str):
-    return db.query(AnalysisResult).filter_by(job_id=job_id).first()
+async def get_script_result(db: AsyncSession, job_id: str, for_update: bool = False):
+    stmt = select(AnalysisResult).filter_by(job_id=job_id)
+    if for_update:
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    res = await db.execute(stmt)
+    return res.scalars().first()
 
 # ────────────── ScriptUser 빌더 ──────────────
-def build_script_user(db: Session, script_id: int) -> ScriptUser:
-    script: Script = (
-        db.query(Script)
-          .options(joinedload(Script.words))
-          .filter_by(id=script_id).first()
+async def build_script_user(db: AsyncSession, script_id: int) -> ScriptUser:
+    res = await db.execute(
+        select(Script)
+          .options(selectinload(Script.words))
+          .filter_by(id=script_id)
     )
+    script: Script = res.scalars().first()
     if not script:
         raise HTTPException(404, "Script not found")
 
@@ -129,30 +154,20 @@ def build_script_user(db: Session, script_id: int) -> ScriptUser:
     return ScriptUser(id=script.id, words=words)
 
 # ────────────── 비동기 유틸 ──────────────
-async def upload_to_s3_async(s3_client, file_bytes: bytes, filename: str, user_id: Optional[str], token_id: int, script_id: int) -> str:
-    def _sync():
-        # 파일 확장자 추출, 없으면 'mp3' 기본 사용
-        file_extension = filename.split('.')[-1] if '.' in filename else 'mp3'
-        
-        # 로그인 사용자인 경우 user_id, token_id, script_id로 키 생성
-        if user_id:
-            key = f"user_audio/{user_id}/{token_id}/{script_id}.{file_extension}"
-        # 익명 사용자인 경우 기존 방식대로 랜덤 키 생성
-        else:
-            key = f"audio/{uuid4().hex}_{filename}"
-        
-        # S3에 파일 업로드 (덮어쓰기)
-        s3_client.upload_fileobj(
-            io.BytesIO(file_bytes), 
-            S3_BUCKET, 
-            key,
-            ExtraArgs={'ContentType': 'audio/mpeg'} # ContentType 명시
-        )
-        return key
-
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as ex:
-        return await loop.run_in_executor(ex, _sync)
+async def upload_to_s3_async(s3_client, fileobj, filename: str, user_id: Optional[str], token_id: int, script_id: int) -> str:
+    # 파일 확장자 추출, 없으면 'mp3' 기본 사용
+    file_extension = filename.split('.')[-1] if '.' in filename else 'mp3'
+    
+    # 로그인 사용자인 경우 user_id, token_id, script_id로 키 생성
+    if user_id:
+        key = f"user_audio/{user_id}/{token_id}/{script_id}.{file_extension}"
+    # 익명 사용자인 경우 기존 방식대로 랜덤 키 생성
+    else:
+        key = f"audio/{uuid4().hex}_{filename}"
+    
+    # S3에 파일 스트리밍 업로드 (덮어쓰기, 공유 S3 executor 사용)
+    await s3_gateway.upload_stream(fileobj, S3_BUCKET, key, content_type='audio/mpeg', client=s3_client)
+    return key
 
 async def send_analysis_async(s3_url: str, script_obj: ScriptUser,
                               webhook_url: str, job_id: str):
@@ -168,14 +183,15 @@ async def send_analysis_async(s3_url: str, script_obj: ScriptUser,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
+        async with upstream_guards.get("analysis").slot():
+            resp = await http_clients.get("analysis").post(
                 url=TARGET_URL,
                 data=form_data,  # ★ json=X, data=O
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=httpx.Timeout(30.0, connect=5.0),
             )
             resp.raise_for_status()
-            logging.info(f"[분석 요청 성공] job_id={job_id}")
+        logging.info(f"[분석 요청 성공] job_id={job_id}")
     except httpx.HTTPError as e:
         logging.error(f"[분석 요청 실패] job_id={job_id} - {e}")
         raise
@@ -209,46 +225,53 @@ async def upload_script_audio(
     script_id: int = Path(...),
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(get_current_user_optional),  # 🔓 선택적 인증
 ):
-    script = db.query(Script).filter_by(id=script_id).first()
+    script = await db.get(Script, script_id)
 
     if not script:
         raise HTTPException(404, "Script not found")
 
     # ScriptUser 객체로 직렬화
-    script_obj = build_script_user(db, script_id)
+    script_obj = await build_script_user(db, script_id)
 
     # S3·분석 비동기 파이프라인
     s3_client   = request.app.state.s3_client
     job_id      = uuid4().hex
-    file_bytes  = await file.read()
+    spooled     = await s3_gateway.spool(file)   # 청크 단위로 임시 파일에 복사
+    filename    = file.filename
 
     # 로그인한 사용자가 있으면 user_id 저장, 없으면 None
     user_id = current_user.id if current_user else None
-    create_script_result(db, job_id, token_id=script.token_id, user_id=user_id)
+    await create_script_result(db, job_id, token_id=script.token_id, user_id=user_id, script_id=script_id)
 
     async def bg_work(client_, user_id_, token_id_, script_id_):
-        bg_db = SessionLocal()
+        bg_db = AsyncSessionLocal()
         try:
-            update_script_result(bg_db, job_id, progress=40, message="S3 업로드")
-            key   = await upload_to_s3_async(client_, file_bytes, file.filename, user_id_, token_id_, script_id_)
+            await update_script_result(bg_db, job_id, progress=40, message="S3 업로드")
+            key   = await upload_to_s3_async(client_, spooled, filename, user_id_, token_id_, script_id_)
             s3url = f"s3://{S3_BUCKET}/{key}"
 
-            update_script_result(bg_db, job_id, progress=70, message="분석 서버 호출")
+            await update_script_result(bg_db, job_id, progress=70, message="분석 서버 호출")
             cb    = f"{WEBHOOK_URL}?job_id={job_id}"
             await send_analysis_async(s3url, script_obj, cb, job_id)
 
             # 웹훅 대기 상태로 설정
-            update_script_result(bg_db, job_id, progress=90, message="분석 중…")
+            await update_script_result(bg_db, job_id, progress=90, message="분석 중…")
                 
+        except UpstreamUnavailable as e:
+            # 분석 서버 과부하/장애 → 클라이언트가 다시 시도
+            logging.warning(e)
+            await update_script_result(bg_db, job_id, status=RETRYABLE_STATUS,
+                                 message=str(e), progress=0)
         except Exception as e:
             logging.error(e)
-            update_script_result(bg_db, job_id, status="failed",
+            await update_script_result(bg_db, job_id, status="failed",
                                  message=str(e), progress=0)
         finally:
-            bg_db.close()
+            spooled.close()
+            await bg_db.close()
 
     background_tasks.add_task(bg_work, s3_client, user_id, script.token_id, script_id)
     return {"message": "업로드 완료, 분석 시작",
@@ -256,7 +279,7 @@ async def upload_script_audio(
 
 # 2) 분석 서버 웹훅
 @router.post("/webhook/analysis-complete")
-async def analysis_webhook(request: Request, db: Session = Depends(get_db)):
+async def analysis_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     # 웹훅 호출 로깅 추가
     logging.info("=" * 50)
     logging.info("[🔔 웹훅 호출됨] Scripts 분석 결과 웹훅 수신")
@@ -275,7 +298,7 @@ async def analysis_webhook(request: Request, db: Session = Depends(get_db)):
     logging.info(f"[웹훅 데이터] 결과 키들: {list(payload.keys()) if isinstance(payload, dict) else 'Not dict'}")
     
     # 분석 완료 상태로 업데이트
-    analysis_result = update_script_result(db, job_id, status="completed",
+    analysis_result = await update_script_result(db, job_id, status="completed",
                          progress=100, result=payload, message="분석 완료")
     
     logging.info(f"[✅ 웹훅 처리 완료] job_id={job_id}")
@@ -284,8 +307,8 @@ async def analysis_webhook(request: Request, db: Session = Depends(get_db)):
 
 # 3) 결과 조회
 @router.get("/analysis-result/{job_id}")
-def get_result(job_id: str, db: Session = Depends(get_db)):
-    r = get_script_result(db, job_id)
+async def get_result(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    r = await get_script_result(db, job_id)
     if not r:
         raise HTTPException(404, "결과가 없습니다.")
     return {
@@ -335,37 +358,16 @@ async def manual_cleanup_anonymous_results():
 #                                       "Access-Control-Allow-Origin":"*"})
 @router.get("/analysis-progress/{job_id}")
 async def stream_progress(job_id: str, request: Request):
-    async def gen():
-        max_runtime = 30
-        start_time = datetime.utcnow()
-
-        while True:
-            if await request.is_disconnected():
-                print(f"[SSE] 연결 종료 감지됨: job_id={job_id}")
-                break
-            db = SessionLocal()
-            try:
-                r = get_script_result(db, job_id)
-                if not r:
-                    yield "data: {\"error\":\"Job not found\"}\n\n"
-                    break
-                data = {
-                    "job_id":   r.job_id,
-                    "status":   r.status,
-                    "progress": r.progress,
-                    "message":  r.message,
-                    "result":   r.result,
-                }
-                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                if r.status in ("completed", "failed"):
-                    break
-                if (datetime.utcnow() - start_time).total_seconds() > max_runtime:
-                    print(f"[SSE] SSE 타임아웃 종료: job_id={job_id}")
-                    break
-            finally:
-                db.close()
-            await asyncio.sleep(1)
-    return StreamingResponse(gen(), media_type="text/event-stream",
+    # DB 폴링 대신 진행 상황 버스 구독 (접속 시 1회만 DB 조회)
+    async def load_snapshot():
+        async with AsyncSessionLocal() as db:
+            r = await get_script_result(db, job_id)
+            return script_progress_snapshot(r) if r else None
+
+    gen = job_event_stream(job_id, load_snapshot,
+                           is_disconnected=request.is_disconnected,
+                           max_runtime=30)
+    return StreamingResponse(gen, media_type="text/event-stream",
                              headers={"Cache-Control":"no-cache",
                                       "Connection":"keep-alive",
                                       "Access-Control-Allow-Origin":"*"})
@@ -1,23 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
 from models import User
+from schemas import SynthesisJobResponse
 from router.auth_router import get_current_user
 from router.utils_s3 import generate_presigned_url
-from utils.synthesize import run_synthesis_async
+from services.progress_bus import job_event_stream
+from services.synthesis_jobs import synthesis_jobs, get_synthesis_job, synthesis_progress_snapshot
+from utils.audio_encoder import normalize_output
 
 router = APIRouter(tags=["synthesize"])
 
 @router.post("/synthesize/{token_id}")
 async def synthesize_audio_endpoint(
     token_id: int,
+    mode: str = "sync",
+    output_format: Optional[str] = Query(None, alias="format"),
+    bitrate: Optional[str] = None,
     current_user: User = Depends(get_current_user),
 ):
+    """
+    사용자 더빙 음성 합성
+
+    - **mode**: sync (완료까지 대기 후 URL 반환, 기본값) / async (job_id 를 바로 반환,
+      /synthesize/jobs/{job_id} 또는 /synthesize/jobs/{job_id}/progress 로 진행 상황 확인)
+    - **format**: 결과 파일 포맷 wav / mp3 / aac / opus (기본값: 서버 설정, wav)
+    - **bitrate**: 압축 포맷 비트레이트 (예: 96k, 128k)
+    """
     user_id = current_user.id
 
     try:
-        # 1. 비동기 합성 함수 호출
-        s3_key = await run_synthesis_async(token_id, user_id)
+        output_format, bitrate = normalize_output(output_format, bitrate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    options = {"output_format": output_format, "bitrate": bitrate}
+
+    if mode == "async":
+        job_id = await synthesis_jobs.submit(token_id, user_id, **options)
+        return {
+            "status": "accepted",
+            "message": "합성 작업이 등록되었습니다.",
+            "job_id": job_id,
+        }
+    if mode != "sync":
+        raise HTTPException(status_code=400, detail="mode 는 sync 또는 async 여야 합니다.")
+
+    try:
+        # 1. 합성 (전용 풀 / 동시 작업 수 제한 적용)
+        s3_key = await synthesis_jobs.run_inline(token_id, user_id, **options)
 
         # 2. Pre-signed URL 생성 (동기 함수, 매우 빠르므로 그냥 호출)
         presigned_url = generate_presigned_url(s3_key)
@@ -31,3 +63,31 @@ async def synthesize_audio_endpoint(
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"합성 중 오류 발생: {e}")
+
+
+# 비동기 합성 작업 상태 조회 (폴링용)
+@router.get("/synthesize/jobs/{job_id}", response_model=SynthesisJobResponse)
+async def get_synthesis_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await get_synthesis_job(db, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(404, "합성 작업을 찾을 수 없습니다.")
+    return SynthesisJobResponse(**synthesis_progress_snapshot(job))
+
+
+# 비동기 합성 작업 SSE 진행 스트림
+@router.get("/synthesize/jobs/{job_id}/progress")
+async def stream_synthesis_progress(job_id: str):
+    # DB 폴링 대신 진행 상황 버스 구독 (접속 시 1회만 DB 조회)
+    async def load_snapshot():
+        async with AsyncSessionLocal() as db:
+            job = await get_synthesis_job(db, job_id)
+            return synthesis_progress_snapshot(job) if job else None
+
+    return StreamingResponse(job_event_stream(job_id, load_snapshot), media_type="text/event-stream",
+                             headers={"Cache-Control":"no-cache",
+                                      "Connection":"keep-alive",
+                                      "Access-Control-Allow-Origin":"*"})
@@ -1,15 +1,24 @@
 # 영화 관련 API 엔드포인트들을 관리하는 라우터
-from fastapi import APIRouter, Depends, HTTPException, Path, Request
-from sqlalchemy import update, func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
 
-from database import get_db
-from models import Token, Actor, TokenActor, User, DubbingResult
-from schemas import Token as TokenSchema, TokenCreate, TokenDetail, ViewCountResponse, AudioURL, UserAudioResponse, DubbingUrlResponse
-from .utils_s3 import load_json, presign
+from database import get_db, get_async_db
+from models import Token, TokenActor, User, DubbingResult, Script, AnalysisResult
+from schemas import Token as TokenSchema, CategoryCount, TokenCreate, TokenDetail, ViewCountResponse, AudioURL, UserAudioResponse, DubbingUrlResponse
+from .utils_s3 import presign
 from router.auth_router import get_current_user
+from services.pitch_cache import pitch_cache
+from services.s3_gateway import s3_gateway
+from services.view_counter import view_counter
+from services.token_ranking import popularity_ranking, encode_cursor, decode_cursor
+from services.token_sampler import token_sampler
+from services.token_categories import category_match, category_counts
+from services.user_stats import refresh_user_stats
+from services.mypage_overview import mypage_overview_cache
 
 # ────────────── S3 설정 ──────────────
 S3_BUCKET = os.getenv("S3_BUCKET_NAME")
@@ -30,6 +39,7 @@ def create_token(token: TokenCreate, db: Session = Depends(get_db)):
     db.add(db_token)  # 데이터베이스 세션에 추가
     db.commit()  # 변경사항 커밋 (실제 DB에 저장)
     db.refresh(db_token)  # 저장된 데이터를 다시 불러와서 ID 등 업데이트
+    token_sampler.invalidate()  # 싱크 컬렉션 후보 풀 갱신
     return db_token
 
 # 모든 영화 조회 API - 페이지네이션 지원
@@ -45,36 +55,62 @@ def read_tokens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return tokens
 
 @router.get("/latest/", response_model=List[TokenSchema])
-def read_latest_tokens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_latest_tokens(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """
     최신순으로 정렬된 토큰 목록을 조회합니다.
     
     - **skip**: 건너뛸 항목 수 (기본값: 0)
     - **limit**: 가져올 최대 항목 수 (기본값: 100)
+    - **cursor**: 이전 응답의 X-Next-Cursor 헤더 값 (지정 시 skip 대신 keyset 페이지네이션)
     """
-    tokens = db.query(Token).order_by(Token.id.desc()).offset(skip).limit(limit).all()
+    query = db.query(Token).order_by(Token.id.desc())
+    if cursor:
+        try:
+            (last_id,) = decode_cursor(cursor, 1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="잘못된 cursor 입니다")
+        query = query.filter(Token.id < last_id)
+    else:
+        query = query.offset(skip)
+    tokens = query.limit(limit).all()
+
+    if tokens and len(tokens) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(tokens[-1].id)
     return tokens
 
 @router.get("/popular/", response_model=List[TokenSchema])
-def read_popular_tokens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_popular_tokens(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """
     조회수가 높은 토큰 목록을 조회한다.
     - **skip**: 건너뛸 항목 수 (기본값: 0)
     - **limit**: 가져올 최대 항목 수 (기본값: 100)
+    - **cursor**: 이전 응답의 X-Next-Cursor 헤더 값 (지정 시 skip 대신 keyset 페이지네이션)
+
+    상위 랭킹은 주기적으로 갱신되는 스냅샷에서 응답한다.
     """
-    tokens = db.query(Token).order_by(Token.view_count.desc()).offset(skip).limit(limit).all()
+    try:
+        tokens, next_cursor = popularity_ranking.get_page(db, skip, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 cursor 입니다")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return tokens
 
 @router.get("/sync-collection/", response_model=List[TokenSchema])
-def read_sync_collection_tokens(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_sync_collection_tokens(response: Response, skip: int = 0, limit: int = 100, seed: Optional[int] = None, db: Session = Depends(get_db)):
     """
-    재생 시간이 15초 미만인 토큰 목록을 조회합니다.
+    재생 시간이 20초 미만인 토큰 목록을 랜덤 순서로 조회합니다.
     
     - **skip**: 건너뛸 항목 수 (기본값: 0)
     - **limit**: 가져올 최대 항목 수 (기본값: 100)
+    - **seed**: 랜덤 순서 시드. 생략하면 새로 생성해 X-Sample-Seed 헤더로 돌려주며,
+      같은 seed 로 skip 을 늘려 요청하면 중복 없이 다음 페이지를 받을 수 있음
     """
-    tokens = db.query(Token).filter(Token.end_time - Token.start_time < 20).order_by(func.random()).offset(skip).limit(limit).all()
-    return tokens
+    if seed is None:
+        seed = token_sampler.new_seed()
+    response.headers["X-Sample-Seed"] = str(seed)
+    return token_sampler.sample(db, seed, skip, limit)
 
 #카테고리별 영화 조회 API - 특정 카테고리의 영화들만 가져오기
 @router.get("/category/{category}/", response_model=List[TokenSchema])
@@ -82,36 +118,68 @@ def read_tokens_by_category(category: str, skip: int = 0, limit: int = 100, db:
     """
     특정 카테고리의 토큰들을 조회합니다.
     
-    - **category**: 조회할 카테고리명
+    - **category**: 조회할 카테고리명 (대소문자 무시, 접두사 일치)
     - **skip**: 건너뛸 항목 수 (기본값: 0) 
     - **limit**: 가져올 최대 항목 수 (기본값: 100)
     """
-    tokens = db.query(Token).filter(Token.category.ilike(f"%{category}%")).offset(skip).limit(limit).all()
+    tokens = (
+        db.query(Token)
+          .filter(Token.id.in_(category_match(category)))
+          .order_by(Token.id)
+          .offset(skip)
+          .limit(limit)
+          .all()
+    )
     return tokens
 
+# 카테고리 목록 + 토큰 수 조회 API
+@router.get("/categories/", response_model=List[CategoryCount])
+def read_category_counts(limit: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    카테고리별 토큰 수를 많은 순으로 조회합니다.
+
+    - **limit**: 가져올 최대 카테고리 수 (기본값: 전체)
+    """
+    return [CategoryCount(category=name, count=count) for name, count in category_counts(db, limit)]
+
+
+
+# pitch.json 캐시 상태 조회 API (모니터링용)
+@router.get("/cache/pitch-stats/")
+def get_pitch_cache_stats():
+    """
+    pitch.json 캐시의 hit/miss/eviction 카운터를 반환합니다.
+    """
+    return pitch_cache.stats()
 
 
 @router.get("/{token_id}", response_model=TokenDetail)
 async def read_token(
     request: Request,
     token_id: int = Path(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     토큰 + scripts + pitch.json + bgvoice presigned URL
     """
     s3_client = request.app.state.s3_client
-    token: Optional[Token] = db.query(Token).filter(Token.id == token_id).first()
+    # 비동기 세션에서는 lazy load 가 불가능하므로 scripts / words 를 미리 로드
+    res = await db.execute(
+        select(Token)
+        .options(selectinload(Token.scripts).selectinload(Script.words))
+        .where(Token.id == token_id)
+    )
+    token: Optional[Token] = res.scalars().first()
     if token is None:
         raise HTTPException(404, "Token not found")
 
-    pitch_data   = await load_json(s3_client, token.s3_pitch_url)
+    pitch_data   = await pitch_cache.get(s3_client, token.s3_pitch_url)   # LRU 캐시 → 미스일 때만 S3
     safe_bgvoice = presign(s3_client, token.s3_bgvoice_url)   # 퍼블릭이면 그대로
 
     # SQLAlchemy 객체 dict 언패킹 + 추가 필드
     return TokenDetail(
-        **token.__dict__,
-        scripts=[*token.scripts],    # relationship 로드
+        **{k: v for k, v in token.__dict__.items() if k != "scripts"},
+        scripts=[*token.scripts],    # selectinload 로 미리 로드된 relationship
         pitch=pitch_data,
         bgvoice_url=safe_bgvoice
     )
@@ -132,6 +200,8 @@ def update_token(token_id: int, token: TokenCreate, db: Session = Depends(get_db
     
     db.commit()  # 변경사항 저장
     db.refresh(db_token)  # 업데이트된 데이터 다시 로드
+    popularity_ranking.invalidate()  # 인기순 스냅샷에 수정 내용 반영
+    token_sampler.invalidate()  # 재생 시간이 바뀌었을 수 있음
     return db_token
 
 # 영화 삭제 API - DELETE 요청으로 특정 영화를 삭제
@@ -144,8 +214,19 @@ def delete_token(token_id: int, db: Session = Depends(get_db)):
     if db_token is None:
         raise HTTPException(status_code=404, detail="Token not found")
     
+    # 이 토큰에 분석 결과가 있는 사용자들의 통계는 삭제 후 다시 계산
+    affected_users = db.execute(
+        select(AnalysisResult.user_id).where(AnalysisResult.token_id == token_id).distinct()
+    ).scalars().all()
     db.delete(db_token)  # 데이터베이스에서 삭제
+    db.flush()
+    refresh_user_stats(db, affected_users)
     db.commit()  # 변경사항 저장
+    view_counter.forget(token_id)  # 미반영 조회수 버림
+    popularity_ranking.invalidate()  # 삭제된 토큰이 인기순에 남지 않도록
+    token_sampler.invalidate()
+    for user_id in affected_users:
+        mypage_overview_cache.invalidate(user_id)
     return {"detail": "Token deleted successfully"}
 
 
@@ -185,33 +266,21 @@ def read_related_tokens(token_id: int, skip: int = 0, limit: int = 5, db: Sessio
 # token 조회수 상승 API
 @router.post("/{token_id}/view", response_model=ViewCountResponse)
 def increment_view(token_id: int, db: Session = Depends(get_db)):
-    token = db.query(Token).filter(Token.id == token_id).first()
-    if not token:
+    """
+    조회수를 1 증가시킵니다.
+    증가분은 메모리에 모았다가 주기적으로 한 번에 DB 에 반영하며,
+    응답의 view_count 는 미반영분을 포함한 근사치입니다.
+    """
+    view_count = view_counter.increment(db, token_id)
+    if view_count is None:
         raise HTTPException(status_code=404, detail="Token not found")
-    
-    # DB 레벨에서 atomic 하게 view_count += 1
-    stmt = (
-        update(Token)
-        .where(Token.id == token_id)
-        .values(view_count = Token.view_count + 1)
-        .execution_options(synchronize_session="fetch")
-    )
-    try: 
-        db.execute(stmt)
-        db.commit()
-
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(500, "조회수 증가 중 오류가 발생")
-
-    token = db.get(Token, token_id)
-    return {"token_id": token.id, "view_count": token.view_count}
+    return {"token_id": token_id, "view_count": view_count}
 
 
 
 # ────────────── API 엔드포인트 ──────────────
 @router.get("/{token_id}/user-audios", response_model=UserAudioResponse)
-def get_user_audios_for_token(
+async def get_user_audios_for_token(
     request: Request,
     token_id: int = Path(...),
     current_user: User = Depends(get_current_user),
@@ -227,7 +296,7 @@ def get_user_audios_for_token(
     # S3에서 해당 사용자의 토큰 관련 음성 파일 목록 조회
     prefix = f"user_audio/{user_id}/{token_id}/"
     try:
-        response = s3_client.list_objects_v2(Bucket=S3_BUCKET, Prefix=prefix)
+        response = await s3_gateway.list_objects_v2(S3_BUCKET, prefix)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"S3에서 파일 목록을 가져오는 중 오류 발생: {e}")
 
@@ -1,27 +1,35 @@
 # router/user_audio_router.py
 
-import os, logging, boto3, asyncio, json
+import os, logging, asyncio, json
 from uuid import uuid4
 from typing import List
 from fastapi import APIRouter, UploadFile, File, Path, HTTPException, Request, BackgroundTasks, Depends, Form
 from fastapi.responses import StreamingResponse
-from concurrent.futures import ThreadPoolExecutor
 import httpx
-from database import get_db
-from sqlalchemy.orm import Session
+from database import get_async_db, AsyncSessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Token, AnalysisResult, User
-from services.sqs_service import sqs_service
+from services.sqs_service import sqs_service, QUEUE_BACKEND
+from services.analysis_consumer import analysis_consumer
+from services.s3_gateway import s3_gateway
+from services.http_clients import http_clients
+from services.mypage_overview import mypage_overview_cache
+from services.user_stats import record_practice, record_result
+from services.analysis_scores import extract_scores
+from services.upstream_guard import upstream_guards, UpstreamUnavailable, RETRYABLE_STATUS
+from services.progress_bus import progress_bus, job_event_stream
 from router.auth_router import get_current_user  # 인증 함수 import
 
 
-async def get_token_by_id(token_id: str, db:Session):
-    token = db.query(Token).filter(Token.id == int(token_id)).first()
+async def get_token_by_id(token_id: str, db: AsyncSession):
+    token = await db.get(Token, int(token_id))
     if not token:
         raise HTTPException(status_code=404, detail="Token not found")
     return token
 
-# DB 헬퍼 함수들
-def create_analysis_result(db: Session, job_id: str, token_id: int, user_id: int = None, status: str = "processing", progress: int = 10, message: str = "업로드 시작"):
+# DB 헬퍼 함수들 (비동기 세션 사용 - 이벤트 루프를 막지 않음)
+async def create_analysis_result(db: AsyncSession, job_id: str, token_id: int, user_id: int = None, status: str = "processing", progress: int = 10, message: str = "업로드 시작"):
     analysis_result = AnalysisResult(
         job_id=job_id,
         token_id=token_id,
@@ -30,22 +38,46 @@ def create_analysis_result(db: Session, job_id: str, token_id: int, user_id: int
         progress=progress,
         message=message
     )
+    await record_practice(db, user_id, token_id)   # 연습 횟수 / 더빙 토큰 수 (같은 트랜잭션)
     db.add(analysis_result)
-    db.commit()
-    db.refresh(analysis_result)
+    await db.commit()
+    await db.refresh(analysis_result)
+    mypage_overview_cache.invalidate(user_id)   # 연습 횟수 변경
     return analysis_result
 
-def update_analysis_result(db: Session, job_id: str, **kwargs):
-    analysis_result = db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).first()
+def analysis_progress_snapshot(analysis_result: AnalysisResult) -> dict:
+    """SSE / 진행 상황 버스로 전달하는 상태 스냅샷"""
+    return {
+        "job_id": analysis_result.job_id,
+        "status": analysis_result.status,
+        "progress": analysis_result.progress,
+        "message": analysis_result.message,
+        "result": analysis_result.result
+    }
+
+async def update_analysis_result(db: AsyncSession, job_id: str, **kwargs):
+    # 결과를 쓰는 경우: 점수 증감을 계산할 이전 결과를 DB 에서 잠가서 다시 읽음 (세션에 캐시된 값 사용 X)
+    analysis_result = await get_analysis_result(db, job_id, for_update="result" in kwargs)
     if analysis_result:
+        if "result" in kwargs:
+            await record_result(db, analysis_result.user_id, analysis_result.result, kwargs["result"])
+            kwargs = {**kwargs, **extract_scores(kwargs["result"])}   # 점수 컬럼도 함께 저장
         for key, value in kwargs.items():
             setattr(analysis_result, key, value)
-        db.commit()
-        db.refresh(analysis_result)
+        await db.commit()
+        await db.refresh(analysis_result)
+        # 상태 변화를 SSE 구독자에게 push
+        progress_bus.publish(job_id, analysis_progress_snapshot(analysis_result))
+        if "result" in kwargs:
+            mypage_overview_cache.invalidate(analysis_result.user_id)   # 평균 점수 변경
     return analysis_result
 
-def get_analysis_result(db: Session, job_id: str):
-    return db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).first()
+async def get_analysis_result(db: AsyncSession, job_id: str, for_update: bool = False):
+    stmt = select(AnalysisResult).where(AnalysisResult.job_id == job_id)
+    if for_update:
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
 
 
@@ -61,17 +93,12 @@ TARGET_URL = os.getenv("TARGET_SERVER_URL")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 
 # 비동기 S3 업로드 함수
-async def upload_to_s3_async(s3_client, file_data: bytes, filename: str) -> str:
-    """비동기 S3 업로드"""
-    def sync_upload():
-        import io
-        key = f"audio/{uuid4().hex}_{filename}"
-        s3_client.upload_fileobj(io.BytesIO(file_data), S3_BUCKET, key)
-        return key
-    
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        return await loop.run_in_executor(executor, sync_upload)
+async def upload_to_s3_async(s3_client, fileobj, filename: str) -> str:
+    """비동기 S3 스트리밍 업로드 (파일 객체를 청크 단위로 전송, 큰 파일은 멀티파트)"""
+    key = f"audio/{uuid4().hex}_{filename}"
+    # 업로드마다 executor 를 새로 만들지 않고 공유 S3 executor 사용
+    await s3_gateway.upload_stream(fileobj, S3_BUCKET, key, client=s3_client)
+    return key
 
 # SQS 메시지 전송 함수
 async def send_to_sqs_async(s3_url: str, token_id: str, webhook_url: str, job_id: str, token_info: Token):
@@ -83,8 +110,8 @@ async def send_to_sqs_async(s3_url: str, token_id: str, webhook_url: str, job_id
             's3_pitch_url': getattr(token_info, 's3_pitch_url', None)
         }
         
-        # SQS에 메시지 전송
-        message_id = sqs_service.send_analysis_message(
+        # SQS에 메시지 전송 (동시에 들어온 요청은 배치로 묶여 전송됨)
+        message_id = await sqs_service.send_analysis_message_async(
             job_id=job_id,
             s3_audio_url=s3_url,
             token_id=str(token_id),
@@ -106,7 +133,10 @@ async def send_to_sqs_async(s3_url: str, token_id: str, webhook_url: str, job_id
 async def send_analysis_request_async(s3_url: str, token_id: str, webhook_url: str, job_id: str, token_info: Token):
     """httpx를 사용한 완전 비동기 분석 요청"""
     try:
-        async with httpx.AsyncClient(timeout=70.0) as client:
+        # 공유 클라이언트 사용 (요청마다 TCP/TLS 연결을 새로 맺지 않음)
+        # 동시 요청 수 제한 + 서킷 브레이커 (서버가 느려지면 대기/즉시 실패)
+        client = http_clients.get("analysis")
+        async with upstream_guards.get("analysis").slot():
             response = await client.post(
                 TARGET_URL,
                 data={
@@ -119,17 +149,20 @@ async def send_analysis_request_async(s3_url: str, token_id: str, webhook_url: s
                 headers={"Content-Type": "application/x-www-form-urlencoded"}
             )
             response.raise_for_status()
-            logging.info(f"[분석 요청 성공] job_id={job_id}")
-            
-            # 응답 데이터 확인 및 반환
-            if response.text and response.text.strip():
-                try:
-                    response_data = response.json()
-                    logging.info(f"[분석 서버 응답] {len(str(response_data))} 문자")
-                    return response_data
-                except:
-                    logging.info(f"[분석 서버 텍스트 응답] {response.text}")
+        logging.info(f"[분석 요청 성공] job_id={job_id}")
+        
+        # 응답 데이터 확인 및 반환
+        if response.text and response.text.strip():
+            try:
+                response_data = response.json()
+                logging.info(f"[분석 서버 응답] {len(str(response_data))} 문자")
+                return response_data
+            except:
+                logging.info(f"[분석 서버 텍스트 응답] {response.text}")
                     
+    except UpstreamUnavailable as e:
+        logging.warning(f"[분석 요청 보류] job_id={job_id}, {e}")
+        raise
     except httpx.HTTPStatusError as e:
         logging.error(f"[분석 요청 실패] job_id={job_id}, status={e.response.status_code}, body={e.response.text}")
         raise
@@ -144,29 +177,31 @@ async def upload_audio_by_token_id(
     token_id: str = Path(...),
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)  # 🔐 로그인한 사용자만 호출 가능
     
 ):
     try:
         s3_client = request.app.state.s3_client
         job_id = str(uuid4())
-        file_data = await file.read()
         token_info = await get_token_by_id(token_id, db)
         
         # DB에 초기 상태 저장
-        analysis_result = create_analysis_result(db, job_id, int(token_id), current_user.id)
+        analysis_result = await create_analysis_result(db, job_id, int(token_id), current_user.id)
+
+        # 업로드 파일을 청크 단위로 임시 파일에 옮겨둠 (전체를 메모리에 올리지 않음)
+        spooled_file = await s3_gateway.spool(file)
+        filename = file.filename
 
         # 백그라운드에서 완전 비동기 처리
         async def process_in_background(s3_client_bg):
-            # 새로운 DB 세션 생성 (백그라운드 작업용)
-            from database import SessionLocal
-            bg_db = SessionLocal()
+            # 새로운 비동기 DB 세션 생성 (백그라운드 작업용)
+            bg_db = AsyncSessionLocal()
             try:
                 # S3 업로드
-                update_analysis_result(bg_db, job_id, progress=40, message="S3 업로드 중...")
+                await update_analysis_result(bg_db, job_id, progress=40, message="S3 업로드 중...")
                 
-                s3_key = await upload_to_s3_async(s3_client_bg, file_data, file.filename)
+                s3_key = await upload_to_s3_async(s3_client_bg, spooled_file, filename)
                 s3_url = f"s3://{S3_BUCKET}/{s3_key}"
                 
                 webhook_url = f"{WEBHOOK_URL}?job_id={job_id}"
@@ -176,7 +211,7 @@ async def upload_audio_by_token_id(
                 
                 if use_sqs:
                     # SQS 방식
-                    update_analysis_result(bg_db, job_id, progress=70, message="SQS 큐에 메시지 전송 중...")
+                    await update_analysis_result(bg_db, job_id, progress=70, message="SQS 큐에 메시지 전송 중...")
                     
                     sqs_result = await send_to_sqs_async(
                         s3_url, 
@@ -186,7 +221,7 @@ async def upload_audio_by_token_id(
                         token_info
                     )
                     
-                    update_analysis_result(
+                    await update_analysis_result(
                         bg_db, job_id, 
                         status="queued_for_analysis", 
                         progress=90, 
@@ -197,7 +232,7 @@ async def upload_audio_by_token_id(
                     
                 else:
                     # 기존 HTTP 방식
-                    update_analysis_result(bg_db, job_id, progress=70, message="분석 서버 요청 중...")
+                    await update_analysis_result(bg_db, job_id, progress=70, message="분석 서버 요청 중...")
                     
                     response_data = await send_analysis_request_async(
                         s3_url, 
@@ -210,7 +245,7 @@ async def upload_audio_by_token_id(
                     # POST 응답에서 실제 분석 결과가 있는지 확인
                     if response_data and isinstance(response_data, dict) and 'scores' in response_data:
                         # 실제 분석 결과를 받은 경우
-                        update_analysis_result(bg_db, job_id, 
+                        await update_analysis_result(bg_db, job_id, 
                                               status="completed", 
                                               progress=100, 
                                               result=response_data, 
@@ -218,19 +253,23 @@ async def upload_audio_by_token_id(
                         logging.info(f"[HTTP POST 응답으로 분석 완료] job_id={job_id}")
                     else:
                         # 웹훅 대기 상태로 설정
-                        update_analysis_result(bg_db, job_id, progress=90, message="분석 중... 결과 대기")
+                        await update_analysis_result(bg_db, job_id, progress=90, message="분석 중... 결과 대기")
                         logging.info(f"[HTTP 웹훅 대기] job_id={job_id}")
                 
+            except UpstreamUnavailable as e:
+                # 분석 서버 과부하/장애 → 요청을 보내지 않음, 클라이언트가 다시 시도
+                await update_analysis_result(bg_db, job_id, status=RETRYABLE_STATUS, message=str(e), progress=0)
             except Exception as e:
                     # 웹훅 대기 상태로 설정
-                    update_analysis_result(bg_db, job_id, progress=90, message="분석 중... 결과 대기")
+                    await update_analysis_result(bg_db, job_id, progress=90, message="분석 중... 결과 대기")
                     logging.info(f"[웹훅 대기] job_id={job_id}")
                 
             except Exception as e:
                 logging.error(f"백그라운드 처리 실패: {str(e)}")
-                update_analysis_result(bg_db, job_id, status="failed", message=str(e), progress=0)
+                await update_analysis_result(bg_db, job_id, status="failed", message=str(e), progress=0)
             finally:
-                bg_db.close()
+                spooled_file.close()
+                await bg_db.close()
 
         background_tasks.add_task(process_in_background, s3_client)
         
@@ -252,7 +291,7 @@ async def upload_audio_by_token_id(
 
 # 2. 분석 결과를 수신할 웹훅 엔드포인트
 @router.post("/webhook/analysis-complete/")
-async def receive_analysis(request: Request, db: Session = Depends(get_db)):
+async def receive_analysis(request: Request, db: AsyncSession = Depends(get_async_db)):
     from fastapi.responses import JSONResponse
     
     # 웹훅 호출 로깅 추가
@@ -271,7 +310,7 @@ async def receive_analysis(request: Request, db: Session = Depends(get_db)):
         return JSONResponse(status_code=400, content={"error": "job_id is required"})
 
     # 이미 완료된 job_id인지 확인
-    existing_result = get_analysis_result(db, job_id)
+    existing_result = await get_analysis_result(db, job_id)
     if existing_result and existing_result.status == "completed":
         logging.info(f"[중복 요청 무시] job_id={job_id}는 이미 완료된 상태")
         return {"received": True, "job_id": job_id, "message": "이미 완료된 작업"}
@@ -287,7 +326,7 @@ async def receive_analysis(request: Request, db: Session = Depends(get_db)):
     logging.info(f"[웹훅 데이터] 결과 키들: {list(results.keys()) if isinstance(results, dict) else 'Not dict'}")
     
     # 분석 완료 상태로 업데이트
-    update_analysis_result(db, job_id, 
+    await update_analysis_result(db, job_id, 
                           status="completed", 
                           progress=100, 
                           result=results, 
@@ -300,9 +339,9 @@ async def receive_analysis(request: Request, db: Session = Depends(get_db)):
 
 # 3. 클라이언트가 조회할 수 있는 결과 조회 API
 @router.get("/analysis-result/{job_id}/")
-def get_analysis_result_api(job_id: str, db: Session = Depends(get_db)):
+async def get_analysis_result_api(job_id: str, db: AsyncSession = Depends(get_async_db)):
     """분석 결과 조회"""
-    stored_data = get_analysis_result(db, job_id)
+    stored_data = await get_analysis_result(db, job_id)
     if not stored_data:
         raise HTTPException(status_code=404, detail="분석 결과를 찾을 수 없습니다.")
     
@@ -320,48 +359,24 @@ def get_analysis_result_api(job_id: str, db: Session = Depends(get_db)):
 # 4. 실시간 진행 상황을 위한 Server-Sent Events 엔드포인트
 @router.get("/analysis-progress/{job_id}/")
 async def stream_analysis_progress(job_id: str):
-    """실시간 진행 상황 스트리밍 (SSE)"""
+    """실시간 진행 상황 스트리밍 (SSE) - DB 폴링 대신 진행 상황 버스 구독"""
+    async def load_snapshot():
+        async with AsyncSessionLocal() as db:
+            current_data = await get_analysis_result(db, job_id)
+            return analysis_progress_snapshot(current_data) if current_data else None
+
     async def event_generator():
-        from database import SessionLocal
-        
-        while True:
-            try:
-                # 새로운 DB 세션으로 현재 상태 조회
-                db = SessionLocal()
-                try:
-                    current_data = get_analysis_result(db, job_id)
-                    if not current_data:
-                        yield f"data: {json.dumps({'error': 'Job not found'}, ensure_ascii=False)}\n\n"
-                        break
-                    
-                    data_dict = {
-                        "job_id": current_data.job_id,
-                        "status": current_data.status,
-                        "progress": current_data.progress,
-                        "message": current_data.message,
-                        "result": current_data.result
-                    }
-                    
-                    # 완료된 경우 마지막 데이터 전송 후 종료
-                    if current_data.status in ["completed", "failed"]:
-                        yield f"data: {json.dumps(data_dict, ensure_ascii=False)}\n\n"
-                        break
-                    
-                    yield f"data: {json.dumps(data_dict, ensure_ascii=False)}\n\n"
-                finally:
-                    db.close()
-                    
-                await asyncio.sleep(3)  # 1초마다 업데이트
-                
-            except Exception as e:
-                logging.error(f"SSE 스트림 오류: {e}")
-                error_data = {
-                    "status": "error", 
-                    "error": str(e),
-                    "job_id": job_id
-                }
-                yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
-                break
+        try:
+            async for event in job_event_stream(job_id, load_snapshot):
+                yield event
+        except Exception as e:
+            logging.error(f"SSE 스트림 오류: {e}")
+            error_data = {
+                "status": "error", 
+                "error": str(e),
+                "job_id": job_id
+            }
+            yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
     
     return StreamingResponse(
         event_generator(),
@@ -386,8 +401,11 @@ def get_sqs_queue_status():
                 "queue_info": {
                     "messages_available": queue_attributes.get('ApproximateNumberOfMessages', '0'),
                     "messages_in_flight": queue_attributes.get('ApproximateNumberOfMessagesNotVisible', '0'),
-                    "queue_url": os.getenv('SQS_QUEUE_URL', 'Not configured')
+                    "queue_url": sqs_service.queue_url or 'Not configured',
+                    "backend": QUEUE_BACKEND
                 },
+                "consumer": analysis_consumer.snapshot(),
+                "upstreams": upstream_guards.snapshot(),
                 "sqs_enabled": os.getenv('USE_SQS_QUEUE', 'false').lower() == 'true'
             }
         else:
@@ -413,7 +431,7 @@ async def batch_upload_audio(
     files: List[UploadFile] = File(...),
     token_ids: str = Form(...),  # 쉼표로 구분된 문자열로 받기
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -441,14 +459,14 @@ async def batch_upload_audio(
         job_ids.append(job_id)
         
         # DB에 초기 상태 저장
-        create_analysis_result(db, job_id, int(token_id), current_user.id)
+        await create_analysis_result(db, job_id, int(token_id), current_user.id)
         logging.info(f"[배치 작업 생성] job_id={job_id}, file={file.filename}, token_id={token_id}")
     
     # 백그라운드에서 병렬 처리 시작
     background_tasks.add_task(
         process_batch_files_parallel,
         s3_client,
-        [(await file.read(), file.filename) for file in files],  # 파일 데이터 미리 읽기
+        [(await s3_gateway.spool(file), file.filename) for file in files],  # 임시 파일로 스트리밍 복사
         token_id_list,
         job_ids,
         current_user.id
@@ -462,17 +480,16 @@ async def batch_upload_audio(
 
 async def process_batch_files_parallel(
     s3_client,
-    file_data_list: List[tuple],  # (file_data, filename) 튜플 리스트
+    file_data_list: List[tuple],  # (임시 파일 객체, filename) 튜플 리스트
     token_ids: List[str],
     job_ids: List[str],
     user_id: int
 ):
     """여러 파일을 병렬로 처리하는 백그라운드 함수"""
     
-    async def process_single_file_async(file_data: bytes, filename: str, token_id: str, job_id: str):
+    async def process_single_file_async(file_data, filename: str, token_id: str, job_id: str):
         """단일 파일 비동기 처리"""
-        from database import SessionLocal
-        bg_db = SessionLocal()
+        bg_db = AsyncSessionLocal()
         
         try:
             logging.info(f"[배치 처리 시작] job_id={job_id}, file={filename}")
@@ -481,21 +498,24 @@ async def process_batch_files_parallel(
             token_info = await get_token_by_id(token_id, bg_db)
             
             # 1. S3 업로드
-            update_analysis_result(bg_db, job_id, progress=20, message="S3 업로드 중...")
+            await update_analysis_result(bg_db, job_id, progress=20, message="S3 업로드 중...")
             s3_key = await upload_to_s3_async(s3_client, file_data, filename)
             s3_url = f"s3://{S3_BUCKET}/{s3_key}"
             
             # 2. 분석 서버 요청 준비
-            update_analysis_result(bg_db, job_id, progress=50, message="분석 서버 요청 중...")
+            await update_analysis_result(bg_db, job_id, progress=50, message="분석 서버 요청 중...")
             webhook_url = f"{WEBHOOK_URL}?job_id={job_id}"
             
-            # 3. 분석 서버에 비동기 요청
-            await send_analysis_request_async(
-                s3_url, token_id, webhook_url, job_id, token_info
-            )
+            # 3. 분석 요청 (SQS 사용 시 배치 내 다른 파일들과 send_message_batch 로 묶여 전송)
+            if os.getenv('USE_SQS_QUEUE', 'false').lower() == 'true':
+                await send_to_sqs_async(s3_url, token_id, webhook_url, job_id, token_info)
+            else:
+                await send_analysis_request_async(
+                    s3_url, token_id, webhook_url, job_id, token_info
+                )
             
             # 4. 요청 완료 상태 업데이트
-            update_analysis_result(
+            await update_analysis_result(
                 bg_db, job_id, 
                 status="processing", 
                 progress=80, 
@@ -504,16 +524,19 @@ async def process_batch_files_parallel(
             
             logging.info(f"[배치 처리 성공] job_id={job_id}, file={filename}")
             
+        except UpstreamUnavailable as e:
+            await update_analysis_result(bg_db, job_id, status=RETRYABLE_STATUS, progress=0, message=str(e))
         except Exception as e:
             logging.error(f"[배치 처리 실패] job_id={job_id}, file={filename}, error={e}")
-            update_analysis_result(
+            await update_analysis_result(
                 bg_db, job_id, 
                 status="failed", 
                 progress=0, 
                 message=f"처리 실패: {str(e)}"
             )
         finally:
-            bg_db.close()
+            file_data.close()
+            await bg_db.close()
     
     # 🚀 핵심: asyncio.gather로 모든 파일을 동시에 처리
     tasks = [
@@ -531,7 +554,7 @@ async def process_batch_files_parallel(
 @router.get("/batch-progress/")
 async def get_batch_progress(
     job_ids: str,  # 쉼표로 구분된 job_id 문자열
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     배치 작업들의 진행 상황 조회
@@ -548,8 +571,12 @@ async def get_batch_progress(
     completed_count = 0
     failed_count = 0
     
+    # job_id 마다 쿼리하지 않고 한 번에 조회
+    rows = await db.execute(select(AnalysisResult).where(AnalysisResult.job_id.in_(job_id_list)))
+    results_by_job_id = {r.job_id: r for r in rows.scalars().all()}
+    
     for job_id in job_id_list:
-        result = get_analysis_result(db, job_id)
+        result = results_by_job_id.get(job_id)
         if result:
             status_info = {
                 "job_id": result.job_id,
@@ -1,8 +1,12 @@
-import os, boto3, json, urllib.parse, httpx, logging
+import os, json, urllib.parse, logging
 from typing import Any, Optional
 import io
 from pydub import AudioSegment
 import uuid
+from services.s3_gateway import s3_gateway
+from services.http_clients import http_clients
+from services.stem_cache import stem_cache
+from utils.audio_encoder import encoded_stream
 
 # 기본 버킷 이름을 환경 변수 또는 상수로 설정
 DEFAULT_BUCKET = os.getenv("S3_BUCKET_NAME")
@@ -34,13 +38,15 @@ async def load_json(s3_client, url: Optional[str]) -> Any:
         if bk:
             # _parse_s3가 (bucket, key)를 반환한 경우 S3에서 객체 가져오기
             b, k = bk
-            obj = s3_client.get_object(Bucket=b, Key=k)
-            return json.load(obj["Body"])
-        # _parse_s3가 None이면 (예: 일반 http URL인 경우) httpx로 요청
-        async with httpx.AsyncClient(timeout=10.0) as c:
-            r = await c.get(url)
-            r.raise_for_status()
-            return r.json()
+            # 블로킹 get_object + 본문 파싱은 공유 S3 executor 에서 실행
+            def _read():
+                obj = s3_client.get_object(Bucket=b, Key=k)
+                return json.load(obj["Body"])
+            return await s3_gateway.run(_read)
+        # _parse_s3가 None이면 (예: 일반 http URL인 경우) 공유 HTTP 클라이언트로 요청
+        r = await http_clients.get("default").get(url)
+        r.raise_for_status()
+        return r.json()
     except Exception as e:
         logging.warning("pitch.json load error %s", e)
         return None
@@ -62,18 +68,26 @@ def presign(s3_client, url: Optional[str], exp: int = 900) -> Optional[str]:
 
 #==========================# 병합 더빙 음성 제공용
 
-s3 = boto3.client("s3", region_name='ap-northeast-2')
+# 공유 게이트웨이의 클라이언트 사용 (커넥션 풀 공유)
+s3 = s3_gateway.client
 
-def load_main_audio_from_s3(actor_name: str, video_id: str):
+def main_audio_keys(actor_name: str, video_id: str) -> tuple[str, str]:
+    """(배경, 원본 보컬) S3 키"""
     base_prefix = f"{actor_name}/{video_id}/0/"
+    return f"{base_prefix}bgvoice.wav", f"{base_prefix}vocal.wav"
 
-    def load_file(key):
-        print(f"☁️ S3에서 로딩 중: {key}")
-        response = s3.get_object(Bucket=DEFAULT_BUCKET, Key=key)
-        return AudioSegment.from_file(io.BytesIO(response["Body"].read()), format="wav")
 
-    vocal = load_file(f"{base_prefix}vocal.wav")
-    bgvoice = load_file(f"{base_prefix}bgvoice.wav")
+def main_audio_digests(actor_name: str, video_id: str) -> list[str]:
+    """배경/원본 보컬의 현재 ETag 기준 digest (렌더 캐시 유효성 확인용)"""
+    return [stem_cache.current_digest(s3, DEFAULT_BUCKET, key) for key in main_audio_keys(actor_name, video_id)]
+
+
+def load_main_audio_from_s3(actor_name: str, video_id: str):
+    bgvoice_key, vocal_key = main_audio_keys(actor_name, video_id)
+
+    # 영상별로 고정된 스템이므로 디코딩된 PCM 을 디스크 캐시에서 재사용 (ETag 기준)
+    vocal = stem_cache.load(DEFAULT_BUCKET, vocal_key, s3_client=s3)
+    bgvoice = stem_cache.load(DEFAULT_BUCKET, bgvoice_key, s3_client=s3)
 
     return bgvoice, vocal  # background, original
 
@@ -84,8 +98,20 @@ from pydub import AudioSegment
 # AWS_DEFAULT_BUCKET = os.getenv("AWS_S3_BUCKET_NAME")
 
 
+def user_audio_key(user_id: int, token_id: int, script_id: int) -> str:
+    return f"user_audio/{user_id}/{token_id}/{script_id}.wav"
+
+
+def user_audio_etag(user_id: int, token_id: int, script_id: int) -> Optional[str]:
+    """사용자 음성 ETag (없으면 None) - 본문 다운로드 없이 변경 여부만 확인"""
+    try:
+        return s3.head_object(Bucket=DEFAULT_BUCKET, Key=user_audio_key(user_id, token_id, script_id)).get("ETag")
+    except Exception:
+        return None
+
+
 def load_user_audio_from_s3(user_id: int, token_id: int, script_id: int) -> Optional[AudioSegment]:
-    key = f"user_audio/{user_id}/{token_id}/{script_id}.wav"
+    key = user_audio_key(user_id, token_id, script_id)
     try:
         print(f"☁️ S3에서 사용자 음성 로딩 중: s3://{DEFAULT_BUCKET}/{key}")
         response = s3.get_object(Bucket=DEFAULT_BUCKET, Key=key)
@@ -96,24 +122,38 @@ def load_user_audio_from_s3(user_id: int, token_id: int, script_id: int) -> Opti
         return None
 
 
-def upload_audio_to_s3(audio_segment: AudioSegment, user_id: int, token_id: int) -> str:
-    # 고유한 파일명 생성을 위해 UUID 사용
-    unique_filename = f"dubbing_audio_{uuid.uuid4()}.wav"
-    key = f"user_Dubbing_auido/{user_id}/{token_id}/{unique_filename}"
-    
-    # AudioSegment를 메모리 내 바이트 버퍼로 내보내기
-    buffer = io.BytesIO()
-    audio_segment.export(buffer, format="wav")
-    buffer.seek(0)  # 버퍼의 시작으로 포인터 이동
-
+def upload_audio_to_s3(audio_segment: AudioSegment, user_id: int, token_id: int,
+                       output_format: Optional[str] = None, bitrate: Optional[str] = None) -> str:
+    """
+    합성 결과를 인코딩하면서 바로 S3 에 스트리밍 업로드 (멀티파트)
+    output_format: wav / mp3 / aac / opus (기본값 SYNTH_OUTPUT_FORMAT), bitrate: 예) 96k
+    """
+    key = None
     try:
-        print(f"☁️ S3에 합성 음성 업로드 중: s3://{DEFAULT_BUCKET}/{key}")
-        s3.put_object(Bucket=DEFAULT_BUCKET, Key=key, Body=buffer, ContentType="audio/wav")
-        print(f"✅ S3 업로드 성공: {key}")
-        return key
+        with encoded_stream(audio_segment, output_format, bitrate) as (stream, ext, content_type):
+            # 고유한 파일명 생성을 위해 UUID 사용
+            unique_filename = f"dubbing_audio_{uuid.uuid4()}.{ext}"
+            key = f"user_Dubbing_auido/{user_id}/{token_id}/{unique_filename}"
+
+            print(f"☁️ S3에 합성 음성 업로드 중: s3://{DEFAULT_BUCKET}/{key}")
+            # 인코딩 결과 전체를 메모리에 만들지 않고 읽는 대로 업로드
+            s3.upload_fileobj(stream, DEFAULT_BUCKET, key,
+                              ExtraArgs={"ContentType": content_type},
+                              Config=s3_gateway.transfer_config)
+    except RuntimeError as e:
+        # 인코더가 중간에 실패하면 잘린 파일이 올라갔을 수 있으므로 삭제
+        logging.error(f"❌ 인코딩 실패: {key} → {e}")
+        if key:
+            try:
+                s3.delete_object(Bucket=DEFAULT_BUCKET, Key=key)
+            except Exception:
+                pass
+        raise
     except Exception as e:
         logging.error(f"❌ S3 업로드 실패: {key} → {e}")
         raise
+    print(f"✅ S3 업로드 성공: {key}")
+    return key
 
 def generate_presigned_url(key: str, expiration: int = 3600) -> str:
     try:
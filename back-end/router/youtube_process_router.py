@@ -1,20 +1,25 @@
-import os, logging, asyncio, json
+import os, logging
 from uuid import uuid4
-from concurrent.futures import ThreadPoolExecutor
-from fastapi import APIRouter, Path, Request, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, Request, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from database import get_db, SessionLocal
-from models import YoutubeProcessJob, Token
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
+from models import YoutubeProcessJob
 from schemas import YoutubeProcessRequest, YoutubeProcessResponse, YoutubeProcessStatusResponse
+from services.progress_bus import progress_bus, job_event_stream
+from services.http_clients import http_clients
+from services.upstream_guard import upstream_guards, UpstreamUnavailable, RETRYABLE_STATUS
+from services.token_sampler import token_sampler
+from services.token_ranking import popularity_ranking
 import httpx
 
 # ────────────── 환경 변수 ──────────────
 PREPROCESS_SERVER_URL = os.getenv("PREPROCESS_SERVER_URL")
 YOUTUBE_WEBHOOK_URL = os.getenv("YOUTUBE_WEBHOOK_URL")
 
-# ────────────── DB 헬퍼 ──────────────
-def create_youtube_process_job(db: Session, job_id: str, user_id: int = None, status: str = "processing", progress: int = 10, message: str = "요청 접수"):
+# ────────────── DB 헬퍼 (비동기 세션) ──────────────
+async def create_youtube_process_job(db: AsyncSession, job_id: str, user_id: int = None, status: str = "processing", progress: int = 10, message: str = "요청 접수"):
     job = YoutubeProcessJob(
         job_id=job_id,
         user_id=user_id, # 현재는 사용하지 않지만, 추후 사용자 인증 추가 시 활용
@@ -24,20 +29,34 @@ def create_youtube_process_job(db: Session, job_id: str, user_id: int = None, st
         token_id=None # 초기에는 token_id가 없음
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
     return job
 
-def update_youtube_process_job(db: Session, job_id: str, **kw):
-    job = db.query(YoutubeProcessJob).filter_by(job_id=job_id).first()
+def youtube_progress_snapshot(job: YoutubeProcessJob) -> dict:
+    token_ids = job.result.get("token_ids") if job.result else None
+    return {
+        "job_id":   job.job_id,
+        "status":   job.status,
+        "progress": job.progress,
+        "message":  job.message,
+        "token_id": job.token_id,
+        "token_ids": token_ids,
+        "result":   job.result,
+    }
+
+async def update_youtube_process_job(db: AsyncSession, job_id: str, **kw):
+    job = await get_youtube_process_job(db, job_id)
     if job:
         for k, v in kw.items(): setattr(job, k, v)
-        db.commit()
-        db.refresh(job)
+        await db.commit()
+        await db.refresh(job)
+        progress_bus.publish(job_id, youtube_progress_snapshot(job))   # SSE 구독자에게 push
     return job
 
-def get_youtube_process_job(db: Session, job_id: str):
-    return db.query(YoutubeProcessJob).filter_by(job_id=job_id).first()
+async def get_youtube_process_job(db: AsyncSession, job_id: str):
+    res = await db.execute(select(YoutubeProcessJob).filter_by(job_id=job_id))
+    return res.scalars().first()
 
 # ────────────── 비동기 유틸 ──────────────
 async def send_preprocess_request_async(
@@ -52,14 +71,15 @@ async def send_preprocess_request_async(
     }
     
     try:
-        async with httpx.AsyncClient(timeout=300.0) as client: # 전처리 시간 고려하여 타임아웃 5분 설정
-            resp = await client.post(
+        # 공유 클라이언트 (preprocess 프로필: 전처리 시간 고려하여 타임아웃 5분)
+        async with upstream_guards.get("preprocess").slot():
+            resp = await http_clients.get("preprocess").post(
                 f"{PREPROCESS_SERVER_URL}/process",
                 json=payload
             )
             resp.raise_for_status()
-            logging.info(f"[전처리 서버 요청 성공] job_id={job_id}, 응답: {resp.json()}")
-            return resp.json()
+        logging.info(f"[전처리 서버 요청 성공] job_id={job_id}, 응답: {resp.json()}")
+        return resp.json()
     except httpx.HTTPError as e:
         logging.error(f"[전처리 서버 요청 실패] job_id={job_id} - {e}, 응답: {e.response.text if e.response else 'N/A'}")
         raise
@@ -72,18 +92,18 @@ router = APIRouter(prefix="/youtube", tags=["youtube_process"])
 async def process_youtube_url(
     request_data: YoutubeProcessRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     job_id = uuid4().hex
     
     # DB에 초기 상태 저장
-    create_youtube_process_job(db, job_id, status="processing", progress=10, message="전처리 요청 접수")
+    await create_youtube_process_job(db, job_id, status="processing", progress=10, message="전처리 요청 접수")
 
     # 백그라운드에서 전처리 서버에 요청
     async def bg_work():
-        bg_db = SessionLocal()
+        bg_db = AsyncSessionLocal()
         try:
-            update_youtube_process_job(bg_db, job_id, progress=40, message="전처리 서버 호출 중...")
+            await update_youtube_process_job(bg_db, job_id, progress=40, message="전처리 서버 호출 중...")
             
             webhook_url = f"{YOUTUBE_WEBHOOK_URL}?job_id={job_id}"
             
@@ -95,13 +115,16 @@ async def process_youtube_url(
                 job_id
             )
             
-            update_youtube_process_job(bg_db, job_id, progress=70, message="전처리 서버 응답 대기 중...")
+            await update_youtube_process_job(bg_db, job_id, progress=70, message="전처리 서버 응답 대기 중...")
             
+        except UpstreamUnavailable as e:
+            logging.warning(f"유튜브 전처리 요청 보류: {str(e)}")
+            await update_youtube_process_job(bg_db, job_id, status=RETRYABLE_STATUS, message=str(e), progress=0)
         except Exception as e:
             logging.error(f"유튜브 전처리 백그라운드 작업 실패: {str(e)}")
-            update_youtube_process_job(bg_db, job_id, status="failed", message=str(e), progress=0)
+            await update_youtube_process_job(bg_db, job_id, status="failed", message=str(e), progress=0)
         finally:
-            bg_db.close()
+            await bg_db.close()
 
     background_tasks.add_task(bg_work)
     
@@ -113,7 +136,7 @@ async def process_youtube_url(
 
 # 2) 전처리 서버 웹훅 (결과 수신)
 @router.post("/webhook/process-complete")
-async def process_complete_webhook(request: Request, db: Session = Depends(get_db)):
+async def process_complete_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     logging.info("=" * 50)
     logging.info("[🔔 웹훅 호출됨] 유튜브 전처리 결과 웹훅 수신")
     logging.info(f"[웹훅 요청 IP] {request.client.host if request.client else 'Unknown'}")
@@ -135,16 +158,19 @@ async def process_complete_webhook(request: Request, db: Session = Depends(get_d
     
     if token_ids:
         # token_ids가 있으면 성공으로 간주하고 업데이트
-        update_youtube_process_job(db, job_id, 
+        await update_youtube_process_job(db, job_id, 
                                status=status, 
                                progress=100, 
                                result=payload, 
                                message=message,
                                token_id=token_ids[0] if token_ids else None)
+        # 전처리 서버가 토큰을 직접 추가하므로 캐시된 후보 풀 / 인기순 스냅샷을 갱신
+        token_sampler.invalidate()
+        popularity_ranking.invalidate()
         logging.info(f"[✅ 웹훅 처리 완료] job_id={job_id}, token_ids={token_ids}")
     else:
         # token_ids가 없으면 실패로 간주
-        update_youtube_process_job(db, job_id, 
+        await update_youtube_process_job(db, job_id, 
                                status="failed", 
                                progress=0, 
                                result=payload, 
@@ -156,8 +182,8 @@ async def process_complete_webhook(request: Request, db: Session = Depends(get_d
 
 # 3) 결과 조회
 @router.get("/process-status/{job_id}", response_model=YoutubeProcessStatusResponse)
-def get_process_status(job_id: str, db: Session = Depends(get_db)):
-    ar = get_youtube_process_job(db, job_id)
+async def get_process_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    ar = await get_youtube_process_job(db, job_id)
     if not ar:
         raise HTTPException(404, "결과를 찾을 수 없습니다.")
     
@@ -176,32 +202,13 @@ def get_process_status(job_id: str, db: Session = Depends(get_db)):
 # 4) SSE 진행 스트림
 @router.get("/process-progress/{job_id}")
 async def stream_process_progress(job_id: str):
-    async def gen():
-        while True:
-            db = SessionLocal()
-            try:
-                ar = get_youtube_process_job(db, job_id)
-                if not ar:
-                    yield "data: {\"error\":\"Job not found\"}\n\n"
-                    break
-                
-                token_ids = ar.result.get("token_ids") if ar.result else None
-                
-                data = {
-                    "job_id":   ar.job_id,
-                    "status":   ar.status,
-                    "progress": ar.progress,
-                    "message":  ar.message,
-                    "token_id": ar.token_id,
-                    "token_ids": token_ids,
-                    "result":   ar.result,
-                }
-                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                if ar.status in ("completed", "failed"): break
-            finally:
-                db.close()
-            await asyncio.sleep(5)
-    return StreamingResponse(gen(), media_type="text/event-stream",
+    # DB 폴링 대신 진행 상황 버스 구독 (접속 시 1회만 DB 조회)
+    async def load_snapshot():
+        async with AsyncSessionLocal() as db:
+            ar = await get_youtube_process_job(db, job_id)
+            return youtube_progress_snapshot(ar) if ar else None
+
+    return StreamingResponse(job_event_stream(job_id, load_snapshot), media_type="text/event-stream",
                              headers={"Cache-Control":"no-cache",
                                       "Connection":"keep-alive",
-                                      "Access-Control-Allow-Origin":"*"})
\ No newline at end of file
+                                      "Access-Control-Allow-Origin":"*"})
@@ -114,6 +114,10 @@ class TokenDetail(TokenBase):
     class Config:
         from_attributes = True   
 
+class CategoryCount(BaseModel):
+    category: str
+    count: int
+
 class ViewCountResponse(BaseModel):
     token_id: int
     view_count: int
@@ -290,6 +294,15 @@ class YoutubeProcessStatusResponse(BaseModel):
     result: Optional[Any] = None
 
 
+class SynthesisJobResponse(BaseModel):
+    job_id: str
+    token_id: int
+    status: str
+    progress: int
+    message: Optional[str] = None
+    dubbing_audio_url: Optional[str] = None
+
+
 # === Duet Schemas ===
 class DuetScene(BaseModel):
     youtube_url: str
@@ -0,0 +1,147 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Actor, ActorAlias
+
+logger = logging.getLogger(__name__)
+
+SIM_TH = 0.25                # 유사도 임계값 (pg_trgm similarity 와 같은 기준)
+ACTOR_INDEX_TTL_SECONDS = float(os.getenv("ACTOR_INDEX_TTL_SECONDS", "600"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm 과 같은 방식: 단어마다 앞 공백 2칸, 뒤 공백 1칸을 붙여 3글자씩 자름"""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class _Snapshot:
+    def __init__(self, entries: List[Tuple[int, str, FrozenSet[str]]], names: Dict[int, str]):
+        self.entries = entries          # (actor_id, 소문자 별칭, 트라이그램)
+        self.names = names              # actor_id → 대표 이름
+        self.postings: Dict[str, List[int]] = defaultdict(list)   # 트라이그램 → entries 인덱스
+        for idx, (_, _, grams) in enumerate(entries):
+            for gram in grams:
+                self.postings[gram].append(idx)
+
+
+class ActorAliasIndex:
+    """
+    배우 별칭 인메모리 검색 인덱스
+
+    - 시작 시 actors / actor_aliases 를 한 번 읽어 메모리에 적재
+    - 부분 일치(ILIKE '%q%') 와 트라이그램 유사도(pg_trgm similarity) 를 프로세스 내에서 계산
+      → 검색어 입력마다 DB 왕복 없이 배우 후보 반환
+    - ACTOR_INDEX_TTL_SECONDS 주기 또는 invalidate() 호출 시 재적재
+    """
+
+    def __init__(self, session_factory=SessionLocal, ttl: float = ACTOR_INDEX_TTL_SECONDS):
+        self._session_factory = session_factory
+        self.ttl = ttl
+        self._snapshot: Optional[_Snapshot] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.ttl
+
+    def refresh(self, db: Optional[Session] = None) -> None:
+        own_session = db is None
+        db = db or self._session_factory()
+        try:
+            names = {a.id: a.name for a in db.query(Actor.id, Actor.name).all()}
+            aliases = db.query(ActorAlias.actor_id, ActorAlias.name).all()
+        finally:
+            if own_session:
+                db.close()
+
+        entries = []
+        seen = set()
+        # 별칭이 없는 배우도 대표 이름으로 검색되도록 함께 색인
+        for actor_id, name in [*names.items(), *aliases]:
+            lowered = name.lower()
+            if actor_id not in names or (actor_id, lowered) in seen:
+                continue
+            seen.add((actor_id, lowered))
+            entries.append((actor_id, lowered, trigrams(name)))
+
+        self._snapshot = _Snapshot(entries, names)
+        self._loaded_at = time.monotonic()
+        logger.info(f"[배우 검색 인덱스] 배우 {len(names)}명, 별칭 {len(entries)}개 적재")
+
+    def _ensure_fresh(self, db: Optional[Session] = None) -> _Snapshot:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self.refresh(db)
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def search_ids(self, query: str, limit: int = 10, db: Optional[Session] = None) -> List[int]:
+        """부분 일치 → 유사도 순으로 배우 id 반환 (중복 제거)"""
+        return self._search(self._ensure_fresh(db), query, limit)
+
+    @staticmethod
+    def _search(snap: _Snapshot, query: str, limit: int) -> List[int]:
+        q = query.strip().lower()
+        if not q or limit <= 0:
+            return []
+
+        result: List[int] = []
+        found = set()
+
+        # 1) 부분 일치
+        for actor_id, alias, _ in snap.entries:
+            if q in alias and actor_id not in found:
+                found.add(actor_id)
+                result.append(actor_id)
+                if len(result) >= limit:
+                    return result
+
+        # 2) 트라이그램 유사도 보정 (오타, 띄어쓰기 차이)
+        q_grams = trigrams(q)
+        candidates = {idx for gram in q_grams for idx in snap.postings.get(gram, ())}
+        scored: Dict[int, float] = {}
+        for idx in candidates:
+            actor_id, _, grams = snap.entries[idx]
+            if actor_id in found:
+                continue
+            score = similarity(q_grams, grams)
+            if score > SIM_TH and score > scored.get(actor_id, 0.0):
+                scored[actor_id] = score
+        for actor_id, _ in sorted(scored.items(), key=lambda kv: (-kv[1], kv[0])):
+            result.append(actor_id)
+            if len(result) >= limit:
+                break
+        return result
+
+    def search(self, query: str, limit: int = 10, db: Optional[Session] = None) -> List[Dict[str, object]]:
+        """[{id, name}] 형태로 반환 (Actor 스키마와 호환)"""
+        snap = self._ensure_fresh(db)
+        return [{"id": actor_id, "name": snap.names[actor_id]} for actor_id in self._search(snap, query, limit)]
+
+
+# 싱글톤 인스턴스
+actor_index = ActorAliasIndex()
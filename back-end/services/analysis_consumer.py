@@ -0,0 +1,271 @@
+import os
+import json
+import math
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from services.http_clients import http_clients
+from services.upstream_guard import upstream_guards, UpstreamUnavailable, RETRYABLE_STATUS
+
+logger = logging.getLogger(__name__)
+
+# 소비자 설정 (기본값: 로컬 큐일 때만 켜짐 — 운영 SQS 는 분석 서버가 직접 소비)
+ANALYSIS_CONSUMER_ENABLED = os.getenv(
+    "ANALYSIS_CONSUMER_ENABLED", "true" if os.getenv("QUEUE_BACKEND", "sqs").lower() == "local" else "false"
+).lower() == "true"
+ANALYSIS_CONSUMER_CONCURRENCY = int(os.getenv("ANALYSIS_CONSUMER_CONCURRENCY", "4"))
+ANALYSIS_CONSUMER_WAIT_SECONDS = int(os.getenv("ANALYSIS_CONSUMER_WAIT_SECONDS", "20"))           # long polling
+ANALYSIS_CONSUMER_VISIBILITY_TIMEOUT = int(os.getenv("ANALYSIS_CONSUMER_VISIBILITY_TIMEOUT", "120"))
+ANALYSIS_CONSUMER_RETRY_DELAY = int(os.getenv("ANALYSIS_CONSUMER_RETRY_DELAY", "10"))              # 실패 시 재전달 지연
+ANALYSIS_CONSUMER_MAX_RECEIVES = int(os.getenv("ANALYSIS_CONSUMER_MAX_RECEIVES", "5"))             # 이 횟수 넘으면 폐기
+ACK_LINGER_SECONDS = 1.0       # 삭제(ack)를 모아서 delete_message_batch 로 보내는 주기
+MAX_TRACKED_DEFERRALS = 10000  # 보류 횟수를 기억하는 메시지 수 상한 (오래된 것부터 잊음)
+
+TARGET_URL = os.getenv("TARGET_SERVER_URL")
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+DiscardHandler = Callable[[Dict[str, Any], Exception], Awaitable[None]]
+
+
+async def forward_to_analysis_server(body: Dict[str, Any]) -> None:
+    """
+    기본 핸들러: 큐 메시지를 HTTP 분석 서버로 전달
+    (분석 결과는 기존처럼 webhook_url 로 돌아온다)
+    """
+    if not TARGET_URL:
+        raise RuntimeError("TARGET_SERVER_URL 이 설정되지 않았습니다.")
+    data = {k: body.get(k) for k in ("s3_audio_url", "video_id", "webhook_url", "s3_textgrid_url", "s3_pitch_url")}
+    # 서킷 open / 대기 시간 초과면 예외 → 메시지는 retry_delay 후 재전달
+    async with upstream_guards.get("analysis").slot():
+        response = await http_clients.get("analysis").post(
+            TARGET_URL,
+            data={k: v for k, v in data.items() if v is not None},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        response.raise_for_status()
+
+
+async def mark_job_retryable(body: Dict[str, Any], error: Exception) -> None:
+    """
+    기본 폐기 핸들러: 메시지를 버린 작업을 retryable 로 표시
+    (queued_for_analysis 상태로 영원히 남지 않고, 클라이언트가 다시 요청할 수 있게)
+    """
+    job_id = body.get("job_id")
+    if not job_id:
+        return
+    from database import AsyncSessionLocal
+    from router.user_audio_router import update_analysis_result
+
+    async with AsyncSessionLocal() as db:
+        await update_analysis_result(db, job_id, status=RETRYABLE_STATUS, progress=0,
+                                     message=f"분석 요청 전달 실패: {error}")
+
+
+class AnalysisQueueConsumer:
+    """
+    분석 작업 큐 long polling 소비자
+
+    - receive_message 로 최대 10개씩 long polling (빈 응답 최소화)
+    - 동시에 처리 중인 메시지 수는 concurrency 로 제한 → 여유 슬롯만큼만 받아옴
+    - 처리 시간이 길어지면 visibility timeout 을 연장 (다른 소비자에게 중복 전달 방지)
+    - 성공한 메시지는 모아서 delete_message_batch 로 삭제
+    - 실패하면 retry_delay 후 다시 보이도록 하고, max_receives 를 넘으면 폐기 (on_discard 로 작업 상태 갱신)
+    - 업스트림 과부하/서킷 open(UpstreamUnavailable)은 메시지 문제가 아니므로 폐기 횟수에 넣지 않고,
+      서킷이 half-open 이 될 때까지 기다렸다가 다시 보이게 한다
+    """
+
+    def __init__(self, sqs_client, queue_url: Optional[str], handler: Handler = forward_to_analysis_server,
+                 on_discard: Optional[DiscardHandler] = mark_job_retryable,
+                 concurrency: int = ANALYSIS_CONSUMER_CONCURRENCY,
+                 wait_seconds: int = ANALYSIS_CONSUMER_WAIT_SECONDS,
+                 visibility_timeout: int = ANALYSIS_CONSUMER_VISIBILITY_TIMEOUT,
+                 retry_delay: int = ANALYSIS_CONSUMER_RETRY_DELAY,
+                 max_receives: int = ANALYSIS_CONSUMER_MAX_RECEIVES):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.handler = handler
+        self.on_discard = on_discard
+        self.concurrency = concurrency
+        self.wait_seconds = wait_seconds
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self.max_receives = max_receives
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._acks: List[str] = []
+        self._poller: Optional[asyncio.Task] = None
+        self._acker: Optional[asyncio.Task] = None
+        self._workers: Set[asyncio.Task] = set()
+        # message_id → 업스트림 사용 불가로 미룬 횟수 (ApproximateReceiveCount 에서 빼고 폐기 여부 판단)
+        self._deferrals: Dict[str, int] = {}
+        self.stats = {"received": 0, "succeeded": 0, "failed": 0, "deferred": 0, "discarded": 0, "empty_polls": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._poller is not None and not self._poller.done()
+
+    def start(self) -> None:
+        if self.running or not self.queue_url:
+            return
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._poller = asyncio.create_task(self._poll_loop())
+        self._acker = asyncio.create_task(self._ack_loop())
+        logger.info(f"[분석 큐 소비자 시작] concurrency={self.concurrency}, queue={self.queue_url}")
+
+    async def stop(self) -> None:
+        """폴링 중단 → 처리 중인 메시지 완료 대기 → 남은 ack 삭제"""
+        for task in (self._poller, self._acker):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._poller, self._acker) if t is not None), return_exceptions=True)
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._flush_acks()
+        self._poller = self._acker = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "running": self.running, "in_flight": len(self._workers),
+                "concurrency": self.concurrency}
+
+    # ────────────── 수신 ──────────────
+    async def _acquire_free_slots(self) -> int:
+        """최소 1개 슬롯이 빌 때까지 기다린 뒤, 지금 비어 있는 슬롯을 모두 확보"""
+        await self._slots.acquire()
+        taken = 1
+        while taken < 10 and not self._slots.locked():
+            await self._slots.acquire()
+            taken += 1
+        return taken
+
+    async def _poll_loop(self) -> None:
+        while True:
+            free = await self._acquire_free_slots()
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs_client.receive_message,
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=free,
+                    WaitTimeSeconds=self.wait_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                    MessageAttributeNames=["All"],
+                    AttributeNames=["ApproximateReceiveCount"],
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                for _ in range(free):
+                    self._slots.release()
+                logger.error(f"[분석 큐 수신 실패] {e}")
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            messages = response.get("Messages", [])
+            if not messages:
+                self.stats["empty_polls"] += 1
+            self.stats["received"] += len(messages)
+            # 받은 메시지 수보다 많이 확보한 슬롯은 반납
+            for _ in range(free - len(messages)):
+                self._slots.release()
+            for message in messages:
+                task = asyncio.create_task(self._process(message))
+                self._workers.add(task)
+                task.add_done_callback(self._workers.discard)
+
+    # ────────────── 처리 ──────────────
+    async def _heartbeat(self, receipt: str) -> None:
+        # visibility timeout 의 절반마다 연장 (핸들러가 끝나면 취소됨)
+        interval = max(1, self.visibility_timeout // 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sqs_client.change_message_visibility, QueueUrl=self.queue_url,
+                                        ReceiptHandle=receipt, VisibilityTimeout=self.visibility_timeout)
+            except Exception as e:
+                logger.warning(f"[분석 큐 visibility 연장 실패] {e}")
+
+    async def _release(self, receipt: str, delay: int) -> None:
+        """delay 초 뒤에 다시 보이도록 visibility 변경"""
+        try:
+            await asyncio.to_thread(self.sqs_client.change_message_visibility, QueueUrl=self.queue_url,
+                                    ReceiptHandle=receipt, VisibilityTimeout=delay)
+        except Exception as change_error:
+            # 변경이 안 되면 원래 visibility timeout 이 지난 뒤 재전달됨
+            logger.warning(f"[분석 큐 visibility 변경 실패] {change_error}")
+
+    def _defer_delay(self, error: UpstreamUnavailable) -> int:
+        # 서킷이 open 이면 half-open 이 될 때까지, 아니면(대기 시간 초과) 기본 재시도 지연
+        guard = upstream_guards.guards.get(error.upstream)
+        retry_after = guard.retry_after() if guard is not None else 0.0
+        return max(self.retry_delay, math.ceil(retry_after))
+
+    async def _process(self, message: Dict[str, Any]) -> None:
+        receipt = message["ReceiptHandle"]
+        message_id = message.get("MessageId") or receipt
+        receive_count = int(message.get("Attributes", {}).get("ApproximateReceiveCount", "1"))
+        attempts = receive_count - self._deferrals.get(message_id, 0)
+        heartbeat = asyncio.create_task(self._heartbeat(receipt))
+        body: Dict[str, Any] = {}
+        try:
+            body = json.loads(message["Body"])
+            await self.handler(body)
+        except UpstreamUnavailable as e:
+            self.stats["deferred"] += 1
+            self._deferrals[message_id] = self._deferrals.get(message_id, 0) + 1
+            while len(self._deferrals) > MAX_TRACKED_DEFERRALS:
+                self._deferrals.pop(next(iter(self._deferrals)))
+            delay = self._defer_delay(e)
+            logger.warning(f"[분석 큐 처리 보류] message_id={message_id}, {delay}초 후 재전달: {e}")
+            await self._release(receipt, delay)
+        except Exception as e:
+            self.stats["failed"] += 1
+            if attempts >= self.max_receives:
+                self.stats["discarded"] += 1
+                logger.error(f"[분석 큐 메시지 폐기] message_id={message_id}, "
+                             f"receive_count={receive_count}, error={e}")
+                self._deferrals.pop(message_id, None)
+                self._acks.append(receipt)
+                if self.on_discard is not None:
+                    try:
+                        await self.on_discard(body, e)
+                    except Exception as discard_error:
+                        logger.error(f"[분석 큐 폐기 처리 실패] message_id={message_id}, error={discard_error}")
+            else:
+                logger.warning(f"[분석 큐 처리 실패, 재시도 예정] message_id={message_id}, error={e}")
+                await self._release(receipt, self.retry_delay)
+        else:
+            self.stats["succeeded"] += 1
+            self._deferrals.pop(message_id, None)
+            self._acks.append(receipt)
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+    # ────────────── 삭제 (ack) ──────────────
+    async def _ack_loop(self) -> None:
+        while True:
+            await asyncio.sleep(ACK_LINGER_SECONDS)
+            await self._flush_acks()
+
+    async def _flush_acks(self) -> None:
+        while self._acks:
+            batch, self._acks = self._acks[:10], self._acks[10:]
+            entries = [{"Id": str(i), "ReceiptHandle": receipt} for i, receipt in enumerate(batch)]
+            try:
+                response = await asyncio.to_thread(self.sqs_client.delete_message_batch,
+                                                   QueueUrl=self.queue_url, Entries=entries)
+            except Exception as e:
+                logger.error(f"[분석 큐 삭제 실패] {len(entries)}건: {e}")
+                continue
+            for failed in response.get("Failed", []):
+                logger.warning(f"[분석 큐 삭제 실패] {failed.get('Code')}: {failed.get('Message')}")
+
+
+def create_analysis_consumer(handler: Handler = forward_to_analysis_server) -> AnalysisQueueConsumer:
+    """sqs_service 와 같은 큐 클라이언트/URL 을 쓰는 소비자 생성"""
+    from services.sqs_service import sqs_service
+
+    return AnalysisQueueConsumer(sqs_service.sqs_client, sqs_service.queue_url, handler=handler)
+
+
+# 싱글톤 인스턴스
+analysis_consumer = create_analysis_consumer()
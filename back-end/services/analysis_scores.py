@@ -0,0 +1,39 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# 웹훅 결과 JSON → AnalysisResult 점수 컬럼 (앞의 경로부터 차례로 찾는다)
+# overall_score 는 기존 평균 점수 쿼리와 같은 result["result"]["overall_score"] 만 사용,
+# 새로 추가한 점수는 분석 서버 버전에 따라 result["result"] 안 또는 최상위에 있다
+# (migrations/versions/7a2c5e9b1d36 의 백필 SQL 도 같은 경로를 사용)
+SCORE_PATHS: Dict[str, Sequence[Tuple[str, ...]]] = {
+    "overall_score": (("result", "overall_score"),),
+    "pitch_score": (("result", "pitch_score"), ("pitch_score",)),
+    "pronunciation_score": (("result", "pronunciation_score"), ("pronunciation_score",)),
+    "duration": (("result", "duration"), ("duration",)),
+}
+
+
+def _lookup(data: Any, path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    # bool 은 int 의 하위 타입이므로 제외, 문자열 점수도 무시 (백필 SQL 의 json_typeof = 'number' 와 동일)
+    if isinstance(data, bool) or not isinstance(data, (int, float)):
+        return None
+    return float(data)
+
+
+def extract_scores(result: Any) -> Dict[str, Optional[float]]:
+    """
+    웹훅 결과 JSON 에서 점수 컬럼 값 추출
+    update_*_result(result=...) 에 그대로 펼쳐 넣으면 JSON 과 컬럼이 함께 저장된다
+    """
+    scores = {}
+    for column, paths in SCORE_PATHS.items():
+        value = None
+        for path in paths:
+            value = _lookup(result, path)
+            if value is not None:
+                break
+        scores[column] = value
+    return scores
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from google.auth import jwt as google_jwt
+from google.auth import exceptions as google_exceptions
+from google.auth.transport import requests as google_requests
+
+logger = logging.getLogger(__name__)
+
+# google.oauth2.id_token.verify_oauth2_token 이 사용하는 것과 같은 인증서 / 발급자
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+GOOGLE_CERTS_DEFAULT_MAX_AGE = 3600          # Cache-Control 이 없을 때 (초)
+GOOGLE_CERTS_REFRESH_AHEAD = 0.2             # 만료까지 남은 시간이 max-age 의 20% 이하이면 백그라운드 갱신
+GOOGLE_CERTS_MIN_REFRESH_INTERVAL = 30       # 모르는 kid 로 강제 갱신하는 최소 간격 (잘못된 토큰으로 외부 호출 폭주 방지)
+GOOGLE_ID_TOKEN_CLOCK_SKEW = int(os.getenv("GOOGLE_ID_TOKEN_CLOCK_SKEW", "0"))
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# () → (certs {kid: pem}, max_age 초)
+CertFetcher = Callable[[], Tuple[Dict[str, str], int]]
+
+
+def fetch_google_certs() -> Tuple[Dict[str, str], int]:
+    """구글 공개 인증서와 Cache-Control max-age 조회"""
+    response = google_requests.Request()(url=GOOGLE_OAUTH2_CERTS_URL, method="GET")
+    if response.status != 200:
+        raise google_exceptions.TransportError(f"구글 인증서 조회 실패: status={response.status}")
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", "") or "")
+    max_age = int(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_MAX_AGE
+    return json.loads(response.data.decode("utf-8")), max_age
+
+
+class GoogleCertCache:
+    """
+    구글 ID 토큰 서명 인증서 캐시 + 오프라인 검증
+
+    - 인증서 응답의 Cache-Control max-age 동안 재사용 (로그인마다 외부 HTTPS 호출 없음)
+    - 만료가 가까워지면 현재 인증서로 계속 검증하면서 백그라운드 스레드에서 갱신
+    - 완전히 만료됐거나 모르는 kid(키 교체 직후)면 한 번만 동기 갱신 (동시 요청은 같은 결과 공유)
+    - fetcher 를 바꿔 끼우면 로컬 키로 테스트 가능
+    """
+
+    def __init__(self, fetcher: CertFetcher = fetch_google_certs):
+        self._fetcher = fetcher
+        self._certs: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_forced = float("-inf")
+        self.fetches = 0
+
+    def _store(self, certs: Dict[str, str], max_age: int) -> None:
+        now = time.monotonic()
+        self._certs, self._fetched_at, self._expires_at = certs, now, now + max_age
+        self.fetches += 1
+
+    def refresh(self) -> Dict[str, str]:
+        """동기 갱신 (lifespan 에서 미리 적재할 때도 사용)"""
+        certs, max_age = self._fetcher()
+        with self._lock:
+            self._store(certs, max_age)
+        return certs
+
+    def _refresh_in_background(self) -> None:
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                # 기존 인증서가 아직 유효하므로 다음 요청 때 다시 시도
+                logger.warning(f"[구글 인증서 백그라운드 갱신 실패] {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+    def get_certs(self, force: bool = False) -> Dict[str, str]:
+        now = time.monotonic()
+        if not force and self._certs and now < self._expires_at:
+            refresh_at = self._expires_at - (self._expires_at - self._fetched_at) * GOOGLE_CERTS_REFRESH_AHEAD
+            if now >= refresh_at and not self._refreshing:
+                self._refreshing = True
+                self._refresh_in_background()
+            return self._certs
+
+        with self._lock:
+            # 기다리는 동안 다른 요청이 이미 갱신했으면 그 결과 사용
+            now = time.monotonic()
+            fresh = self._certs and now < self._expires_at
+            if fresh and (not force or now - self._last_forced < GOOGLE_CERTS_MIN_REFRESH_INTERVAL):
+                return self._certs
+            if force:
+                self._last_forced = now
+            certs, max_age = self._fetcher()
+            self._store(certs, max_age)
+            return certs
+
+    def verify(self, token: str, audience: Optional[str]) -> dict:
+        """
+        google.oauth2.id_token.verify_oauth2_token 과 같은 검증을 캐시된 인증서로 수행
+        실패하면 ValueError
+        """
+        certs = self.get_certs()
+        kid = google_jwt.decode_header(token).get("kid")
+        if kid and kid not in certs:
+            # 구글이 키를 교체한 직후 → 인증서를 한 번 다시 받아본다
+            certs = self.get_certs(force=True)
+
+        idinfo = google_jwt.decode(token, certs=certs, audience=audience,
+                                   clock_skew_in_seconds=GOOGLE_ID_TOKEN_CLOCK_SKEW)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"잘못된 발급자입니다: {idinfo.get('iss')}")
+        return idinfo
+
+
+# 싱글톤 인스턴스
+google_certs = GoogleCertCache()
@@ -0,0 +1,82 @@
+import os
+import logging
+import importlib.util
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 는 h2 패키지가 설치된 경우에만 사용 (없으면 HTTP/1.1 keep-alive)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 업스트림별 연결 수 / keep-alive / 타임아웃 프로필
+# timeout: 응답 대기(read) 시간, connect: 연결 수립 시간 (초)
+UPSTREAM_PROFILES = {
+    # 분석 서버 (TARGET_SERVER_URL) — 분석 요청은 응답이 늦을 수 있음
+    "analysis": {
+        "timeout": 70.0, "connect": 5.0,
+        "max_connections": int(os.getenv("HTTP_ANALYSIS_MAX_CONNECTIONS", "50")),
+        "max_keepalive": 20, "keepalive_expiry": 30.0,
+    },
+    # 유튜브 전처리 서버 (PREPROCESS_SERVER_URL) — 전처리 시간 고려하여 5분
+    "preprocess": {
+        "timeout": 300.0, "connect": 5.0,
+        "max_connections": int(os.getenv("HTTP_PREPROCESS_MAX_CONNECTIONS", "10")),
+        "max_keepalive": 5, "keepalive_expiry": 30.0,
+    },
+    # 그 외 (pitch.json 등 일반 URL 조회)
+    "default": {
+        "timeout": 10.0, "connect": 5.0,
+        "max_connections": int(os.getenv("HTTP_DEFAULT_MAX_CONNECTIONS", "20")),
+        "max_keepalive": 10, "keepalive_expiry": 15.0,
+    },
+}
+
+
+def _build_client(profile: dict) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(profile["timeout"], connect=profile["connect"]),
+        limits=httpx.Limits(
+            max_connections=profile["max_connections"],
+            max_keepalive_connections=profile["max_keepalive"],
+            keepalive_expiry=profile["keepalive_expiry"],
+        ),
+        http2=HTTP2_AVAILABLE,
+    )
+
+
+class HttpClientRegistry:
+    """
+    업스트림별 공유 httpx.AsyncClient 모음 (앱 수명 동안 유지)
+
+    - 요청마다 AsyncClient 를 새로 만들면 매번 TCP/TLS 핸드셰이크 + 임시 포트 소모
+    - 업스트림마다 커넥션 풀을 따로 둬서 느린 서버가 다른 서버용 연결을 잠식하지 않음
+    - lifespan 에서 start()/aclose(), 그 밖(스크립트 등)에서는 첫 get() 때 생성
+    """
+
+    def __init__(self, profiles: Dict[str, dict] = UPSTREAM_PROFILES):
+        self.profiles = profiles
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        if name not in self.profiles:
+            name = "default"
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = _build_client(self.profiles[name])
+        return client
+
+    def start(self) -> None:
+        for name in self.profiles:
+            self.get(name)
+        logger.info(f"[HTTP 클라이언트 준비] {', '.join(self.profiles)} (http2={HTTP2_AVAILABLE})")
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+
+# 싱글톤 인스턴스
+http_clients = HttpClientRegistry()
@@ -0,0 +1,143 @@
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class LocalQueueBackend:
+    """
+    SQS 클라이언트 대체용 프로세스 내부 큐 (로컬 개발, 부하 테스트용)
+
+    boto3 SQS 클라이언트에서 실제로 쓰는 메서드만 같은 이름/인자/응답 형태로 구현한다.
+    → SQSService / SQSBatchPublisher / AnalysisQueueConsumer 를 수정 없이 그대로 사용
+
+    - receive_message: WaitTimeSeconds 동안 long polling, 받은 메시지는 VisibilityTimeout 동안 숨김
+    - 삭제되지 않은 메시지는 visibility timeout 이 지나면 다시 보임 (재전달)
+    - 큐 URL 과 상관없이 큐 하나만 관리
+    """
+
+    DEFAULT_VISIBILITY_TIMEOUT = 30
+
+    def __init__(self, visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT):
+        self.visibility_timeout = visibility_timeout
+        self._messages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()   # message_id → 메시지
+        self._receipts: Dict[str, str] = {}                                  # receipt_handle → message_id
+        self._cond = threading.Condition()
+
+    # ────────────── 전송 ──────────────
+    def _enqueue(self, body: str, attributes: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        message_id = str(uuid.uuid4())
+        self._messages[message_id] = {
+            "MessageId": message_id,
+            "Body": body,
+            "MD5OfMessageBody": hashlib.md5(body.encode()).hexdigest(),
+            "MessageAttributes": attributes or {},
+            "visible_at": 0.0,
+            "receipt": None,
+            "receive_count": 0,
+        }
+        return {"MessageId": message_id, "MD5OfMessageBody": self._messages[message_id]["MD5OfMessageBody"]}
+
+    def send_message(self, QueueUrl: str, MessageBody: str, MessageAttributes: Optional[Dict[str, Any]] = None,
+                     **kwargs) -> Dict[str, Any]:
+        with self._cond:
+            result = self._enqueue(MessageBody, MessageAttributes)
+            self._cond.notify_all()
+        return result
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        successful = []
+        with self._cond:
+            for entry in Entries:
+                result = self._enqueue(entry["MessageBody"], entry.get("MessageAttributes"))
+                successful.append({"Id": entry["Id"], **result})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    # ────────────── 수신 / 삭제 ──────────────
+    def _take_visible(self, max_messages: int, visibility_timeout: int) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        result = []
+        for message in self._messages.values():
+            if len(result) >= max_messages:
+                break
+            if message["visible_at"] > now:
+                continue
+            if message["receipt"] is not None:
+                self._receipts.pop(message["receipt"], None)
+            message["receipt"] = str(uuid.uuid4())
+            message["visible_at"] = now + visibility_timeout
+            message["receive_count"] += 1
+            self._receipts[message["receipt"]] = message["MessageId"]
+            result.append({
+                "MessageId": message["MessageId"],
+                "ReceiptHandle": message["receipt"],
+                "Body": message["Body"],
+                "MD5OfBody": message["MD5OfMessageBody"],
+                "MessageAttributes": message["MessageAttributes"],
+                "Attributes": {"ApproximateReceiveCount": str(message["receive_count"])},
+            })
+        return result
+
+    def _next_visible_in(self) -> Optional[float]:
+        now = time.monotonic()
+        waits = [m["visible_at"] - now for m in self._messages.values()]
+        return max(0.0, min(waits)) if waits else None
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, WaitTimeSeconds: int = 0,
+                        VisibilityTimeout: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        visibility = self.visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._cond:
+            while True:
+                messages = self._take_visible(min(MaxNumberOfMessages, 10), visibility)
+                remaining = deadline - time.monotonic()
+                if messages or remaining <= 0:
+                    break
+                # 새 메시지가 들어오거나, 숨겨진 메시지가 다시 보일 때까지 대기
+                next_visible = self._next_visible_in()
+                self._cond.wait(remaining if next_visible is None else min(remaining, next_visible + 0.01))
+        return {"Messages": messages} if messages else {}
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> Dict[str, Any]:
+        with self._cond:
+            message_id = self._receipts.pop(ReceiptHandle, None)
+            if message_id is not None:
+                self._messages.pop(message_id, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        successful, failed = [], []
+        with self._cond:
+            for entry in Entries:
+                message_id = self._receipts.pop(entry["ReceiptHandle"], None)
+                if message_id is None:
+                    # 이미 visibility timeout 이 지나 다른 소비자에게 넘어간 경우 (SQS 와 동일)
+                    failed.append({"Id": entry["Id"], "SenderFault": True,
+                                   "Code": "ReceiptHandleIsInvalid", "Message": "receipt handle expired"})
+                    continue
+                self._messages.pop(message_id, None)
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int) -> Dict[str, Any]:
+        with self._cond:
+            message_id = self._receipts.get(ReceiptHandle)
+            if message_id is None:
+                raise ValueError("ReceiptHandleIsInvalid")
+            self._messages[message_id]["visible_at"] = time.monotonic() + VisibilityTimeout
+            self._cond.notify_all()
+        return {}
+
+    # ────────────── 상태 ──────────────
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: Optional[List[str]] = None) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            visible = sum(1 for m in self._messages.values() if m["visible_at"] <= now)
+            total = len(self._messages)
+        return {"Attributes": {
+            "ApproximateNumberOfMessages": str(visible),
+            "ApproximateNumberOfMessagesNotVisible": str(total - visible),
+        }}
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select, func, desc
+from sqlalchemy.orm import Session
+
+from models import Bookmark, Token, AnalysisResult, Script
+from schemas import BookmarkListOut, TokenInfo, MyDubbedTokenResponse
+from services.user_stats import get_user_stats, average
+
+# 마이페이지 overview 캐시 / 최근 목록 설정
+MYPAGE_OVERVIEW_TTL_SECONDS = float(os.getenv("MYPAGE_OVERVIEW_TTL_SECONDS", "30"))
+MYPAGE_OVERVIEW_MAX_ENTRIES = int(os.getenv("MYPAGE_OVERVIEW_MAX_ENTRIES", "5000"))
+RECENT_LIST_LIMIT = 5
+
+
+def dubbed_tokens_query(db: Session, user_id: int):
+    """
+    사용자가 더빙한 토큰별 (마지막 더빙 시각, 전체 스크립트 수, 분석 결과 수)
+
+    분석 결과와 스크립트를 각각 토큰 단위로 먼저 집계한 뒤 조인한다
+    (둘을 바로 조인하면 행이 곱해져서 completed_scripts 가 스크립트 수만큼 부풀려짐)
+    """
+    analyses = (
+        select(
+            AnalysisResult.token_id.label("token_id"),
+            func.max(AnalysisResult.created_at).label("last_dubbed_at"),
+            func.count(AnalysisResult.id).label("completed_scripts"),
+        )
+        .where(AnalysisResult.user_id == user_id)
+        .group_by(AnalysisResult.token_id)
+        .subquery()
+    )
+    scripts = (
+        select(Script.token_id.label("token_id"), func.count(Script.id).label("total_scripts"))
+        .where(Script.token_id.in_(select(analyses.c.token_id)))
+        .group_by(Script.token_id)
+        .subquery()
+    )
+    return (
+        db.query(
+            Token.id.label("token_id"),
+            Token.token_name,
+            Token.actor_name,
+            Token.category,
+            Token.youtube_url,
+            analyses.c.last_dubbed_at,
+            scripts.c.total_scripts,
+            analyses.c.completed_scripts,
+        )
+        .join(analyses, analyses.c.token_id == Token.id)
+        .join(scripts, scripts.c.token_id == Token.id)
+        .order_by(desc(analyses.c.last_dubbed_at))
+    )
+
+
+def to_dubbed_token_response(row) -> MyDubbedTokenResponse:
+    return MyDubbedTokenResponse(
+        token_id=row.token_id,
+        token_name=row.token_name,
+        actor_name=row.actor_name,
+        category=row.category,
+        youtube_url=row.youtube_url,
+        last_dubbed_at=row.last_dubbed_at,
+        total_scripts=row.total_scripts,
+        completed_scripts=row.completed_scripts,
+    )
+
+
+def compute_overview(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    마이페이지 overview 의 사용자 정보를 제외한 나머지 계산
+
+    - 개수/평균은 user_stats 한 행에서 읽음 (analysis_results 스캔 없음)
+    - 최근 북마크 / 더빙 토큰은 RECENT_LIST_LIMIT 개만 조회
+    """
+    stats = get_user_stats(db, user_id)
+    average_score = average(stats.completion_score_sum, stats.completion_score_count) if stats else None
+    total_bookmarks = db.query(func.count(Bookmark.id)).filter(Bookmark.user_id == user_id).scalar()
+
+    recent_bookmarks = [
+        BookmarkListOut(
+            id=bookmark.id,
+            user_id=bookmark.user_id,
+            token_id=bookmark.token_id,
+            created_at=bookmark.created_at,
+            token=TokenInfo(
+                id=token.id,
+                token_name=token.token_name,
+                actor_name=token.actor_name,
+                category=token.category,
+                thumbnail_url=getattr(token, "thumbnail_url", None),
+                youtube_url=getattr(token, "youtube_url", None),
+            ),
+        )
+        for bookmark, token in (
+            db.query(Bookmark, Token)
+            .join(Token, Token.id == Bookmark.token_id)
+            .filter(Bookmark.user_id == user_id)
+            .order_by(Bookmark.created_at.desc())
+            .limit(RECENT_LIST_LIMIT)
+            .all()
+        )
+    ]
+
+    recent_dubbed_tokens = [
+        to_dubbed_token_response(row)
+        for row in dubbed_tokens_query(db, user_id).limit(RECENT_LIST_LIMIT).all()
+    ]
+
+    return {
+        "total_bookmarks": total_bookmarks or 0,
+        "total_dubbed_tokens": stats.dubbed_token_count if stats else 0,
+        "total_practice_count": stats.practice_count if stats else 0,
+        "average_completion_rate": round(average_score or 0.0, 2),
+        "recent_bookmarks": recent_bookmarks,
+        "recent_dubbed_tokens": recent_dubbed_tokens,
+    }
+
+
+class MyPageOverviewCache:
+    """
+    사용자별 마이페이지 overview 캐시
+
+    - TTL 동안 재사용하고, 북마크/분석 결과가 바뀌는 곳에서 invalidate(user_id) 호출
+    - 여러 워커를 띄운 경우 다른 워커의 변경은 TTL 이 지나야 반영된다
+    """
+
+    def __init__(self, ttl_seconds: float = MYPAGE_OVERVIEW_TTL_SECONDS,
+                 max_entries: int = MYPAGE_OVERVIEW_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached and now - cached[1] < self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                return cached[0]
+
+        overview = compute_overview(db, user_id)
+        with self._lock:
+            self._entries[user_id] = (overview, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return overview
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+# 싱글톤 인스턴스
+mypage_overview_cache = MyPageOverviewCache()
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import logging
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+
+class PcmDiskStore:
+    """
+    raw PCM(.pcm) + 메타데이터(.json) 디스크 저장소 (스템 캐시 / 렌더 캐시 공용)
+
+    - 디코딩이 끝난 샘플을 그대로 저장하므로 다시 읽을 때 WAV 디코딩이 없다
+    - 쓰기는 임시 파일 → rename 으로 원자적으로 교체 (다른 워커가 반쯤 쓰인 파일을 읽지 않음)
+    - 전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은(mtime) 항목부터 삭제
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, name: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, name)
+        return f"{base}.pcm", f"{base}.json"
+
+    def read(self, name: str) -> Optional[Tuple[AudioSegment, Dict[str, Any]]]:
+        pcm_path, meta_path = self._paths(name)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(pcm_path, "rb") as f:
+                data = f.read()
+            audio = AudioSegment(
+                data=data,
+                sample_width=meta["sample_width"],
+                frame_rate=meta["frame_rate"],
+                channels=meta["channels"],
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+        # LRU 기준 시각 갱신
+        now = time.time()
+        for path in (pcm_path, meta_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return audio, meta
+
+    def read_meta(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._paths(name)[1]) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, name: str, audio: AudioSegment, extra: Optional[Dict[str, Any]] = None) -> None:
+        pcm_path, meta_path = self._paths(name)
+        meta = {
+            **(extra or {}),
+            "sample_width": audio.sample_width,
+            "frame_rate": audio.frame_rate,
+            "channels": audio.channels,
+        }
+        # 메타 삭제 → PCM 교체 → 메타 기록 순서 (메타가 있으면 PCM 도 같은 버전으로 완성된 상태)
+        try:
+            os.remove(meta_path)
+        except OSError:
+            pass
+        for path, payload, mode in ((pcm_path, audio.raw_data, "wb"), (meta_path, json.dumps(meta), "w")):
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, mode) as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        self.evict()
+
+    def delete(self, name: str) -> None:
+        for path in self._paths(name):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".pcm"):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, filename[:-len(".pcm")]))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, name in sorted(entries):
+            self.delete(name)
+            total -= size
+            logger.info(f"[PCM 캐시] 용량 초과로 삭제: {self.directory}/{name}")
+            if total <= self.max_bytes:
+                break
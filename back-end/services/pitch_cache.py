@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from services.s3_gateway import s3_gateway
+
+logger = logging.getLogger(__name__)
+
+# 캐시 크기 / ETag 재검증 주기 (환경 변수로 조정 가능)
+PITCH_CACHE_MAX_ENTRIES = int(os.getenv("PITCH_CACHE_MAX_ENTRIES", "512"))
+PITCH_CACHE_REVALIDATE_SECONDS = int(os.getenv("PITCH_CACHE_REVALIDATE_SECONDS", "3600"))
+
+
+class PitchCache:
+    """
+    pitch.json 인메모리 LRU 캐시
+
+    - 키: (Token.s3_pitch_url, S3 객체 ETag)
+    - pitch.json 은 전처리 이후 바뀌지 않으므로, 같은 URL 은 S3 접근 없이 바로 응답
+    - revalidate_seconds 가 지나면 head_object 로 ETag 만 확인하고, 바뀐 경우에만 다시 로드
+    """
+
+    def __init__(self, max_entries: int = PITCH_CACHE_MAX_ENTRIES, revalidate_seconds: int = PITCH_CACHE_REVALIDATE_SECONDS):
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Any]" = OrderedDict()
+        self._etags: Dict[str, Tuple[Optional[str], float]] = {}  # url → (etag, 마지막 확인 시각)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ────────────── 내부 유틸 ──────────────
+    def _lookup(self, url: str) -> Tuple[bool, Any, bool]:
+        """(캐시 존재 여부, 데이터, 재검증 필요 여부)"""
+        with self._lock:
+            etag_info = self._etags.get(url)
+            if etag_info is None:
+                return False, None, False
+            etag, checked_at = etag_info
+            key = (url, etag)
+            if key not in self._entries:
+                return False, None, False
+            self._entries.move_to_end(key)
+            stale = (time.monotonic() - checked_at) > self.revalidate_seconds
+            return True, self._entries[key], stale
+
+    def _store(self, url: str, etag: Optional[str], data: Any) -> None:
+        with self._lock:
+            old = self._etags.get(url)
+            if old is not None and old[0] != etag:
+                self._entries.pop((url, old[0]), None)
+            self._etags[url] = (etag, time.monotonic())
+            self._entries[(url, etag)] = data
+            self._entries.move_to_end((url, etag))
+            while len(self._entries) > self.max_entries:
+                (old_url, old_etag), _ = self._entries.popitem(last=False)
+                if self._etags.get(old_url, (None,))[0] == old_etag:
+                    self._etags.pop(old_url, None)
+                self.evictions += 1
+
+    def _touch(self, url: str) -> None:
+        with self._lock:
+            if url in self._etags:
+                self._etags[url] = (self._etags[url][0], time.monotonic())
+
+    # ────────────── 공개 API ──────────────
+    async def get(self, s3_client, url: Optional[str]) -> Any:
+        """캐시에서 pitch.json 을 반환하고, 없으면 S3 에서 로드해 저장"""
+        if not url:
+            return None
+
+        # 순환 import 방지
+        from router.utils_s3 import _parse_s3, load_json
+
+        found, data, stale = self._lookup(url)
+        bk = _parse_s3(url)
+
+        if found and not stale:
+            self.hits += 1
+            return data
+
+        if found and stale and bk:
+            # ETag 만 확인 (본문 다운로드 없음)
+            try:
+                b, k = bk
+                head = await s3_gateway.run(s3_client.head_object, Bucket=b, Key=k)
+                cached_etag = self._etags.get(url, (None,))[0]
+                if head.get("ETag") == cached_etag:
+                    self._touch(url)
+                    self.hits += 1
+                    return data
+            except Exception as e:
+                # 재검증 실패 시에는 기존 데이터를 그대로 사용
+                logging.warning("pitch.json revalidate error %s", e)
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        if bk:
+            data, etag = await s3_gateway.run(self._fetch_from_s3, s3_client, *bk)
+        else:
+            # 일반 http URL 은 ETag 없이 URL 만으로 캐싱
+            data, etag = await load_json(s3_client, url), None
+
+        if data is not None:
+            self._store(url, etag, data)
+        return data
+
+    @staticmethod
+    def _fetch_from_s3(s3_client, bucket: str, key: str) -> Tuple[Any, Optional[str]]:
+        try:
+            obj = s3_client.get_object(Bucket=bucket, Key=key)
+            return json.load(obj["Body"]), obj.get("ETag")
+        except Exception as e:
+            logging.warning("pitch.json load error %s", e)
+            return None, None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._etags.clear()
+
+
+# 싱글톤 인스턴스
+pitch_cache = PitchCache()
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from database import SessionLocal
+from models import User
+
+# 인증 사용자 스냅샷 캐시 설정
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    인증된 사용자의 읽기 전용 스냅샷
+
+    라우터에서 current_user 로 쓰는 컬럼만 담는다 (세션에 묶이지 않으므로 요청 간 공유 가능).
+    ORM User 와 같은 속성 이름을 사용하므로 current_user.id / .email / .is_admin 등은 그대로 동작한다.
+    """
+    id: int
+    email: str
+    google_id: Optional[str]
+    profile_picture: Optional[str]
+    full_name: Optional[str]
+    is_active: bool
+    login_type: Optional[str]
+    is_admin: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            google_id=user.google_id,
+            profile_picture=user.profile_picture,
+            full_name=user.full_name,
+            is_active=bool(user.is_active) if user.is_active is not None else True,
+            login_type=user.login_type,
+            is_admin=bool(user.is_admin),
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class PrincipalCache:
+    """
+    JWT subject(user id) → Principal TTL 캐시
+
+    - 인증이 필요한 요청마다 users 테이블을 조회하지 않도록 짧은 TTL 동안 스냅샷 재사용
+    - 프로필이 바뀌는 곳(google_login 등)에서 invalidate() 호출
+    - max_entries 를 넘으면 가장 오래 쓰지 않은 항목부터 제거
+    """
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, session_factory=SessionLocal):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._session_factory = session_factory
+        self._entries: "OrderedDict[int, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        """캐시에 있으면 그대로, 없거나 만료됐으면 DB 에서 읽어 캐시. 없는 사용자면 None"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached and now - cached[1] < self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                return cached[0]
+
+        db = self._session_factory()
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+            principal = Principal.from_user(user) if user else None
+        finally:
+            db.close()
+
+        if principal is not None:
+            self.put(principal)
+        return principal
+
+    def put(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic())
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 싱글톤 인스턴스
+principal_cache = PrincipalCache()
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# local: 프로세스 내부 pub/sub (단일 워커/테스트용), redis: 여러 uvicorn 워커 간 공유
+PROGRESS_BUS_BACKEND = os.getenv("PROGRESS_BUS_BACKEND", "local").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+SSE_KEEPALIVE_SECONDS = 15    # 이벤트가 없을 때 keep-alive 주석 전송 주기
+SSE_RESYNC_SECONDS = 60       # 이벤트 유실 대비: 이 시간 동안 조용하면 DB 1회 재확인
+
+# 이 상태가 되면 SSE 스트림 종료 (retryable: 업스트림 과부하로 요청을 보내지 못함, 다시 요청 필요)
+TERMINAL_STATUSES = {"completed", "failed", "retryable"}
+
+
+class _QueueSubscription:
+    def __init__(self, queue: "asyncio.Queue[str]"):
+        self._queue = queue
+
+    async def get(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalProgressBackend:
+    """프로세스 내부 pub/sub (단일 워커, 로컬 개발, 테스트용)"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: str) -> None:
+        # 동기 헬퍼(스레드풀)에서도 호출되므로 thread-safe 하게 전달
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # 이미 닫힌 이벤트 루프
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[_QueueSubscription]:
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield _QueueSubscription(entry[1])
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(entry)
+                    if not subs:
+                        del self._subscribers[channel]
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[str]:
+        msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if msg is None:
+            return None
+        data = msg.get("data")
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+
+class RedisProgressBackend:
+    """Redis pub/sub 기반 (여러 uvicorn 워커 간 진행 상황 공유)"""
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+        import redis.asyncio as aioredis
+
+        self._sync = redis.Redis.from_url(url)
+        self._async = aioredis.from_url(url)
+        self._publish_lock: Optional[asyncio.Lock] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    def publish(self, channel: str, message: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 이벤트 루프 밖(스레드풀의 동기 헬퍼) → 동기 클라이언트로 바로 전송
+            self._sync.publish(channel, message)
+            return
+        # 이벤트 루프 안(async update_* 헬퍼) → Redis 왕복 동안 루프를 막지 않도록 백그라운드로 전송
+        task = loop.create_task(self._publish_async(channel, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish_async(self, channel: str, message: str) -> None:
+        if self._publish_lock is None:
+            self._publish_lock = asyncio.Lock()
+        try:
+            # Lock 은 먼저 기다린 순서대로 넘겨주므로 같은 작업의 진행 상황 순서가 유지된다
+            async with self._publish_lock:
+                await self._async.publish(channel, message)
+        except Exception as e:
+            logger.warning(f"[진행 상황 publish 실패] channel={channel}, error={e}")
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[_RedisSubscription]:
+        pubsub = self._async.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+
+def _backend_from_env():
+    if PROGRESS_BUS_BACKEND == "redis":
+        try:
+            return RedisProgressBackend()
+        except Exception as e:
+            logger.error(f"Redis 진행 상황 버스 초기화 실패, local 로 대체: {e}")
+    return LocalProgressBackend()
+
+
+class ProgressBus:
+    """
+    작업(job) 진행 상황 pub/sub 버스
+
+    update_* 헬퍼가 상태를 커밋한 뒤 스냅샷을 publish 하고,
+    SSE 스트림은 DB 를 폴링하는 대신 실제 상태 변화가 있을 때만 깨어난다.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or _backend_from_env()
+
+    @staticmethod
+    def channel(job_id: str) -> str:
+        return f"progress:{job_id}"
+
+    def use_backend(self, backend) -> None:
+        """백엔드 교체 (테스트에서 LocalProgressBackend 주입용)"""
+        self.backend = backend
+
+    def publish(self, job_id: str, snapshot: Dict[str, Any]) -> None:
+        # 진행 상황 전파 실패가 작업 자체를 실패시키지 않도록 예외는 로그만 남김
+        try:
+            message = json.dumps(snapshot, ensure_ascii=False, default=str)
+            self.backend.publish(self.channel(job_id), message)
+        except Exception as e:
+            logger.warning(f"[진행 상황 publish 실패] job_id={job_id}, error={e}")
+
+    def subscribe(self, job_id: str):
+        return self.backend.subscribe(self.channel(job_id))
+
+
+# 싱글톤 인스턴스
+progress_bus = ProgressBus()
+
+
+def _sse(message: str) -> str:
+    return f"data: {message}\n\n"
+
+
+async def _load(load_snapshot: Callable[[], Any]) -> Optional[Dict[str, Any]]:
+    # 비동기 로더는 그대로 await, 동기 로더는 스레드에서 실행
+    if asyncio.iscoroutinefunction(load_snapshot):
+        return await load_snapshot()
+    return await asyncio.to_thread(load_snapshot)
+
+
+async def job_event_stream(
+    job_id: str,
+    load_snapshot: Callable[[], Any],
+    is_disconnected: Optional[Callable[[], Any]] = None,
+    max_runtime: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    SSE 이벤트 제너레이터
+
+    - 접속 시 DB 에서 스냅샷을 1회만 읽어 전송
+    - 이후에는 progress_bus 이벤트가 올 때만 전송 (이미 직렬화된 JSON 그대로)
+    - 이벤트가 오래 없으면 keep-alive 주석 전송, SSE_RESYNC_SECONDS 마다 DB 1회 재확인
+    """
+    async with progress_bus.subscribe(job_id) as subscription:
+        # 구독 후에 스냅샷을 읽어야 그 사이의 상태 변화를 놓치지 않는다
+        snapshot = await _load(load_snapshot)
+        if snapshot is None:
+            yield _sse(json.dumps({"error": "Job not found"}, ensure_ascii=False))
+            return
+        yield _sse(json.dumps(snapshot, ensure_ascii=False, default=str))
+        if snapshot.get("status") in TERMINAL_STATUSES:
+            return
+
+        started = last_event = time.monotonic()
+        while True:
+            if is_disconnected is not None and await is_disconnected():
+                logger.info(f"[SSE] 연결 종료 감지됨: job_id={job_id}")
+                return
+            # 남은 실행 시간보다 오래 기다리지 않아야 max_runtime 에 맞춰 종료된다
+            wait = SSE_KEEPALIVE_SECONDS
+            if max_runtime is not None:
+                remaining = max_runtime - (time.monotonic() - started)
+                if remaining <= 0:
+                    logger.info(f"[SSE] SSE 타임아웃 종료: job_id={job_id}")
+                    return
+                wait = min(wait, remaining)
+
+            message = await subscription.get(timeout=wait)
+            if message is None:
+                if max_runtime is not None and time.monotonic() - started >= max_runtime:
+                    logger.info(f"[SSE] SSE 타임아웃 종료: job_id={job_id}")
+                    return
+                if time.monotonic() - last_event < SSE_RESYNC_SECONDS:
+                    yield ": keep-alive\n\n"
+                    continue
+                snapshot = await _load(load_snapshot)
+                if snapshot is None:
+                    yield _sse(json.dumps({"error": "Job not found"}, ensure_ascii=False))
+                    return
+                message = json.dumps(snapshot, ensure_ascii=False, default=str)
+                status = snapshot.get("status")
+            else:
+                try:
+                    status = json.loads(message).get("status")
+                except ValueError:
+                    status = None
+
+            last_event = time.monotonic()
+            yield _sse(message)
+            if status in TERMINAL_STATUSES:
+                return
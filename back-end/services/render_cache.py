@@ -0,0 +1,102 @@
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydub import AudioSegment
+
+from services.pcm_store import PcmDiskStore
+
+# (user, token) 별 마지막 믹싱 결과 캐시 설정
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yousync_render_cache"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(1024 ** 3)))   # 기본 1GB
+# 바뀐 구간 비율이 이 값을 넘으면 부분 재렌더 대신 전체 렌더
+RENDER_INCREMENTAL_MAX_RATIO = float(os.getenv("RENDER_INCREMENTAL_MAX_RATIO", "0.5"))
+# 구간 길이(ms) 반올림/샘플레이트 차이를 덮는 여유분
+WINDOW_MARGIN_MS = 5
+
+
+class RenderCache:
+    """
+    (user_id, token_id) 별 마지막 더빙 믹싱 결과(raw PCM) + manifest 캐시
+
+    manifest:
+      - stems: 배경/원본 보컬 digest (ETag 기준) → 바뀌면 전체 렌더
+      - segments: {script_id: {etag, start, end, ms}} → 사용자 음성별 ETag / 위치 / 길이
+    한 줄만 다시 녹음한 경우 바뀐 구간의 시간 범위만 다시 믹싱해서 이전 결과에 덮어쓴다.
+    """
+
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_BYTES,
+                 max_ratio: float = RENDER_INCREMENTAL_MAX_RATIO):
+        self.store = PcmDiskStore(directory, max_bytes)
+        self.max_ratio = max_ratio
+
+    @staticmethod
+    def _name(user_id: int, token_id: int) -> str:
+        return f"render_{user_id}_{token_id}"
+
+    def load(self, user_id: int, token_id: int) -> Optional[Tuple[AudioSegment, Dict[str, Any]]]:
+        cached = self.store.read(self._name(user_id, token_id))
+        if cached is None:
+            return None
+        audio, meta = cached
+        manifest = meta.get("manifest")
+        return (audio, manifest) if manifest else None
+
+    def save(self, user_id: int, token_id: int, audio: AudioSegment, manifest: Dict[str, Any]) -> None:
+        self.store.write(self._name(user_id, token_id), audio, {"manifest": manifest})
+
+    @staticmethod
+    def build_manifest(stems: List[str], segments: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        return {"stems": list(stems), "segments": {str(sid): seg for sid, seg in segments.items()}}
+
+    def plan(self, manifest: Optional[Dict[str, Any]], stems: List[str],
+             current: Dict[int, Dict[str, Any]]) -> Optional[List[int]]:
+        """
+        다시 녹음된 script_id 목록 반환 (빈 목록이면 이전 결과 그대로 사용 가능)
+        None 이면 전체 렌더 필요 (캐시 없음, 스템 변경, 구간 추가/삭제/위치 변경, 변경 비율 초과)
+        current: {script_id: {etag, start, end}}
+        """
+        if not manifest or manifest.get("stems") != list(stems):
+            return None
+        previous = {int(sid): seg for sid, seg in manifest.get("segments", {}).items()}
+        if previous.keys() != current.keys():
+            return None
+
+        changed = []
+        for sid, seg in current.items():
+            prev = previous[sid]
+            if (prev["start"], prev["end"]) != (seg["start"], seg["end"]):
+                return None
+            if prev["etag"] != seg["etag"]:
+                changed.append(sid)
+        if len(changed) > len(current) * self.max_ratio:
+            return None
+        return changed
+
+    @staticmethod
+    def windows(manifest: Dict[str, Any], changed: Dict[int, float]) -> List[Tuple[float, float]]:
+        """
+        다시 계산할 시간 범위(ms) 목록
+        changed: {script_id: 새 음성 길이(ms)} → 이전/새 길이 중 긴 쪽까지 덮음
+        """
+        result = []
+        for sid, new_ms in changed.items():
+            prev = manifest["segments"][str(sid)]
+            start_ms = prev["start"] * 1000
+            result.append((start_ms, start_ms + max(prev["ms"], new_ms) + WINDOW_MARGIN_MS))
+        return result
+
+    @staticmethod
+    def overlapping(manifest: Dict[str, Any], windows: List[Tuple[float, float]]) -> List[int]:
+        """창과 겹치는(= 다시 믹싱할 때 음성이 필요한) script_id 목록"""
+        result = []
+        for sid, seg in manifest["segments"].items():
+            seg_start = seg["start"] * 1000
+            seg_end = seg_start + seg["ms"] + WINDOW_MARGIN_MS
+            if any(seg_start < hi and seg_end > lo for lo, hi in windows):
+                result.append(int(sid))
+        return result
+
+
+# 싱글톤 인스턴스
+render_cache = RenderCache()
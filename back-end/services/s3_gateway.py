@@ -0,0 +1,130 @@
+import os
+import asyncio
+import logging
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 공유 executor / 커넥션 풀 크기 (코어 수에 비례, 환경 변수로 조정 가능)
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", str(S3_MAX_WORKERS * 2)))
+
+# 스트리밍 업로드 설정
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024                   # UploadFile 에서 한 번에 읽는 크기 (1MB)
+UPLOAD_SPOOL_MAX_MEMORY = 1024 * 1024                  # 이 크기를 넘으면 디스크 임시파일로 전환
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024               # 8MB 이상이면 멀티파트 업로드
+S3_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+
+
+class S3Gateway:
+    """
+    모든 라우터가 공유하는 비동기 S3 접근 계층
+
+    - boto3 클라이언트 1개 (thread-safe) + 튜닝된 커넥션 풀
+    - 블로킹 boto3 호출은 크기가 제한된 공유 ThreadPoolExecutor 에서 실행
+    """
+
+    def __init__(self, max_workers: int = S3_MAX_WORKERS, max_pool_connections: int = S3_MAX_POOL_CONNECTIONS):
+        self.max_workers = max_workers
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.getenv("AWS_REGION", "ap-northeast-2"),
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={"max_attempts": 3, "mode": "adaptive"},
+                tcp_keepalive=True,
+            ),
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_CHUNK_SIZE,
+            max_concurrency=S3_MULTIPART_CONCURRENCY,
+            io_chunksize=UPLOAD_READ_CHUNK_SIZE,
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3")
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """블로킹 함수를 공유 executor 에서 실행"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    # ────────────── 자주 쓰는 호출 래퍼 ──────────────
+    async def get_object(self, bucket: str, key: str) -> Dict[str, Any]:
+        return await self.run(self.client.get_object, Bucket=bucket, Key=key)
+
+    async def head_object(self, bucket: str, key: str) -> Dict[str, Any]:
+        return await self.run(self.client.head_object, Bucket=bucket, Key=key)
+
+    async def put_object(self, bucket: str, key: str, body, content_type: Optional[str] = None) -> Dict[str, Any]:
+        extra = {"ContentType": content_type} if content_type else {}
+        return await self.run(self.client.put_object, Bucket=bucket, Key=key, Body=body, **extra)
+
+    async def upload_fileobj(self, fileobj, bucket: str, key: str, extra_args: Optional[Dict[str, Any]] = None) -> None:
+        await self.run(self.client.upload_fileobj, fileobj, bucket, key, ExtraArgs=extra_args)
+
+    async def upload_stream(self, fileobj, bucket: str, key: str, content_type: Optional[str] = None, client=None) -> None:
+        """
+        파일 객체를 청크 단위로 S3 에 업로드 (큰 파일은 멀티파트)
+        전체 내용을 메모리에 올리지 않는다.
+        """
+        client = client or self.client
+        extra = {"ContentType": content_type} if content_type else None
+        fileobj.seek(0)
+        await self.run(client.upload_fileobj, fileobj, bucket, key, ExtraArgs=extra, Config=self.transfer_config)
+
+    async def spool(self, upload, chunk_size: int = UPLOAD_READ_CHUNK_SIZE):
+        """
+        UploadFile 내용을 청크 단위로 임시 파일(SpooledTemporaryFile)에 복사
+
+        요청이 끝나면 UploadFile 이 닫히므로, 백그라운드 업로드용으로 소유권을 옮겨두는 용도.
+        UPLOAD_SPOOL_MAX_MEMORY 를 넘으면 디스크로 넘어가므로 요청당 메모리 사용량이 제한된다.
+        호출한 쪽에서 반드시 close() 해야 한다.
+        """
+        spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY)
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                await self.run(spooled.write, chunk)
+            spooled.seek(0)
+            return spooled
+        except Exception:
+            spooled.close()
+            raise
+
+    async def list_objects_v2(self, bucket: str, prefix: str) -> Dict[str, Any]:
+        return await self.run(self.client.list_objects_v2, Bucket=bucket, Prefix=prefix)
+
+    def generate_presigned_url(self, bucket: str, key: str, expires_in: int = 3600) -> str:
+        # 서명은 로컬 연산이므로 executor 를 거치지 않음
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# 싱글톤 인스턴스
+s3_gateway = S3Gateway()
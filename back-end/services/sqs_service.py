@@ -1,26 +1,219 @@
 import boto3
 import json
 import os
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 
+from services.local_queue import LocalQueueBackend
+
 logger = logging.getLogger(__name__)
 
+# sqs: AWS SQS, local: 프로세스 내부 큐 (로컬에서 USE_SQS_QUEUE=true 경로 전체를 돌려볼 때)
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "sqs").lower()
+LOCAL_QUEUE_URL = "local://audio-analysis-queue"
+
+# 배치 전송 설정 (send_message_batch 는 호출당 최대 10개 / 256KB)
+SQS_BATCH_MAX_SIZE = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+SQS_BATCH_LINGER_MS = float(os.getenv("SQS_BATCH_LINGER_MS", "20"))
+SQS_BATCH_MAX_RETRIES = int(os.getenv("SQS_BATCH_MAX_RETRIES", "3"))
+SQS_BATCH_RETRY_BACKOFF = 0.1   # 재시도 대기 (초), 시도마다 2배
+
+
+class SQSBatchPublisher:
+    """
+    SQS 배치 전송기
+
+    - publish() 로 들어온 메시지를 모아 send_message_batch 한 번으로 전송 (최대 10개)
+    - 10개가 차거나 linger_ms 가 지나면 전송 → 몰릴 때는 API 호출 수가 1/10 로 줄고,
+      한가할 때는 최대 linger_ms 만큼만 늦어진다
+    - boto3 호출은 이벤트 루프 밖(스레드)에서 실행
+    - 부분 실패(Failed)는 해당 항목만 재시도, SenderFault(메시지 자체 문제)는 바로 실패 처리
+    """
+
+    def __init__(self, sqs_client, queue_url: Optional[str],
+                 max_batch: int = SQS_BATCH_MAX_SIZE, linger_ms: float = SQS_BATCH_LINGER_MS,
+                 max_retries: int = SQS_BATCH_MAX_RETRIES):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        self.max_retries = max_retries
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self.api_calls = 0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def publish(self, body: str, attributes: Optional[Dict[str, Any]] = None) -> str:
+        """메시지를 배치에 넣고 전송이 끝나면 MessageId 반환 (최종 실패 시 예외)"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        entry = {"MessageBody": body}
+        if attributes:
+            entry["MessageAttributes"] = attributes
+        self._pending.append((entry, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    def _take_batch(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        batch, size = [], 0
+        while self._pending and len(batch) < self.max_batch:
+            entry = self._pending[0][0]
+            entry_size = len(entry["MessageBody"].encode()) + len(json.dumps(entry.get("MessageAttributes", {})))
+            if batch and size + entry_size > SQS_BATCH_MAX_BYTES:
+                break
+            batch.append(self._pending.pop(0))
+            size += entry_size
+        if not self._pending:
+            self._has_items.clear()
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_items.wait()
+            # 첫 메시지가 들어오면 linger 동안(또는 10개가 찰 때까지) 더 모은다
+            if not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.linger)
+                except asyncio.TimeoutError:
+                    pass
+            while self._pending:
+                batch = self._take_batch()
+                task = asyncio.create_task(self._send(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+                if not self._full.is_set():
+                    break
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        # 배치 안에서만 유일하면 되는 Id (재시도 시에도 그대로 사용)
+        remaining = {str(i): item for i, item in enumerate(batch)}
+        for attempt in range(self.max_retries + 1):
+            entries = [{"Id": entry_id, **entry} for entry_id, (entry, _) in remaining.items()]
+            try:
+                self.api_calls += 1
+                response = await asyncio.to_thread(
+                    self.sqs_client.send_message_batch, QueueUrl=self.queue_url, Entries=entries
+                )
+            except Exception as e:
+                logger.warning(f"[SQS 배치 전송 오류] {len(entries)}건, 시도 {attempt + 1}: {e}")
+                error = e
+            else:
+                for ok in response.get("Successful", []):
+                    _, future = remaining.pop(ok["Id"])
+                    if not future.done():
+                        future.set_result(ok["MessageId"])
+                error = None
+                for failed in response.get("Failed", []):
+                    if failed.get("SenderFault"):
+                        # 메시지 자체 문제 → 재시도해도 같은 결과
+                        _, future = remaining.pop(failed["Id"])
+                        if not future.done():
+                            future.set_exception(RuntimeError(f"SQS 전송 거부: {failed.get('Code')} {failed.get('Message')}"))
+                    else:
+                        error = RuntimeError(f"SQS 전송 실패: {failed.get('Code')} {failed.get('Message')}")
+            if not remaining:
+                return
+            if attempt < self.max_retries:
+                await asyncio.sleep(SQS_BATCH_RETRY_BACKOFF * (2 ** attempt))
+
+        for _, future in remaining.values():
+            if not future.done():
+                future.set_exception(error or RuntimeError("SQS 전송 실패"))
+
+    async def stop(self) -> None:
+        """남은 메시지를 모두 전송하고 종료 (앱 종료 시 호출)"""
+        if self._task is None:
+            return
+        while self._pending:
+            batch = self._take_batch()
+            task = asyncio.create_task(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+def _queue_client_from_env():
+    if QUEUE_BACKEND == "local":
+        return LocalQueueBackend()
+    return boto3.client(
+        'sqs',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION', 'ap-northeast-2')
+    )
+
+
 class SQSService:
     """SQS 메시지 전송 서비스"""
     
-    def __init__(self):
-        self.sqs_client = boto3.client(
-            'sqs',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'ap-northeast-2')
-        )
-        self.queue_url = os.getenv('SQS_QUEUE_URL')
-        
+    def __init__(self, sqs_client=None, queue_url: Optional[str] = None):
+        self.sqs_client = sqs_client or _queue_client_from_env()
+        self.queue_url = queue_url or os.getenv('SQS_QUEUE_URL')
+        if not self.queue_url and isinstance(self.sqs_client, LocalQueueBackend):
+            self.queue_url = LOCAL_QUEUE_URL
+
+        self.publisher = SQSBatchPublisher(self.sqs_client, self.queue_url)
+
         if not self.queue_url:
             logger.warning("SQS_QUEUE_URL 환경 변수가 설정되지 않았습니다.")
+
+    @staticmethod
+    def build_analysis_message(
+        job_id: str,
+        s3_audio_url: str,
+        token_id: str,
+        webhook_url: str,
+        token_info: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """분석 작업 메시지 (본문 JSON, MessageAttributes) 구성"""
+        message_body = {
+            "job_id": job_id,
+            "s3_audio_url": s3_audio_url,
+            "video_id": token_id,  # 기존 분석 서버 호환성을 위해 video_id 사용
+            "webhook_url": webhook_url,
+            "s3_textgrid_url": f"s3://testgrid-pitch-bgvoice-yousync/{token_info.get('s3_textgrid_url')}" if token_info.get('s3_textgrid_url') else None,
+            "s3_pitch_url": f"s3://testgrid-pitch-bgvoice-yousync/{token_info.get('s3_pitch_url')}" if token_info.get('s3_pitch_url') else None,
+            "timestamp": datetime.utcnow().isoformat(),
+            "source": "fastapi_backend"
+        }
+
+        # None 값 제거
+        message_body = {k: v for k, v in message_body.items() if v is not None}
+
+        attributes = {
+            'job_type': {
+                'StringValue': 'audio_analysis',
+                'DataType': 'String'
+            },
+            'priority': {
+                'StringValue': 'normal',
+                'DataType': 'String'
+            },
+            'job_id': {
+                'StringValue': job_id,
+                'DataType': 'String'
+            }
+        }
+        return json.dumps(message_body, ensure_ascii=False), attributes
     
     def send_analysis_message(
         self, 
@@ -49,38 +242,13 @@ class SQSService:
         
         try:
             # SQS 메시지 구성
-            message_body = {
-                "job_id": job_id,
-                "s3_audio_url": s3_audio_url,
-                "video_id": token_id,  # 기존 분석 서버 호환성을 위해 video_id 사용
-                "webhook_url": webhook_url,
-                "s3_textgrid_url": f"s3://testgrid-pitch-bgvoice-yousync/{token_info.get('s3_textgrid_url')}" if token_info.get('s3_textgrid_url') else None,
-                "s3_pitch_url": f"s3://testgrid-pitch-bgvoice-yousync/{token_info.get('s3_pitch_url')}" if token_info.get('s3_pitch_url') else None,
-                "timestamp": datetime.utcnow().isoformat(),
-                "source": "fastapi_backend"
-            }
-            
-            # None 값 제거
-            message_body = {k: v for k, v in message_body.items() if v is not None}
-            
+            body, attributes = self.build_analysis_message(job_id, s3_audio_url, token_id, webhook_url, token_info)
+
             # SQS에 메시지 전송
             response = self.sqs_client.send_message(
                 QueueUrl=self.queue_url,
-                MessageBody=json.dumps(message_body, ensure_ascii=False),
-                MessageAttributes={
-                    'job_type': {
-                        'StringValue': 'audio_analysis',
-                        'DataType': 'String'
-                    },
-                    'priority': {
-                        'StringValue': 'normal',
-                        'DataType': 'String'
-                    },
-                    'job_id': {
-                        'StringValue': job_id,
-                        'DataType': 'String'
-                    }
-                }
+                MessageBody=body,
+                MessageAttributes=attributes
             )
             
             message_id = response.get('MessageId')
@@ -91,6 +259,34 @@ class SQSService:
             logger.error(f"[SQS 전송 실패] job_id={job_id}, error={str(e)}")
             return None
     
+    async def send_analysis_message_async(
+        self,
+        job_id: str,
+        s3_audio_url: str,
+        token_id: str,
+        webhook_url: str,
+        token_info: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        분석 작업 메시지를 배치 전송기로 SQS에 전송 (이벤트 루프를 막지 않음)
+        동시에 들어온 메시지는 send_message_batch 한 번으로 묶여 나간다.
+
+        Returns:
+            SQS 메시지 ID 또는 None (실패시)
+        """
+        if not self.queue_url:
+            logger.error("SQS_QUEUE_URL이 설정되지 않아 메시지를 전송할 수 없습니다.")
+            return None
+
+        body, attributes = self.build_analysis_message(job_id, s3_audio_url, token_id, webhook_url, token_info)
+        try:
+            message_id = await self.publisher.publish(body, attributes)
+            logger.info(f"[SQS 전송 성공] job_id={job_id}, message_id={message_id}")
+            return message_id
+        except Exception as e:
+            logger.error(f"[SQS 전송 실패] job_id={job_id}, error={str(e)}")
+            return None
+
     def get_queue_attributes(self) -> Optional[Dict[str, Any]]:
         """큐 상태 정보 조회"""
         if not self.queue_url:
@@ -0,0 +1,102 @@
+import io
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from pydub import AudioSegment
+
+from services.s3_gateway import s3_gateway
+from services.pcm_store import PcmDiskStore
+
+logger = logging.getLogger(__name__)
+
+# 디코딩된 배경/보컬 스템(raw PCM) 디스크 캐시 설정
+STEM_CACHE_DIR = os.getenv("STEM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yousync_stem_cache"))
+STEM_CACHE_MAX_BYTES = int(os.getenv("STEM_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))   # 기본 2GB
+STEM_CACHE_REVALIDATE_SECONDS = float(os.getenv("STEM_CACHE_REVALIDATE_SECONDS", "300"))
+
+
+class StemCache:
+    """
+    S3 오디오 스템(vocal.wav / bgvoice.wav) 디스크 캐시
+
+    - 키: sha256("bucket/key:ETag") → 같은 내용이면 같은 파일 (content-addressed)
+    - 디코딩이 끝난 raw PCM 으로 저장(PcmDiskStore)하므로 재사용 시 다운로드/디코딩 모두 생략
+    - 전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은 파일부터 삭제
+    - ETag 는 revalidate_seconds 동안 재확인하지 않는다 (스템은 영상별로 고정)
+    """
+
+    def __init__(self, directory: str = STEM_CACHE_DIR, max_bytes: int = STEM_CACHE_MAX_BYTES,
+                 revalidate_seconds: float = STEM_CACHE_REVALIDATE_SECONDS):
+        self.store = PcmDiskStore(directory, max_bytes)
+        self.revalidate_seconds = revalidate_seconds
+        self._etags: Dict[Tuple[str, str], Tuple[str, float]] = {}   # (bucket, key) → (digest, 확인 시각)
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ────────────── 키 ──────────────
+    @staticmethod
+    def digest(bucket: str, key: str, etag: Optional[str]) -> str:
+        return hashlib.sha256(f"{bucket}/{key}:{etag}".encode()).hexdigest()
+
+    def _key_lock(self, digest: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(digest, threading.Lock())
+
+    def current_digest(self, s3_client, bucket: str, key: str) -> str:
+        """(bucket, key) 의 현재 ETag 기준 digest (revalidate_seconds 동안은 HEAD 생략)"""
+        with self._lock:
+            cached = self._etags.get((bucket, key))
+        if cached and time.monotonic() - cached[1] <= self.revalidate_seconds:
+            return cached[0]
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        digest = self.digest(bucket, key, head.get("ETag"))
+        with self._lock:
+            self._etags[(bucket, key)] = (digest, time.monotonic())
+        return digest
+
+    def _read(self, digest: str) -> Optional[AudioSegment]:
+        cached = self.store.read(digest)
+        return cached[0] if cached else None
+
+    # ────────────── 공개 API (동기: s3_gateway executor 에서 호출) ──────────────
+    def load(self, bucket: str, key: str, format: str = "wav", s3_client=None) -> AudioSegment:
+        """캐시에 있으면 디스크에서, 없으면 S3 에서 받아 디코딩 후 캐시에 저장"""
+        s3_client = s3_client or s3_gateway.client
+        digest = self.current_digest(s3_client, bucket, key)
+
+        audio = self._read(digest)
+        if audio is not None:
+            self.hits += 1
+            return audio
+
+        # 같은 스템을 동시에 요청해도 다운로드/디코딩은 한 번만
+        with self._key_lock(digest):
+            audio = self._read(digest)
+            if audio is not None:
+                self.hits += 1
+                return audio
+
+            self.misses += 1
+            print(f"☁️ S3에서 로딩 중: {key}")
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            audio = AudioSegment.from_file(io.BytesIO(response["Body"].read()), format=format)
+            try:
+                self.store.write(digest, audio)
+            except OSError as e:
+                # 디스크 문제로 캐시 저장에 실패해도 합성은 계속 진행
+                logger.warning(f"[스템 캐시 저장 실패] {key}: {e}")
+            return audio
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "max_bytes": self.store.max_bytes}
+
+
+# 싱글톤 인스턴스
+stem_cache = StemCache()
@@ -0,0 +1,144 @@
+import os
+import uuid
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import SynthesisJob
+from services.progress_bus import progress_bus
+
+logger = logging.getLogger(__name__)
+
+# 동시에 돌릴 합성 작업 수 / 믹싱·인코딩 전용 스레드 수
+SYNTH_MAX_CONCURRENT_JOBS = int(os.getenv("SYNTH_MAX_CONCURRENT_JOBS", str(max(1, (os.cpu_count() or 1)))))
+SYNTH_MAX_WORKERS = int(os.getenv("SYNTH_MAX_WORKERS", str(SYNTH_MAX_CONCURRENT_JOBS)))
+
+
+# ────────────── DB 헬퍼 (다른 작업 테이블과 같은 형태) ──────────────
+async def create_synthesis_job(db: AsyncSession, job_id: str, user_id: int, token_id: int,
+                               status: str = "queued", progress: int = 0, message: str = "합성 대기 중"):
+    job = SynthesisJob(
+        job_id=job_id,
+        user_id=user_id,
+        token_id=token_id,
+        status=status,
+        progress=progress,
+        message=message,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+def synthesis_progress_snapshot(job: SynthesisJob) -> dict:
+    from router.utils_s3 import generate_presigned_url   # 순환 import 방지
+
+    return {
+        "job_id":   job.job_id,
+        "token_id": job.token_id,
+        "status":   job.status,
+        "progress": job.progress,
+        "message":  job.message,
+        "dubbing_audio_url": generate_presigned_url(job.s3_key) if job.s3_key else None,
+    }
+
+
+async def get_synthesis_job(db: AsyncSession, job_id: str) -> Optional[SynthesisJob]:
+    res = await db.execute(select(SynthesisJob).filter_by(job_id=job_id))
+    return res.scalars().first()
+
+
+async def update_synthesis_job(db: AsyncSession, job_id: str, **kw):
+    job = await get_synthesis_job(db, job_id)
+    if job:
+        for k, v in kw.items(): setattr(job, k, v)
+        await db.commit()
+        await db.refresh(job)
+        progress_bus.publish(job_id, synthesis_progress_snapshot(job))   # SSE 구독자에게 push
+    return job
+
+
+class SynthesisJobRunner:
+    """
+    더빙 합성 작업 실행기
+
+    - 믹싱/인코딩/업로드는 크기가 제한된 전용 스레드 풀(executor)에서 실행
+      → 합성 요청이 몰려도 기본 스레드 풀(다른 sync 엔드포인트용)을 잠식하지 않음
+    - 동시에 실행되는 작업 수는 세마포어로 제한하고, 나머지는 queued 상태로 대기
+    - 진행 상황은 synthesis_jobs 테이블 + progress_bus 로 전달 (AnalysisResult 와 같은 흐름)
+    """
+
+    def __init__(self, max_concurrent: int = SYNTH_MAX_CONCURRENT_JOBS, max_workers: int = SYNTH_MAX_WORKERS):
+        self.max_concurrent = max_concurrent
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="synth")
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def run_inline(self, token_id: int, user_id: int, **options) -> str:
+        """동기 모드: 요청 안에서 바로 합성 (같은 풀/동시성 제한 사용)"""
+        from utils.synthesize import run_synthesis_async
+
+        async with self.semaphore:
+            return await run_synthesis_async(token_id, user_id, executor=self.executor, **options)
+
+    async def submit(self, token_id: int, user_id: int, **options) -> str:
+        """비동기 모드: 작업을 등록하고 job_id 를 바로 반환"""
+        job_id = str(uuid.uuid4())
+        async with AsyncSessionLocal() as db:
+            await create_synthesis_job(db, job_id, user_id, token_id)
+
+        task = asyncio.create_task(self._run(job_id, token_id, user_id, options))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job_id: str, token_id: int, user_id: int, options: dict) -> None:
+        from utils.synthesize import run_synthesis_async
+
+        async with self.semaphore:
+            async with AsyncSessionLocal() as db:
+                async def on_progress(progress: int, message: str) -> None:
+                    await update_synthesis_job(db, job_id, status="processing", progress=progress, message=message)
+
+                try:
+                    s3_key = await run_synthesis_async(token_id, user_id, executor=self.executor,
+                                                       on_progress=on_progress, **options)
+                    await update_synthesis_job(db, job_id, status="completed", progress=100,
+                                               message="합성 및 업로드 완료", s3_key=s3_key)
+                    logger.info(f"[✅ 합성 완료] job_id={job_id}, s3_key={s3_key}")
+                except Exception as e:
+                    logger.error(f"[❌ 합성 실패] job_id={job_id}, error={e}")
+                    await db.rollback()
+                    await update_synthesis_job(db, job_id, status="failed", progress=0, message=str(e))
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# 싱글톤 인스턴스
+synthesis_jobs = SynthesisJobRunner()
@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import TokenCategory
+
+
+def normalize_category(name: str) -> str:
+    return name.strip().lower()
+
+
+def split_categories(raw: Optional[str]) -> List[str]:
+    """
+    'Action, 드라마' → ['action', '드라마'] (중복/빈 값 제거, 순서 유지)
+    token_categories 를 채우는 DB 트리거(migrations/versions/e1f4a6c8b203)와 같은 규칙
+    """
+    if not raw:
+        return []
+    names: List[str] = []
+    for part in raw.split(","):
+        name = normalize_category(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def category_match(category: str):
+    """카테고리 접두사 일치 토큰 id 서브쿼리 (인덱스 사용)"""
+    prefix = normalize_category(category)
+    return (
+        select(TokenCategory.token_id)
+        .where(TokenCategory.name.startswith(prefix, autoescape=True))
+    )
+
+
+def category_counts(db: Session, limit: Optional[int] = None):
+    """카테고리별 토큰 수 (많은 순)"""
+    count = func.count(TokenCategory.token_id)
+    query = (
+        db.query(TokenCategory.name, count.label("count"))
+          .group_by(TokenCategory.name)
+          .order_by(count.desc(), TokenCategory.name)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
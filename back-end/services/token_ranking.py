@@ -0,0 +1,129 @@
+import os
+import time
+import base64
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models import Token
+from schemas import Token as TokenSchema
+
+logger = logging.getLogger(__name__)
+
+# 인기순 스냅샷 크기 / 갱신 주기(초)
+POPULAR_SNAPSHOT_SIZE = int(os.getenv("POPULAR_SNAPSHOT_SIZE", "500"))
+POPULAR_SNAPSHOT_TTL_SECONDS = float(os.getenv("POPULAR_SNAPSHOT_TTL_SECONDS", "60"))
+
+
+# ────────────── keyset 커서 인코딩 ──────────────
+def encode_cursor(*values: int) -> str:
+    raw = ":".join(str(v) for v in values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[int, ...]:
+    """잘못된 커서면 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = tuple(int(v) for v in base64.urlsafe_b64decode(padded).decode().split(":"))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
+
+
+def _popular_key(token) -> Tuple[int, int]:
+    return (token.view_count or 0, token.id)
+
+
+class PopularityRanking:
+    """
+    인기순(view_count DESC, id DESC) 랭킹 스냅샷
+
+    - 상위 POPULAR_SNAPSHOT_SIZE 개를 주기적으로 메모리에 올려두고 앞쪽 페이지는 DB 조회 없이 응답
+    - 스냅샷 범위를 벗어나는 페이지는 (view_count, id) keyset 쿼리로 조회
+    """
+
+    def __init__(self, size: int = POPULAR_SNAPSHOT_SIZE, ttl: float = POPULAR_SNAPSHOT_TTL_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self._tokens: List[TokenSchema] = []
+        self._index: Dict[Tuple[int, int], int] = {}   # (view_count, id) → 스냅샷 내 위치
+        self._complete = False                          # 스냅샷이 전체 토큰을 담고 있는지
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.ttl
+
+    def refresh(self, db: Session) -> None:
+        rows = (
+            db.query(Token)
+              .order_by(Token.view_count.desc(), Token.id.desc())
+              .limit(self.size)
+              .all()
+        )
+        tokens = [TokenSchema.model_validate(t) for t in rows]
+        # 참조 교체만 하므로 읽는 쪽은 락 없이 일관된 스냅샷을 본다
+        self._index = {_popular_key(t): i for i, t in enumerate(tokens)}
+        self._tokens = tokens
+        self._complete = len(tokens) < self.size
+        self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if not self._stale():
+            return
+        # 한 요청만 갱신하고, 나머지는 (있다면) 이전 스냅샷으로 응답
+        if self._refresh_lock.acquire(blocking=self._loaded_at is None):
+            try:
+                if self._stale():
+                    self.refresh(db)
+            except Exception as e:
+                logger.error(f"[인기순 스냅샷 갱신 실패] {e}")
+            finally:
+                self._refresh_lock.release()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def get_page(self, db: Session, skip: int, limit: int, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """(토큰 목록, 다음 페이지 커서) 반환"""
+        self._ensure_fresh(db)
+        tokens, index, complete = self._tokens, self._index, self._complete
+
+        if cursor:
+            key = decode_cursor(cursor, 2)
+            start = index[key] + 1 if key in index else None
+        else:
+            start = skip
+
+        if start is not None and (complete or start + limit <= len(tokens)):
+            page = tokens[start:start + limit]
+        elif cursor:
+            view_count, token_id = decode_cursor(cursor, 2)
+            page = (
+                db.query(Token)
+                  .filter(tuple_(Token.view_count, Token.id) < tuple_(view_count, token_id))
+                  .order_by(Token.view_count.desc(), Token.id.desc())
+                  .limit(limit)
+                  .all()
+            )
+        else:
+            page = (
+                db.query(Token)
+                  .order_by(Token.view_count.desc(), Token.id.desc())
+                  .offset(skip)
+                  .limit(limit)
+                  .all()
+            )
+
+        next_cursor = encode_cursor(*_popular_key(page[-1])) if page and len(page) == limit else None
+        return page, next_cursor
+
+
+# 싱글톤 인스턴스
+popularity_ranking = PopularityRanking()
@@ -0,0 +1,102 @@
+import os
+import math
+import time
+import random
+import logging
+import threading
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Token
+
+logger = logging.getLogger(__name__)
+
+# 싱크 컬렉션 대상: 재생 시간이 이 값(초) 미만인 토큰
+SYNC_COLLECTION_MAX_DURATION = 20
+# 후보 풀 재적재 주기(초) - 토큰 생성/수정/삭제 시에는 즉시 무효화
+SYNC_POOL_TTL_SECONDS = float(os.getenv("SYNC_POOL_TTL_SECONDS", "300"))
+# 풀 기본 순서를 섞는 고정 시드 - 모든 워커/재적재에서 같은 순서가 나와야 seed + skip 페이지가 일관됨
+SYNC_POOL_SHUFFLE_SEED = 20240817
+
+
+class TokenSampler:
+    """
+    /tokens/sync-collection 용 랜덤 샘플러
+
+    - 대상 토큰 id 풀을 id 순으로 읽어 고정 시드로 섞어서 보관 (워커/재적재와 무관하게 같은 순서)
+    - 요청마다 seed 로 정해지는 아핀 순열 (a*i + b) mod n 을 풀 위에 적용
+      → 같은 seed 면 페이지가 겹치거나 빠지지 않고, 페이지 하나는 O(limit) 로 계산
+    - ORDER BY random() 전체 스캔/정렬을 하지 않는다
+    """
+
+    def __init__(self, ttl: float = SYNC_POOL_TTL_SECONDS):
+        self.ttl = ttl
+        self._ids: List[int] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.ttl
+
+    def refresh(self, db: Session) -> None:
+        rows = (
+            db.query(Token.id)
+              .filter(Token.end_time - Token.start_time < SYNC_COLLECTION_MAX_DURATION)
+              .order_by(Token.id)
+              .all()
+        )
+        ids = [row.id for row in rows]
+        # 기본 순서를 한 번 섞어두면 아핀 순열의 등간격 패턴이 id 순서로 드러나지 않는다
+        # (전역 RNG 대신 고정 시드 → 워커가 달라도, 풀을 다시 적재해도 같은 순서)
+        random.Random(SYNC_POOL_SHUFFLE_SEED).shuffle(ids)
+        self._ids = ids
+        self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if not self._stale():
+            return
+        with self._lock:
+            if self._stale():
+                self.refresh(db)
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    @staticmethod
+    def new_seed() -> int:
+        return random.getrandbits(31)
+
+    @staticmethod
+    def _permutation(seed: int, n: int):
+        """seed 로부터 n 과 서로소인 a, 오프셋 b 를 결정"""
+        rng = random.Random(seed)
+        if n <= 1:
+            return 1, 0
+        a = rng.randrange(1, n)
+        while math.gcd(a, n) != 1:
+            a = a % (n - 1) + 1
+        return a, rng.randrange(n)
+
+    def sample_ids(self, db: Session, seed: int, skip: int, limit: int) -> List[int]:
+        self._ensure_fresh(db)
+        ids = self._ids
+        n = len(ids)
+        if skip >= n or limit <= 0:
+            return []
+        a, b = self._permutation(seed, n)
+        return [ids[(a * i + b) % n] for i in range(skip, min(skip + limit, n))]
+
+    def sample(self, db: Session, seed: int, skip: int, limit: int) -> List[Token]:
+        """seed 로 고정된 랜덤 순서의 skip ~ skip+limit 구간 토큰 반환"""
+        page_ids = self.sample_ids(db, seed, skip, limit)
+        if not page_ids:
+            return []
+        tokens = db.query(Token).filter(Token.id.in_(page_ids)).all()
+        by_id = {t.id: t for t in tokens}
+        # 풀 갱신 전에 삭제된 토큰은 건너뜀
+        return [by_id[i] for i in page_ids if i in by_id]
+
+
+# 싱글톤 인스턴스
+token_sampler = TokenSampler()
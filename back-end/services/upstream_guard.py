@@ -0,0 +1,179 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 업스트림별 동시 요청 수 / 대기 시간 / 서킷 브레이커 설정
+UPSTREAM_GUARD_PROFILES = {
+    "analysis": {
+        "max_in_flight": int(os.getenv("ANALYSIS_MAX_IN_FLIGHT", "16")),
+        "queue_timeout": float(os.getenv("ANALYSIS_QUEUE_TIMEOUT_SECONDS", "30")),
+        "failure_threshold": int(os.getenv("ANALYSIS_BREAKER_FAILURES", "5")),
+        "reset_timeout": float(os.getenv("ANALYSIS_BREAKER_RESET_SECONDS", "30")),
+    },
+    "preprocess": {
+        "max_in_flight": int(os.getenv("PREPROCESS_MAX_IN_FLIGHT", "4")),
+        "queue_timeout": float(os.getenv("PREPROCESS_QUEUE_TIMEOUT_SECONDS", "60")),
+        "failure_threshold": int(os.getenv("PREPROCESS_BREAKER_FAILURES", "3")),
+        "reset_timeout": float(os.getenv("PREPROCESS_BREAKER_RESET_SECONDS", "60")),
+    },
+}
+
+# 이 상태로 표시된 작업은 클라이언트가 다시 요청하면 된다 (업스트림 과부하/장애로 요청 자체를 보내지 않음)
+RETRYABLE_STATUS = "retryable"
+
+
+class UpstreamUnavailable(Exception):
+    """업스트림 과부하/장애로 요청을 보내지 않고 바로 실패 (재시도 가능)"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} 서버를 사용할 수 없습니다: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """서킷 브레이커에 실패로 집계할 예외 (연결/타임아웃 오류, 5xx). 4xx 는 요청 문제이므로 제외"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class UpstreamGuard:
+    """
+    업스트림 1개에 대한 입장 제어
+
+    - 동시에 보내는 요청 수를 max_in_flight 로 제한, 나머지는 queue_timeout 동안만 대기
+    - 연속 failure_threshold 번 실패하면 서킷 open → reset_timeout 동안 요청 없이 바로 실패
+    - reset_timeout 이 지나면 half-open: 요청 1개만 시험 삼아 보내고 성공하면 close
+    → 느려진 서버 때문에 백그라운드 작업이 무한히 쌓이지 않는다
+    """
+
+    def __init__(self, name: str, max_in_flight: int, queue_timeout: float,
+                 failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        """서킷이 open 이면 half-open 이 될 때까지 남은 시간(초), 아니면 0"""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _before_request(self) -> bool:
+        """요청을 보내도 되는지 확인. half-open 시험 요청이면 True 반환"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "서킷 open (최근 연속 실패)")
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def _record(self, success: bool, probe: bool) -> None:
+        if probe:
+            self._probing = False
+        if success:
+            self._failures = 0
+            if self._opened_at is not None:
+                logger.info(f"[서킷 close] {self.name}")
+            self._opened_at = None
+            return
+        self._failures += 1
+        if probe or self._failures >= self.failure_threshold:
+            if self._opened_at is None or probe:
+                logger.warning(f"[서킷 open] {self.name}: 연속 {self._failures}회 실패")
+            self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        async with guard.slot(): 업스트림 호출
+        입장 불가(서킷 open, 대기 시간 초과)면 UpstreamUnavailable
+        """
+        # 서킷이 열려 있으면 대기열에 들어가지 않고 바로 실패
+        if self.state == "open":
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "서킷 open (최근 연속 실패)")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, f"대기 시간 {self.queue_timeout:.0f}초 초과")
+        finally:
+            self.waiting -= 1
+
+        # 대기하는 동안 서킷이 열렸을 수 있으므로 슬롯을 얻은 뒤 다시 확인 (half-open 이면 시험 요청 1개만 통과)
+        try:
+            probe = self._before_request()
+        except UpstreamUnavailable:
+            self._semaphore.release()
+            raise
+
+        self.in_flight += 1
+        try:
+            yield
+        except BaseException as e:
+            if is_upstream_failure(e):
+                self._record(False, probe)
+            elif probe:
+                self._probing = False
+            raise
+        else:
+            self._record(True, probe)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "consecutive_failures": self._failures,
+            "rejected": self.rejected,
+        }
+
+
+class UpstreamGuardRegistry:
+    """업스트림 이름별 UpstreamGuard (http_clients 프로필 이름과 동일)"""
+
+    def __init__(self, profiles: Dict[str, dict] = UPSTREAM_GUARD_PROFILES):
+        self.guards = {name: UpstreamGuard(name, **profile) for name, profile in profiles.items()}
+
+    def get(self, name: str) -> UpstreamGuard:
+        return self.guards[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        return {name: guard.snapshot() for name, guard in self.guards.items()}
+
+
+# 싱글톤 인스턴스
+upstream_guards = UpstreamGuardRegistry()
@@ -0,0 +1,201 @@
+import argparse
+import logging
+from typing import Any, Iterable, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import AnalysisResult, UserStats
+from services.analysis_scores import extract_scores
+
+logger = logging.getLogger(__name__)
+
+# 집계 컬럼 (analysis_results 에서 다시 계산할 때와 증분 갱신할 때 같은 순서로 사용)
+COUNTER_COLUMNS = (
+    "practice_count",
+    "dubbed_token_count",
+    "overall_score_sum",
+    "overall_score_count",
+    "completion_score_sum",
+    "completion_score_count",
+)
+
+
+# ────────────── 점수 추출 규칙 (SQL / Python 동일) ──────────────
+def overall_score_expr():
+    # score_router 평균 점수: 웹훅 수신 시 추출해 둔 overall_score 컬럼
+    return AnalysisResult.overall_score
+
+
+def _json_number(key: str, dialect_name: str):
+    # result[key] 가 JSON 숫자일 때만 값, 아니면(문자열 등) NULL
+    # (postgresql 은 CAST 오류로 재계산 전체가 중단되지 않도록, sqlite 는 문자열이 그대로 집계되지 않도록)
+    element = AnalysisResult.result[key]
+    if dialect_name == "postgresql":
+        return case((func.json_typeof(element) == "number", element.as_float()))
+    if dialect_name == "sqlite":
+        return case((func.json_type(AnalysisResult.result, f'$."{key}"').in_(("integer", "real")), element.as_float()))
+    return element.as_float()
+
+
+def completion_score_expr(dialect_name: str):
+    # 마이페이지 평균: total_score (없거나 0 이면 score)
+    return func.coalesce(
+        func.nullif(_json_number("total_score", dialect_name), 0),
+        func.nullif(_json_number("score", dialect_name), 0),
+    )
+
+
+def _as_float(value: Any) -> Optional[float]:
+    # SQL 쪽과 같이 JSON 숫자만 점수로 인정 (bool 은 int 의 하위 타입이므로 제외)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def result_scores(result: Optional[dict]) -> Tuple[Optional[float], Optional[float]]:
+    """분석 결과 JSON → (overall_score, completion_score). 위 SQL 식과 같은 규칙"""
+    if not isinstance(result, dict):
+        return None, None
+    overall = extract_scores(result)["overall_score"]
+    completion = _as_float(result.get("total_score")) or _as_float(result.get("score")) or None
+    return overall, completion
+
+
+def _score_deltas(old_result: Optional[dict], new_result: Optional[dict]) -> dict:
+    deltas = {}
+    for name, old, new in zip(("overall", "completion"), result_scores(old_result), result_scores(new_result)):
+        deltas[f"{name}_score_sum"] = (new or 0.0) - (old or 0.0)
+        deltas[f"{name}_score_count"] = (new is not None) - (old is not None)
+    return deltas
+
+
+# ────────────── 증분 갱신 (쓰기 경로의 같은 트랜잭션 안에서 실행) ──────────────
+def _increment_stmt(dialect_name: str, user_id: int, deltas: dict):
+    """user_stats 행이 없으면 만들고, 있으면 각 컬럼에 delta 를 더하는 upsert"""
+    insert_fn = sqlite_insert if dialect_name == "sqlite" else pg_insert
+    stmt = insert_fn(UserStats).values(user_id=user_id, updated_at=func.now(), **deltas)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            **{column: getattr(UserStats, column) + getattr(stmt.excluded, column) for column in deltas},
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def record_practice(db: AsyncSession, user_id: Optional[int], token_id: int) -> None:
+    """
+    분석 결과 생성 시 호출 (db.add 전, commit 전)
+    연습 횟수 +1, 이 토큰의 첫 결과면 더빙 토큰 수도 +1
+
+    연습 횟수 upsert 가 user_stats 행을 잠그므로 같은 사용자의 동시 업로드는 여기서 순서대로 진행된다.
+    첫 결과인지는 잠금을 얻은 뒤에 확인하므로, 앞선 업로드가 커밋한 결과가 보여서 더빙 토큰 수가 두 번 오르지 않는다.
+    """
+    if user_id is None:
+        return
+    dialect_name = db.get_bind().dialect.name
+    await db.execute(_increment_stmt(dialect_name, user_id, {"practice_count": 1}))
+    already_dubbed = (await db.execute(
+        select(AnalysisResult.id)
+        .where(AnalysisResult.user_id == user_id, AnalysisResult.token_id == token_id)
+        .limit(1)
+    )).first() is not None
+    if not already_dubbed:
+        await db.execute(_increment_stmt(dialect_name, user_id, {"dubbed_token_count": 1}))
+
+
+async def record_result(db: AsyncSession, user_id: Optional[int],
+                        old_result: Optional[dict], new_result: Optional[dict]) -> None:
+    """
+    분석 결과(result JSON)가 바뀔 때 호출 (commit 전)
+    이전 결과의 점수를 빼고 새 결과의 점수를 더하므로 같은 webhook 이 두 번 와도 중복 집계되지 않음
+    old_result 는 FOR UPDATE 로 다시 읽은 값이어야 한다 (오래 열린 세션의 캐시된 값이면 다른 요청이 먼저 쓴 결과를 놓침)
+    """
+    if user_id is None:
+        return
+    deltas = _score_deltas(old_result, new_result)
+    if not any(deltas.values()):
+        return
+    await db.execute(_increment_stmt(db.get_bind().dialect.name, user_id, deltas))
+
+
+# ────────────── 재계산 (삭제 경로 / 백필) ──────────────
+def _aggregate_select(dialect_name: str):
+    overall = overall_score_expr()
+    completion = completion_score_expr(dialect_name)
+    return (
+        select(
+            AnalysisResult.user_id,
+            func.count(AnalysisResult.id),
+            func.count(func.distinct(AnalysisResult.token_id)),
+            func.coalesce(func.sum(overall), 0),
+            func.count(overall),
+            func.coalesce(func.sum(completion), 0),
+            func.count(completion),
+            func.now(),
+        )
+        .where(AnalysisResult.user_id.isnot(None))
+        .group_by(AnalysisResult.user_id)
+    )
+
+
+def refresh_user_stats(db: Session, user_ids: Iterable[int]) -> None:
+    """
+    지정한 사용자들의 통계를 analysis_results 에서 다시 계산 (commit 은 호출한 쪽에서)
+    결과를 여러 개 지우는 경로(재더빙 초기화, 토큰 삭제)는 증분 대신 이걸 사용
+    """
+    user_ids = [user_id for user_id in set(user_ids) if user_id is not None]
+    if not user_ids:
+        return
+    db.execute(delete(UserStats).where(UserStats.user_id.in_(user_ids)))
+    db.execute(
+        insert(UserStats).from_select(
+            ["user_id", *COUNTER_COLUMNS, "updated_at"],
+            _aggregate_select(db.get_bind().dialect.name).where(AnalysisResult.user_id.in_(user_ids)),
+        )
+    )
+
+
+def backfill_user_stats(db: Session) -> int:
+    """전체 사용자 통계를 analysis_results 에서 다시 만든다. 생성된 행 수 반환"""
+    db.execute(delete(UserStats))
+    db.execute(insert(UserStats).from_select(["user_id", *COUNTER_COLUMNS, "updated_at"],
+                                             _aggregate_select(db.get_bind().dialect.name)))
+    db.commit()
+    return db.query(func.count(UserStats.user_id)).scalar()
+
+
+# ────────────── 조회 ──────────────
+def get_user_stats(db: Session, user_id: int) -> Optional[UserStats]:
+    return db.get(UserStats, user_id)
+
+
+def average(total: float, count: int) -> Optional[float]:
+    return total / count if count else None
+
+
+if __name__ == "__main__":
+    # 사용법 (back-end 디렉터리에서):
+    #   python -m services.user_stats              → 전체 재계산
+    #   python -m services.user_stats --user-id 7  → 특정 사용자만
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="user_stats 백필 / 재계산")
+    parser.add_argument("--user-id", type=int, action="append", help="재계산할 사용자 ID (여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        if args.user_id:
+            refresh_user_stats(session, args.user_id)
+            session.commit()
+            logger.info(f"[user_stats 재계산 완료] user_ids={args.user_id}")
+        else:
+            logger.info(f"[user_stats 백필 완료] {backfill_user_stats(session)}명")
+    finally:
+        session.close()
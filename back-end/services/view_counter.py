@@ -0,0 +1,143 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import update, case
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Token
+
+logger = logging.getLogger(__name__)
+
+# 주기(초) 또는 누적 증가분이 임계값을 넘으면 DB 에 반영
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "5"))
+VIEW_FLUSH_THRESHOLD = int(os.getenv("VIEW_FLUSH_THRESHOLD", "200"))
+
+
+class ViewCountAggregator:
+    """
+    조회수 write-behind 집계기
+
+    - 조회 요청마다 UPDATE 하지 않고 토큰별 증가분을 메모리에 모아둔다
+    - 주기 또는 임계값 도달 시 한 번의 UPDATE ... CASE 로 일괄 반영 (RETURNING 으로 최신값 갱신)
+    - 응답용 조회수는 (마지막으로 확인한 DB 값 + 미반영 증가분) 근사치로 DB 왕복 없이 계산
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 flush_interval: float = VIEW_FLUSH_INTERVAL_SECONDS,
+                 flush_threshold: int = VIEW_FLUSH_THRESHOLD):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[int, int] = {}   # token_id → 아직 DB 에 반영되지 않은 증가분
+        self._known: Dict[int, int] = {}     # token_id → 마지막으로 확인한 DB 조회수
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, db: Session, token_id: int) -> Optional[int]:
+        """
+        조회수 1 증가 후 근사 조회수 반환
+        존재하지 않는 토큰이면 None
+        """
+        with self._lock:
+            known = token_id in self._known
+
+        if not known:
+            # 처음 보는 토큰만 DB 에서 현재 조회수 확인 (존재 여부 검증 겸용)
+            row = db.query(Token.view_count).filter(Token.id == token_id).first()
+            if row is None:
+                return None
+            with self._lock:
+                self._known.setdefault(token_id, row.view_count or 0)
+
+        with self._lock:
+            self._pending[token_id] = self._pending.get(token_id, 0) + 1
+            self._pending_total += 1
+            current = self._known.get(token_id, 0) + self._pending[token_id]
+            should_flush = self._pending_total >= self.flush_threshold
+
+        if should_flush:
+            self.flush()
+        return current
+
+    def forget(self, token_id: int) -> None:
+        """토큰 삭제 시 캐시에서 제거"""
+        with self._lock:
+            self._known.pop(token_id, None)
+            self._pending_total -= self._pending.pop(token_id, 0)
+
+    def flush(self) -> int:
+        """미반영 증가분을 한 번의 UPDATE 로 DB 에 반영. 반영된 토큰 수 반환"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                self._pending_total = 0
+
+            db = self._session_factory()
+            try:
+                stmt = (
+                    update(Token)
+                    .where(Token.id.in_(list(pending)))
+                    .values(view_count=Token.view_count + case(pending, value=Token.id, else_=0))
+                    .returning(Token.id, Token.view_count)
+                    .execution_options(synchronize_session=False)
+                )
+                rows = db.execute(stmt).all()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"[조회수 반영 실패] {len(pending)}개 토큰, error={e}")
+                # 실패한 증가분은 다음 flush 때 다시 시도
+                with self._lock:
+                    for token_id, delta in pending.items():
+                        self._pending[token_id] = self._pending.get(token_id, 0) + delta
+                        self._pending_total += delta
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                updated = set()
+                for token_id, view_count in rows:
+                    self._known[token_id] = view_count
+                    updated.add(token_id)
+                # DB 에 없는(삭제된) 토큰은 캐시에서 제거
+                for token_id in pending:
+                    if token_id not in updated:
+                        self._known.pop(token_id, None)
+            return len(rows)
+
+    # ────────────── 주기적 flush (lifespan 에서 시작/종료) ──────────────
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"[조회수 주기 반영 오류] {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 종료 전 남은 증가분 반영
+        await asyncio.to_thread(self.flush)
+
+
+# 싱글톤 인스턴스
+view_counter = ViewCountAggregator()
@@ -0,0 +1,146 @@
+# 더빙 결과 인코딩 + 스트리밍 업로드용 스트림
+# 믹싱 결과(raw PCM)를 통째로 WAV/압축 파일로 만들어 메모리에 올리지 않고,
+# 읽는 만큼만 만들어내는 파일 객체로 S3 멀티파트 업로드에 바로 흘려보낸다.
+import io
+import os
+import re
+import shutil
+import struct
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+# 포맷별 ffmpeg 코덱 / 컨테이너 / 확장자 / Content-Type / 기본 비트레이트
+OUTPUT_FORMATS = {
+    "wav":  {"codec": None,         "container": None,   "ext": "wav", "content_type": "audio/wav",  "bitrate": None},
+    "mp3":  {"codec": "libmp3lame", "container": "mp3",  "ext": "mp3", "content_type": "audio/mpeg", "bitrate": "128k"},
+    "aac":  {"codec": "aac",        "container": "adts", "ext": "aac", "content_type": "audio/aac",  "bitrate": "128k"},
+    "opus": {"codec": "libopus",    "container": "ogg",  "ext": "ogg", "content_type": "audio/ogg",  "bitrate": "96k"},
+}
+DEFAULT_OUTPUT_FORMAT = os.getenv("SYNTH_OUTPUT_FORMAT", "wav").lower()
+
+ENCODE_CHUNK_SIZE = 1024 * 1024        # ffmpeg stdin 으로 한 번에 넘기는 크기
+_BITRATE_RE = re.compile(r"^\d{2,3}k$")
+_PCM_FORMATS = {1: "u8", 2: "s16le", 3: "s24le", 4: "s32le"}
+
+
+def normalize_output(output_format: Optional[str], bitrate: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(포맷, 비트레이트) 검증 및 기본값 적용. 잘못된 값이면 ValueError"""
+    fmt = (output_format or DEFAULT_OUTPUT_FORMAT).lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 포맷입니다: {output_format} (가능: {', '.join(OUTPUT_FORMATS)})")
+    if fmt == "wav":
+        return fmt, None
+    if bitrate is not None and not _BITRATE_RE.match(bitrate):
+        raise ValueError(f"비트레이트 형식이 올바르지 않습니다: {bitrate} (예: 96k, 128k)")
+    return fmt, bitrate or OUTPUT_FORMATS[fmt]["bitrate"]
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+class _ChunkReader(io.RawIOBase):
+    """여러 bytes-like 조각을 복사 없이 이어서 읽는 파일 객체 (WAV 헤더 + PCM)"""
+
+    def __init__(self, *parts):
+        self._parts = [memoryview(p).cast("B") for p in parts]
+        self._index = 0
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            remaining = len(part) - self._offset
+            if remaining > 0:
+                n = min(len(buffer), remaining)
+                buffer[:n] = part[self._offset:self._offset + n]
+                self._offset += n
+                return n
+            self._index += 1
+            self._offset = 0
+        return 0
+
+
+def _wav_header(audio: AudioSegment) -> bytes:
+    data_size = len(audio.raw_data)
+    byte_rate = audio.frame_rate * audio.frame_width
+    return b"".join([
+        b"RIFF", struct.pack("<I", 36 + data_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, audio.channels, audio.frame_rate,
+                             byte_rate, audio.frame_width, audio.sample_width * 8),
+        b"data", struct.pack("<I", data_size),
+    ])
+
+
+def _feed(stdin, data: memoryview) -> None:
+    try:
+        for i in range(0, len(data), ENCODE_CHUNK_SIZE):
+            stdin.write(data[i:i + ENCODE_CHUNK_SIZE])
+    except (BrokenPipeError, ValueError):
+        # ffmpeg 가 먼저 종료된 경우 (오류는 종료 코드로 확인)
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+@contextmanager
+def encoded_stream(audio: AudioSegment, output_format: str = "wav",
+                   bitrate: Optional[str] = None) -> Iterator[Tuple[io.RawIOBase, str, str]]:
+    """
+    (읽기용 스트림, 확장자, Content-Type) 을 돌려주는 컨텍스트
+
+    - wav: 헤더 + PCM 을 복사 없이 이어 읽음
+    - mp3/aac/opus: ffmpeg 를 파이프로 실행해 PCM 을 stdin 으로 밀어넣고 stdout 을 그대로 읽음
+    블록을 빠져나올 때 ffmpeg 종료 코드를 확인하고, 실패했으면 RuntimeError
+    """
+    fmt, bitrate = normalize_output(output_format, bitrate)
+    spec = OUTPUT_FORMATS[fmt]
+
+    if fmt != "wav" and not ffmpeg_available():
+        logger.warning(f"ffmpeg 가 없어 {fmt} 대신 wav 로 업로드합니다.")
+        fmt, spec = "wav", OUTPUT_FORMATS["wav"]
+
+    if fmt == "wav":
+        yield _ChunkReader(_wav_header(audio), audio.raw_data), spec["ext"], spec["content_type"]
+        return
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", _PCM_FORMATS[audio.sample_width], "-ar", str(audio.frame_rate), "-ac", str(audio.channels),
+        "-i", "pipe:0",
+        "-c:a", spec["codec"], "-b:a", bitrate,
+        "-f", spec["container"], "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    feeder = threading.Thread(target=_feed, args=(proc.stdin, memoryview(audio.raw_data)), daemon=True)
+    feeder.start()
+    # stderr 가 파이프 버퍼를 채워 ffmpeg 가 멈추지 않도록 따로 비워줌
+    errors = []
+    drainer = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    drainer.start()
+    try:
+        yield proc.stdout, spec["ext"], spec["content_type"]
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        feeder.join()
+        returncode = proc.wait()
+        drainer.join()
+        proc.stdout.close()
+    if returncode != 0:
+        message = (errors[0] if errors else b"").decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg 인코딩 실패 ({fmt}, code={returncode}): {message}")
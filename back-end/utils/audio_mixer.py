@@ -0,0 +1,195 @@
+# NumPy 기반 더빙 믹서
+# pydub overlay 를 구간마다 반복하면 매번 전체 배경 트랙이 복사되므로 (구간 수 × 트랙 길이),
+# 샘플 버퍼를 한 번만 만들고 슬라이스 단위로 더한 뒤 마지막에 한 번만 AudioSegment 로 되돌린다.
+from typing import List, Optional, Tuple
+
+from pydub import AudioSegment
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 synthesize 쪽에서 pydub 경로로 대체
+    np = None
+
+# pydub 샘플 폭(byte) → numpy dtype (8bit/24bit 는 pydub 경로 사용)
+_DTYPES = {2: "int16", 4: "int32"}
+
+# 기존 경로가 구간마다 overlay 하는 AudioSegment.silent() 의 기본 frame rate
+# 배경이 이보다 낮으면 pydub 이 결과 전체를 이 rate 로 올려 버린다
+_SILENT_FRAME_RATE = 11025
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def supports(segment: AudioSegment) -> bool:
+    return np is not None and segment.sample_width in _DTYPES
+
+
+def matches_pydub(background: AudioSegment, original: AudioSegment, segments: list) -> bool:
+    """
+    numpy 경로가 pydub overlay 와 같은 결과를 낼 수 있는 입력인지 확인
+
+    pydub overlay 는 두 트랙을 (channels, frame_rate, sample_width) 최댓값으로 맞추므로
+    - 사용자 음성이 배경보다 높은 포맷이면 그 시점부터 결과 전체가 올라간 포맷으로 바뀌고
+    - 원본 보컬은 구간마다 잘라낸 뒤 변환되므로 (ratecv 상태가 구간마다 새로 시작) 전체 변환과 값이 다르다
+    이런 경우는 False → 호출한 쪽에서 pydub 경로 사용
+    """
+    fmt = (background.channels, background.frame_rate, background.sample_width)
+    if background.frame_rate < _SILENT_FRAME_RATE:
+        return False
+    if (original.channels, original.frame_rate, original.sample_width) != fmt:
+        return False
+    for seg in segments:
+        audio = seg.get("audio")
+        if audio is None:
+            continue
+        if audio.channels > fmt[0] or audio.frame_rate > fmt[1] or audio.sample_width > fmt[2]:
+            return False
+    return True
+
+
+def _frame(ms: float, frame_rate: int) -> int:
+    # pydub 의 ms → frame 변환과 동일 (AudioSegment.frame_count 후 int 절삭)
+    return int(ms * frame_rate / 1000.0)
+
+
+def _to_array(segment: AudioSegment, like: AudioSegment) -> "np.ndarray":
+    """segment 를 기준 트랙(like)과 같은 포맷으로 맞춰 (frames, channels) 배열로 변환 (AudioSegment._sync 와 같은 순서)"""
+    if segment.channels != like.channels:
+        segment = segment.set_channels(like.channels)
+    if segment.frame_rate != like.frame_rate:
+        segment = segment.set_frame_rate(like.frame_rate)
+    if segment.sample_width != like.sample_width:
+        segment = segment.set_sample_width(like.sample_width)
+    samples = np.frombuffer(segment.raw_data, dtype=_DTYPES[like.sample_width])
+    return samples.reshape(-1, like.channels)
+
+
+def _gap_frames(segments: list, original: AudioSegment, rate: int) -> List[Tuple[int, int]]:
+    """
+    원본 보컬을 채울 구간 (frame 단위)
+    시작 순으로 정렬한 사용자 구간 사이 + 마지막 구간 이후 (기존 pydub 경로와 같은 규칙)
+    """
+    orig_len_ms = len(original)
+    gaps = []
+
+    def gap(from_ms: int, to_ms: int) -> None:
+        # original[from_ms:to_ms] 를 from_ms 위치에 overlay 한 것과 동일
+        gaps.append((_frame(min(from_ms, orig_len_ms), rate), _frame(min(to_ms, orig_len_ms), rate)))
+
+    current_position_ms = 0
+    for seg in sorted(segments, key=lambda x: x["start"]):
+        start_ms = int(seg["start"] * 1000)
+        end_ms = int(seg["end"] * 1000)
+        if current_position_ms < start_ms:
+            gap(current_position_ms, start_ms)
+        current_position_ms = end_ms
+
+    if current_position_ms < orig_len_ms:
+        gap(current_position_ms, orig_len_ms)
+    return gaps
+
+
+def _add_window(mix: "np.ndarray", lo: int, hi: int, at: int, samples: "np.ndarray", info) -> None:
+    """
+    samples 를 at 위치에 놓았을 때 [lo, hi) 와 겹치는 부분만 mix 에 더함
+    overlay 마다 audioop.add 가 포화 처리하므로 더한 부분은 바로 클리핑한다
+    """
+    s = max(at, lo)
+    e = min(at + len(samples), hi)
+    if s < e:
+        window = mix[s - lo:e - lo]
+        window += samples[s - at:e - at]
+        np.clip(window, info.min, info.max, out=window)
+
+
+def _render(background: AudioSegment, original: AudioSegment, segments: list, lo: int, hi: int) -> "np.ndarray":
+    """
+    [lo, hi) frame 구간의 믹싱 결과 (int64, overlay 마다 클리핑한 값)
+    구간 밖은 계산하지 않으므로 전체 렌더와 부분 재렌더가 같은 코드를 쓴다.
+    audio 가 없는 segment 는 원본 보컬 구간 계산에만 사용 (호출한 쪽이 겹치지 않음을 보장)
+    """
+    rate = background.frame_rate
+    info = np.iinfo(np.dtype(_DTYPES[background.sample_width]))
+    mix = _to_array(background, background)[lo:hi].astype(np.int64)
+
+    # 1. 사용자 음성 (pydub 과 같은 순서로 더해야 포화 처리 결과가 같다)
+    for seg in segments:
+        if seg.get("audio") is not None:
+            # overlay(position=int(start*1000)) 와 같은 위치 (ms 로 먼저 절삭)
+            at = _frame(int(seg["start"] * 1000), rate)
+            _add_window(mix, lo, hi, at, _to_array(seg["audio"], background), info)
+
+    # 2. 사용자 구간 사이를 원본 보컬로 채움
+    vocal = _to_array(original, background)
+    for from_frame, to_frame in _gap_frames(segments, original, rate):
+        _add_window(mix, lo, hi, from_frame, vocal[from_frame:to_frame], info)
+    return mix
+
+
+def _clip(mix: "np.ndarray", sample_width: int) -> bytes:
+    dtype = np.dtype(_DTYPES[sample_width])
+    info = np.iinfo(dtype)
+    np.clip(mix, info.min, info.max, out=mix)
+    return mix.astype(dtype).tobytes()
+
+
+def mix_dub_tracks(
+    background: AudioSegment,
+    original: AudioSegment,
+    segments: list,
+) -> Optional[AudioSegment]:
+    """
+    배경 + 사용자 음성(segments) + 원본 보컬(사용자 구간 사이)을 한 번에 믹싱
+
+    기존 pydub 경로와 같은 결과를 만든다:
+    - 배경 트랙 길이 기준, 사용자 음성은 각 구간 시작 위치에 더함
+    - 원본 보컬은 (시작 순으로 정렬한) 사용자 구간 사이 / 마지막 구간 이후에만 더함
+    - 합산은 넓은 정수형에서 하고 overlay 한 번마다 샘플 폭 범위로 클리핑 (audioop.add 와 같은 포화 처리)
+    지원하지 않는 포맷이거나 pydub 이 포맷을 바꾸는 입력이면 (matches_pydub) None 을 반환하므로
+    호출한 쪽에서 pydub 으로 처리한다.
+    """
+    if not supports(background) or not matches_pydub(background, original, segments):
+        return None
+
+    total = len(background.raw_data) // background.frame_width
+    mix = _render(background, original, segments, 0, total)
+    return background._spawn(_clip(mix, background.sample_width))
+
+
+def splice_dub_tracks(
+    previous: AudioSegment,
+    background: AudioSegment,
+    original: AudioSegment,
+    segments: list,
+    windows_ms: List[Tuple[float, float]],
+) -> Optional[AudioSegment]:
+    """
+    이전 믹싱 결과(previous)에서 windows_ms 구간만 다시 계산해 교체
+
+    - segments: 현재 전체 구간 (start/end 필수). 창과 겹치는 구간은 audio 가 있어야 한다
+    - 창 밖의 샘플은 이전 결과 그대로이므로, 한 줄만 다시 녹음한 경우 그 구간만 계산한다
+    previous 가 배경과 포맷/길이가 다르면 None (전체 렌더 필요)
+    """
+    if not supports(background) or not matches_pydub(background, original, segments):
+        return None
+    if (previous.frame_rate, previous.channels, previous.sample_width) != \
+            (background.frame_rate, background.channels, background.sample_width):
+        return None
+    total = len(background.raw_data) // background.frame_width
+    if len(previous.raw_data) // previous.frame_width != total:
+        return None
+
+    rate = background.frame_rate
+    out = np.frombuffer(previous.raw_data, dtype=_DTYPES[background.sample_width]).reshape(-1, background.channels).copy()
+    for start_ms, end_ms in windows_ms:
+        lo = max(0, _frame(start_ms, rate))
+        hi = min(total, _frame(end_ms, rate) + 1)
+        if lo >= hi:
+            continue
+        mix = _render(background, original, segments, lo, hi)
+        info = np.iinfo(out.dtype)
+        np.clip(mix, info.min, info.max, out=mix)
+        out[lo:hi] = mix
+    return background._spawn(out.tobytes())
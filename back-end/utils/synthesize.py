@@ -2,13 +2,23 @@
 from sqlalchemy.orm import Session
 from models import Script, DubbingResult, Token # DubbingResult, Token 모델 추가
 from pydub import AudioSegment
-from router.utils_s3 import load_user_audio_from_s3, upload_audio_to_s3, load_main_audio_from_s3
+from router.utils_s3 import (
+    load_user_audio_from_s3, upload_audio_to_s3, load_main_audio_from_s3,
+    main_audio_digests, user_audio_etag,
+)
 from database import get_db
+from services.s3_gateway import s3_gateway
+from services.render_cache import render_cache
+from utils.audio_mixer import mix_dub_tracks, splice_dub_tracks
 import asyncio
+import functools
 
 import os
 import re
-import uuid # uuid 모듈 추가
+import time
+
+# 사용자 음성 동시 로딩 개수 (S3 다운로드 + WAV 디코딩)
+SYNTH_SEGMENT_CONCURRENCY = int(os.getenv("SYNTH_SEGMENT_CONCURRENCY", "8"))
 
 
 def extract_youtube_video_id(url: str) -> str:
@@ -64,14 +74,47 @@ def prepare_dub_segments(user_id: int, token_id: int, scripts: list,  token_star
     return segments
 
 
+async def prepare_dub_segments_async(
+    user_id: int,
+    token_id: int,
+    scripts: list,
+    token_start_time: float,
+    concurrency: int = SYNTH_SEGMENT_CONCURRENCY,
+) -> list[dict]:
+    """
+    prepare_dub_segments 의 동시 실행 버전
+    스크립트별 S3 다운로드 + 디코딩을 최대 concurrency 개씩 병렬로 수행하고, 구간별 소요 시간을 남긴다.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def load_one(script):
+        async with semaphore:
+            started = time.perf_counter()
+            audio = await s3_gateway.run(load_user_audio_from_s3, user_id, token_id, script.id)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"⏱️ 사용자 음성 로딩: script_id={script.id}, {elapsed_ms:.1f}ms, {'성공' if audio is not None else '없음'}")
+        if audio is None:
+            return None
+        return {
+            "script_id": script.id,
+            # 절대 시간 기준을 만들기 위해서 필요함
+            "start": script.start_time - token_start_time,
+            "end": script.end_time - token_start_time,
+            "audio": audio,  # 경로가 아닌 실제 AudioSegment
+            "load_ms": round(elapsed_ms, 1),
+        }
+
+    started = time.perf_counter()
+    # gather 는 입력 순서를 유지하므로 스크립트 순서 그대로 반환
+    results = await asyncio.gather(*(load_one(script) for script in scripts))
+    segments = [seg for seg in results if seg is not None]
+    print(f"⏱️ 사용자 음성 {len(segments)}/{len(scripts)}개 로딩 완료: {(time.perf_counter() - started) * 1000:.1f}ms")
+    return segments
 
-def synthesize_audio_from_segments(
-    background: AudioSegment, 
-    original: AudioSegment, 
-    segments: list, 
-    user_id: int, 
-    token_id: int
-) -> str:
+
+
+def _mix_with_pydub(background: AudioSegment, original: AudioSegment, segments: list) -> AudioSegment:
+    """pydub overlay 기반 믹싱 (numpy 를 쓸 수 없을 때의 대체 경로)"""
     result = background[:]
 
     # 1. 내 음성 덮어쓰기
@@ -105,39 +148,213 @@ def synthesize_audio_from_segments(
         remaining_part = original[current_position_ms:]
         result = result.overlay(remaining_part, position=current_position_ms)
 
+    return result
+
+
+def mix_dub_audio(background: AudioSegment, original: AudioSegment, segments: list) -> AudioSegment:
+    """numpy 믹서를 우선 사용하고, 지원하지 않는 포맷이거나 실패하면 pydub 으로 처리"""
+    started = time.perf_counter()
+    result = None
+    try:
+        result = mix_dub_tracks(background, original, segments)
+    except Exception as e:
+        print(f"⚠️ numpy 믹싱 실패, pydub 으로 대체: {e}")
+    engine = "numpy"
+    if result is None:
+        engine = "pydub"
+        result = _mix_with_pydub(background, original, segments)
+    print(f"⏱️ 믹싱 완료({engine}): 구간 {len(segments)}개, {(time.perf_counter() - started) * 1000:.1f}ms")
+    return result
+
+
+def synthesize_audio_from_segments(
+    background: AudioSegment, 
+    original: AudioSegment, 
+    segments: list, 
+    user_id: int, 
+    token_id: int
+) -> str:
+    result = mix_dub_audio(background, original, segments)
+
     # S3에 업로드하고 S3 키를 반환
     s3_key = upload_audio_to_s3(result, user_id, token_id)
     
     return s3_key
 
 
-async def run_synthesis_async(token_id: int, user_id: int) -> str:
+def render_dub_audio(
+    background: AudioSegment,
+    original: AudioSegment,
+    segments: list,
+    user_id: int,
+    token_id: int,
+    current: dict,
+    stems: list,
+    previous: AudioSegment = None,
+    manifest: dict = None,
+    windows: list = None,
+    output_format: str = None,
+    bitrate: str = None,
+) -> str:
+    """
+    믹싱 → 렌더 캐시 저장 → 업로드 (executor 에서 실행)
+
+    previous/windows 가 있으면 바뀐 구간만 다시 믹싱하고, 불가능하면 전체 렌더로 처리한다.
+    segments 중 audio 가 None 인 항목은 부분 재렌더 창과 겹치지 않는 (이전 결과 재사용) 구간.
+    """
+    started = time.perf_counter()
+    result = None
+    if previous is not None and windows is not None:
+        result = previous if not windows else splice_dub_tracks(previous, background, original, segments, windows)
+        if result is not None:
+            print(f"⏱️ 부분 재렌더 완료: 구간 {len(windows)}개, {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    if result is None:
+        # 전체 렌더: 부분 재렌더용으로 생략했던 음성을 마저 로딩
+        for seg in segments:
+            if seg["audio"] is None:
+                seg["audio"] = load_user_audio_from_s3(user_id, token_id, seg["script_id"])
+        segments = [seg for seg in segments if seg["audio"] is not None]
+        result = mix_dub_audio(background, original, segments)
+
+    # 다음 재렌더를 위해 (user, token) 별 결과 + manifest 저장
+    previous_segments = (manifest or {}).get("segments", {})
+    manifest_segments = {}
+    for seg in segments:
+        sid = seg["script_id"]
+        ms = len(seg["audio"]) if seg["audio"] is not None else previous_segments[str(sid)]["ms"]
+        manifest_segments[sid] = {**current[sid], "ms": ms}
+    try:
+        render_cache.save(user_id, token_id, result, render_cache.build_manifest(stems, manifest_segments))
+    except OSError as e:
+        print(f"⚠️ 렌더 캐시 저장 실패: {e}")
+
+    # S3에 업로드하고 S3 키를 반환
+    return upload_audio_to_s3(result, user_id, token_id, output_format, bitrate)
+
+
+async def fetch_segment_etags(user_id: int, token_id: int, scripts: list,
+                              concurrency: int = SYNTH_SEGMENT_CONCURRENCY) -> dict:
+    """스크립트별 사용자 음성 ETag (HEAD 만, 없으면 None)"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def head(script):
+        async with semaphore:
+            return script.id, await s3_gateway.run(user_audio_etag, user_id, token_id, script.id)
+
+    return dict(await asyncio.gather(*(head(script) for script in scripts)))
+
+
+async def prepare_incremental_segments(user_id: int, token_id: int, scripts_by_id: dict, token_start_time: float,
+                                       current: dict, manifest: dict, changed: list):
+    """
+    부분 재렌더에 필요한 음성만 로딩
+    (바뀐 구간 + 그 시간 범위와 겹치는 구간) → (segments, windows), 필요한 음성을 못 받으면 None
+    """
+    changed_segments = await prepare_dub_segments_async(
+        user_id, token_id, [scripts_by_id[sid] for sid in changed], token_start_time)
+    loaded = {seg["script_id"]: seg for seg in changed_segments}
+    windows = render_cache.windows(manifest, {sid: len(seg["audio"]) for sid, seg in loaded.items()})
+
+    extra = [sid for sid in render_cache.overlapping(manifest, windows) if sid not in loaded]
+    if extra:
+        extra_segments = await prepare_dub_segments_async(
+            user_id, token_id, [scripts_by_id[sid] for sid in extra], token_start_time)
+        loaded.update((seg["script_id"], seg) for seg in extra_segments)
+    if any(sid not in loaded for sid in [*changed, *extra]):
+        return None
+
+    segments = [
+        loaded.get(sid) or {"script_id": sid, "start": info["start"], "end": info["end"], "audio": None}
+        for sid, info in current.items()
+    ]
+    return segments, windows
+
+
+async def _report(on_progress, progress: int, message: str) -> None:
+    if on_progress is not None:
+        await on_progress(progress, message)
+
+
+async def run_synthesis_async(token_id: int, user_id: int, executor=None, on_progress=None,
+                              output_format: str = None, bitrate: str = None) -> str:
+    """
+    더빙 합성 전체 파이프라인 (로딩 → 믹싱 → 인코딩/업로드 → DubbingResult 저장)
+
+    - executor: 믹싱/업로드를 실행할 풀 (None 이면 기본 스레드 풀)
+    - on_progress: async (progress, message) 콜백 (비동기 작업 모드에서 진행률 기록용)
+    - output_format / bitrate: 결과 파일 포맷 (wav, mp3, aac, opus) 과 비트레이트
+    """
     db: Session = next(get_db())
     try:
         print(f"비동기 합성 작업 시작: user_id={user_id}, token_id={token_id}")
+        await _report(on_progress, 10, "음성 로딩 중")
 
         # DB 접근은 동기적으로 수행 (일반적으로 매우 빠름)
         actor_name, video_id, token_start_time = get_token_info(db, token_id)
         scripts = get_scripts_by_token(db, token_id)
 
-        # I/O 바운드 작업을 별도 스레드에서 실행
-        background, original = await asyncio.to_thread(load_main_audio_from_s3, actor_name, video_id)
-        segments = await asyncio.to_thread(prepare_dub_segments, user_id, token_id, scripts, token_start_time)
+        # 렌더 캐시 확인용으로 사용자 음성 / 스템의 ETag 만 먼저 조회 (본문 다운로드 없음)
+        etags, stems, cached = await asyncio.gather(
+            fetch_segment_etags(user_id, token_id, scripts),
+            s3_gateway.run(main_audio_digests, actor_name, video_id),
+            asyncio.to_thread(render_cache.load, user_id, token_id),
+        )
+        current = {
+            script.id: {
+                "etag": etags[script.id],
+                "start": script.start_time - token_start_time,
+                "end": script.end_time - token_start_time,
+            }
+            for script in scripts if etags.get(script.id)
+        }
+        if not current:
+            raise ValueError(f"사용자 더빙 음성이 없어 작업을 중단합니다.")
+
+        previous, manifest = cached if cached else (None, None)
+        changed = render_cache.plan(manifest, stems, current)
+        scripts_by_id = {script.id: script for script in scripts}
+
+        incremental = None
+        if changed is not None:
+            # 다시 녹음된 줄과 겹치는 구간의 음성만 로딩
+            print(f"♻️ 부분 재렌더: 변경된 스크립트 {changed}")
+            (background, original), incremental = await asyncio.gather(
+                s3_gateway.run(load_main_audio_from_s3, actor_name, video_id),
+                prepare_incremental_segments(user_id, token_id, scripts_by_id, token_start_time,
+                                             current, manifest, changed),
+            )
+
+        if incremental is not None:
+            segments, windows = incremental
+        else:
+            # I/O 바운드 작업을 별도 스레드에서 실행
+            # 배경/원본 보컬과 사용자 음성을 동시에 로딩
+            (background, original), segments = await asyncio.gather(
+                s3_gateway.run(load_main_audio_from_s3, actor_name, video_id),
+                prepare_dub_segments_async(user_id, token_id, [scripts_by_id[sid] for sid in current], token_start_time),
+            )
+            previous = windows = None
 
         if not segments:
             raise ValueError(f"사용자 더빙 음성이 없어 작업을 중단합니다.")
 
+        await _report(on_progress, 50, "음성 합성 중")
+
         # CPU 바운드 작업(합성) 및 I/O 바운드 작업(업로드)을 별도 스레드에서 실행
-        s3_key = await asyncio.to_thread(
-            synthesize_audio_from_segments,
-            background,
-            original,
-            segments,
-            user_id,
-            token_id
+        loop = asyncio.get_running_loop()
+        s3_key = await loop.run_in_executor(
+            executor,
+            functools.partial(
+                render_dub_audio,
+                background, original, segments, user_id, token_id, current, stems,
+                previous=previous, manifest=manifest, windows=windows,
+                output_format=output_format, bitrate=bitrate,
+            ),
         )
         
         print(f"비동기 작업 완료, 결과물 S3 Key: {s3_key}")
+        await _report(on_progress, 90, "결과 저장 중")
 
         # 더빙 결과 DB에 저장
         try: